@@ -1,27 +1,164 @@
+import asyncio
 import csv
 import io
 import logging
 import json
-from typing import List, Optional, Dict, Any
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Optional, Union
 
-from fastapi import APIRouter, HTTPException, Query, Depends, Form, Response, status, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Query, Depends, Form, Request, Response, status, BackgroundTasks
 from fastapi.responses import JSONResponse, StreamingResponse
-from pydantic import HttpUrl, ValidationError
+from pydantic import BaseModel, HttpUrl, ValidationError
 
 from app.models.schema import (
     ScraperRequest, 
     ScraperResponse, 
+    BatchScraperRequest,
+    BatchScraperResponse,
+    BatchItemResult,
+    CrawlPageResult,
+    JobInfo,
+    JobResponse,
+    JobResultsResponse,
     ScraperConfigResponse,
     ScrapeResult,
     ErrorResponse
 )
+from app.core.config import settings
+from app.jobs.runner import job_runner
+from app.jobs.store import RUNNING, job_store
+from app.scraper.batch import BatchScraper
+from app.scraper.extraction_pool import ExtractionQueueFull, extraction_pool
+from app.scraper.host_scheduler import host_scheduler
+from app.scraper.http_cache import http_cache
+from app.scraper.parser_backends import available_backends
+from app.scraper.retry import DeadlineExceeded
 from app.scraper.scraper import WebScraper
+from app.scraper.session_pool import session_pool
+from app.scraper.single_flight import single_flight
+from app.scraper.streaming import STREAMABLE_TYPES
+from app.utils.admission import Overloaded, admission
 from app.utils.rate_limiter import rate_limiter, get_remaining_requests
-from app.utils.validators import validate_url
+from app.utils.selector_cache import get_selector_cache_stats
+from app.utils.validators import validate_url, validate_selector, ValidationError as InputValidationError
 
 api_router = APIRouter()
 logger = logging.getLogger(__name__)
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Non-standard status for a request the client gave up on
+CLIENT_CLOSED_REQUEST = 499
+
+class ClientDisconnected(Exception):
+    """Raised when the client goes away before its scrape has finished"""
+    pass
+
+class AdmittedStreamingResponse(StreamingResponse):
+    """
+    Streaming response that holds an admission slot until it is done
+
+    The slot is released once the response has been sent or has failed,
+    including when sending fails before the body iterator starts, such as
+    when the client has already gone away.
+    """
+
+    def __init__(self, content: AsyncIterator[Any], started: float, **kwargs):
+        super().__init__(content, **kwargs)
+        self.started = started
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # A stream's duration says little about the next request's
+            admission.release(self.started, record=False)
+
+async def _ndjson_lines(items: AsyncIterator[Union[BaseModel, Dict[str, Any]]]) -> AsyncIterator[str]:
+    """Serialize models or dictionaries to newline-delimited JSON as they are produced"""
+    async for item in items:
+        if isinstance(item, BaseModel):
+            yield item.model_dump_json() + "\n"
+        else:
+            yield json.dumps(item) + "\n"
+
+async def _started(items: AsyncIterator[Any]) -> AsyncIterator[Any]:
+    """
+    Start an async iterator before the response is sent
+    
+    Pulls the first item up front so that errors opening the stream (bad
+    URL, HTTP error status) are raised while an error status can still be
+    returned. Errors after that end the stream early and are logged.
+    """
+    try:
+        first = await items.__anext__()
+    except StopAsyncIteration:
+        first = None
+        exhausted = True
+    else:
+        exhausted = False
+    
+    async def rest() -> AsyncIterator[Any]:
+        if exhausted:
+            return
+        yield first
+        try:
+            async for item in items:
+                yield item
+        except Exception as e:
+            logger.error(f"Streaming error: {str(e)}")
+    
+    return rest()
+
+async def _admit() -> float:
+    """
+    Admit a scrape request past admission control
+    
+    Returns:
+        The start time to release the request with
+    
+    Raises:
+        HTTPException: 503 with Retry-After if the request is shed
+    """
+    try:
+        return await admission.acquire()
+    except Overloaded as e:
+        logger.warning(f"Shedding request: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": e.retry_after_header}
+        )
+
+async def _unless_disconnected(http_request: Request, work: Awaitable[Any]) -> Any:
+    """
+    Await work, cancelling it if the client disconnects first
+    
+    Cancelling the scrape closes its HTTP fetch and drops any extraction
+    still queued, so the capacity goes to clients that are still waiting.
+    
+    Args:
+        http_request: The incoming request, polled for a disconnect
+        work: The scrape to run
+    
+    Returns:
+        The work's result
+    
+    Raises:
+        ClientDisconnected: If the client disconnected and the work was cancelled
+    """
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=settings.DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                raise ClientDisconnected("Client disconnected before the scrape finished")
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
 @api_router.get("/health")
 async def health_check():
     """Simple health check endpoint"""
@@ -30,28 +167,62 @@ async def health_check():
 @api_router.post("/scrape", response_model=ScraperResponse)
 async def scrape_url(
     request: ScraperRequest,
+    http_request: Request,
     background_tasks: BackgroundTasks,
+    stream: bool = Query(False, description="Stream crawled pages, or link/image records, as NDJSON as they are ready"),
     dependency=Depends(rate_limiter)
 ):
     """
     Scrape a URL and return structured data
     
     This endpoint extracts data from the specified URL using the configured scraper.
+    The fetch is non-blocking and extraction runs off the event loop, so one
+    slow target does not stall other requests on the worker.
     Rate limiting is applied to prevent overloading target websites.
+    
+    With ``config.follow_links`` the URL is crawled breadth-first up to
+    ``config.max_depth``; add ``stream=true`` to receive each crawled page
+    as an NDJSON line as soon as it is ready.
+    
+    For a single-page ``links`` or ``images`` scrape without a selector,
+    ``stream=true`` instead extracts records incrementally while the page
+    downloads and writes each one as an NDJSON line, so very large pages
+    are never held in memory.
+    
+    Requests beyond the admission queue, or expected to wait in it too
+    long, are rejected with a 503 and a ``Retry-After`` header. If the
+    client disconnects, the scrape is cancelled.
     """
+    started = await _admit()
+    streaming = False
+    record = True
     try:
-        # Validate URL
-        validate_url(request.url)
+        url = str(request.url)
+        
+        # Validate URL and selector
+        validate_url(url)
+        validate_selector(request.selector)
         
         # Create scraper instance with config
         scraper = WebScraper(
-            config=request.config if request.config else {},
+            config=request.config.model_dump(exclude_none=True) if request.config else {},
             selector=request.selector,
             scrape_type=request.scrape_type
         )
         
-        # Execute scraping
-        result = scraper.scrape(request.url)
+        # Streams stay admitted until the response body has been sent
+        if stream and scraper.follow_links:
+            pages = (CrawlPageResult(**page) async for page in scraper.acrawl(url))
+            streaming = True
+            return AdmittedStreamingResponse(_ndjson_lines(pages), started, media_type=NDJSON_MEDIA_TYPE)
+        
+        if stream and request.scrape_type in STREAMABLE_TYPES and not request.selector:
+            records = await _started(scraper.astream_records(url))
+            streaming = True
+            return AdmittedStreamingResponse(_ndjson_lines(records), started, media_type=NDJSON_MEDIA_TYPE)
+        
+        # Execute scraping without blocking the event loop
+        result = await _unless_disconnected(http_request, scraper.ascrape(url))
         
         # Add rate limit info to response headers
         response = ScraperResponse(
@@ -69,18 +240,201 @@ async def scrape_url(
         
         return response
         
-    except ValidationError as e:
+    except (ValidationError, InputValidationError) as e:
         logger.error(f"Validation error: {str(e)}")
+        # Rejected input says nothing about how long scrapes take
+        record = False
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Invalid request parameters: {str(e)}"
         )
+    except ExtractionQueueFull as e:
+        logger.warning(f"Extraction queue full: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
+    except ClientDisconnected as e:
+        logger.info(f"Cancelled scrape of {request.url}: {str(e)}")
+        record = False
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail=str(e))
+    except DeadlineExceeded as e:
+        logger.warning(f"Scrape deadline exceeded: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Scraping error: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to scrape URL: {str(e)}"
         )
+    finally:
+        if not streaming:
+            admission.release(started, record)
+
+@api_router.post("/scrape/batch", response_model=BatchScraperResponse)
+async def scrape_batch(
+    request: BatchScraperRequest,
+    http_request: Request,
+    stream: bool = Query(False, description="Stream results as NDJSON as they complete"),
+    dependency=Depends(rate_limiter)
+):
+    """
+    Scrape a list of URLs in one call
+    
+    Items run concurrently under a global and a per-host concurrency cap.
+    Each item reports its own success or failure, so one bad URL does not
+    fail the whole batch.
+    
+    With ``stream=true`` each item result is written as one NDJSON line as
+    soon as it completes (in completion order) instead of one JSON body at
+    the end.
+    
+    A batch takes one slot of admission control while it runs, and is
+    cancelled if the client disconnects.
+    """
+    if len(request.requests) > settings.BATCH_MAX_REQUESTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Batch too large. Maximum is {settings.BATCH_MAX_REQUESTS} requests."
+        )
+    
+    batch = BatchScraper(
+        max_concurrency=request.max_concurrency,
+        per_host_concurrency=request.per_host_concurrency
+    )
+    
+    started = await _admit()
+    if stream:
+        items = (BatchItemResult(**item) async for item in batch.iter_results(request.requests))
+        return AdmittedStreamingResponse(_ndjson_lines(items), started, media_type=NDJSON_MEDIA_TYPE)
+    
+    try:
+        results = await _unless_disconnected(http_request, batch.run(request.requests))
+    except ClientDisconnected as e:
+        logger.info(f"Cancelled batch of {len(request.requests)} scrapes: {str(e)}")
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail=str(e))
+    finally:
+        # A batch's duration depends on its size, not on the service time
+        admission.release(started, record=False)
+    
+    succeeded = sum(1 for item in results if item["success"])
+    return BatchScraperResponse(
+        success=True,
+        total=len(results),
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        results=results,
+        message="Batch scraping completed"
+    )
+
+def _job_info(job: Dict[str, Any]) -> JobInfo:
+    """Describe a stored job to API clients"""
+    request = job["request"]
+    config = request.get("config") or {}
+    max_pages = 1
+    if config.get("follow_links"):
+        max_pages = min(config.get("max_pages") or settings.JOB_MAX_PAGES, settings.JOB_MAX_PAGES)
+    return JobInfo(
+        id=job["id"],
+        status=job["status"],
+        url=request["url"],
+        created_at=job["created_at"],
+        started_at=job["started_at"],
+        finished_at=job["finished_at"],
+        pages_done=job["pages_done"],
+        pages_failed=job["pages_failed"],
+        max_pages=max_pages,
+        cancel_requested=job["cancel_requested"],
+        attempts=job["attempts"],
+        worker=job["worker"],
+        error=job["error"]
+    )
+
+async def _get_job(job_id: str) -> Dict[str, Any]:
+    """
+    Get a stored job
+    
+    Raises:
+        HTTPException: 404 if there is no such job
+    """
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job not found: {job_id}"
+        )
+    return job
+
+@api_router.post("/jobs", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(
+    request: ScraperRequest,
+    dependency=Depends(rate_limiter)
+):
+    """
+    Queue a scrape or crawl to run in the background
+    
+    Takes the same request as ``/scrape``. Crawls (``config.follow_links``)
+    may fetch up to ``JOB_MAX_PAGES`` pages. Poll ``/jobs/{job_id}`` for
+    progress and read results from ``/jobs/{job_id}/results`` as they are
+    produced.
+    """
+    try:
+        validate_url(str(request.url))
+        validate_selector(request.selector)
+    except InputValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid request parameters: {str(e)}"
+        )
+    
+    job = await asyncio.to_thread(job_store.create, request.model_dump(mode="json"))
+    job_runner.notify()
+    return JobResponse(success=True, job=_job_info(job), message="Job queued")
+
+@api_router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """Get the status and progress of a job"""
+    job = await _get_job(job_id)
+    return JobResponse(success=True, job=_job_info(job))
+
+@api_router.get("/jobs/{job_id}/results", response_model=JobResultsResponse)
+async def get_job_results(
+    job_id: str,
+    cursor: int = Query(0, ge=0, description="Position of the first result, from next_cursor"),
+    limit: int = Query(settings.JOB_RESULT_PAGE_SIZE, ge=1, le=1000, description="Maximum results to return")
+):
+    """
+    Get a page of a job's results
+    
+    Results can be read while the job is running. ``next_cursor`` is null
+    once every stored result has been read; a running job may store more.
+    """
+    job = await _get_job(job_id)
+    results, next_cursor = await asyncio.to_thread(job_store.results, job_id, cursor, limit)
+    return JobResultsResponse(
+        success=True,
+        job=_job_info(job),
+        results=results,
+        next_cursor=next_cursor
+    )
+
+@api_router.delete("/jobs/{job_id}", response_model=JobResponse)
+async def cancel_job(job_id: str):
+    """
+    Cancel a job
+    
+    A queued job is cancelled at once. A running job stops shortly after;
+    results it has already stored are kept.
+    """
+    await _get_job(job_id)
+    job = await asyncio.to_thread(job_store.cancel, job_id)
+    if job["status"] == RUNNING:
+        job_runner.cancel(job_id)
+    return JobResponse(success=True, job=_job_info(job), message="Cancellation requested")
 
 @api_router.get("/config", response_model=ScraperConfigResponse)
 async def get_scraper_config():
@@ -88,13 +442,16 @@ async def get_scraper_config():
     config = {
         "available_scrape_types": ["text", "tables", "links", "images", "full"],
         "rate_limit": {
-            "requests_per_minute": 10,
+            "requests_per_minute": settings.RATE_LIMIT_PER_MINUTE,
             "remaining": get_remaining_requests()
         },
         "supported_output_formats": ["json", "csv"],
+        "parser_backends": available_backends(),
         "default_config": {
             "follow_links": False,
             "max_depth": 1,
+            "max_pages": settings.CRAWL_MAX_PAGES,
+            "parser_backend": settings.HTML_PARSER_BACKEND,
             "timeout": 30,
             "user_agent": "WebScraper Bot 1.0"
         }
@@ -172,3 +529,23 @@ async def check_rate_limit():
     """Check current rate limit status"""
     remaining = get_remaining_requests()
     return {"remaining_requests": remaining}
+
+
+@api_router.get("/stats")
+async def get_stats():
+    """Get scraper runtime statistics"""
+    # Both read a database, so keep them off the event loop
+    jobs, cache = await asyncio.gather(
+        asyncio.to_thread(job_runner.stats),
+        asyncio.to_thread(http_cache.stats)
+    )
+    return {
+        "admission": admission.stats(),
+        "connection_pool": session_pool.stats(),
+        "host_scheduler": host_scheduler.stats(),
+        "jobs": jobs,
+        "http_cache": cache,
+        "coalescing": single_flight.stats(),
+        "selector_cache": get_selector_cache_stats(),
+        "extraction_pool": extraction_pool.stats(),
+    }
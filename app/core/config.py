@@ -1,13 +1,23 @@
 import os
 import logging
+import tempfile
 from typing import List, Optional, Dict, Any
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+def configure_logging(level: str = "INFO", force: bool = False) -> None:
+    """
+    Send log records to stderr in the app's format
+
+    Args:
+        level: Name of the lowest level to log, such as "INFO" or "DEBUG"
+        force: Replace any logging set up already, such as at import
+    """
+    logging.basicConfig(level=level.upper(), format=LOG_FORMAT, force=force)
+
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-)
+configure_logging()
 
 class Settings(BaseSettings):
     # Project settings
@@ -19,12 +29,104 @@ class Settings(BaseSettings):
     
     # Rate limiting
     RATE_LIMIT_PER_MINUTE: int = int(os.getenv("RATE_LIMIT_PER_MINUTE", "10"))
+    # "memory" (per process) or "sqlite" (shared by the workers on a node)
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_SQLITE_PATH: str = os.path.join(tempfile.gettempdir(), "web-scraper-rate-limit.sqlite3")
     
     # Scraper settings
     DEFAULT_USER_AGENT: str = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
     REQUEST_TIMEOUT: int = 30
     MAX_RETRIES: int = 3
     RETRY_DELAY: int = 2
+    # Total budget for a request and its retries, and the retry backoff cap
+    REQUEST_DEADLINE: float = 45.0
+    RETRY_BACKOFF_MAX: float = 10.0
+    RETRY_MIN_ATTEMPT_TIME: float = 1.0
+    
+    # HTTP cache settings
+    HTTP_CACHE_ENABLED: bool = True
+    HTTP_CACHE_PATH: str = os.path.join(tempfile.gettempdir(), "web-scraper-http-cache.sqlite3")
+    HTTP_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    
+    # Connection pool settings
+    POOL_MAXSIZE: int = 10
+    POOL_MAX_IDLE: int = 90
+    POOL_KEEP_ALIVE: bool = True
+    POOL_HOST_OVERRIDES: Dict[str, Dict[str, Any]] = {}
+    # Most hosts whose pool counters are kept; the least recently used are dropped beyond that
+    POOL_STATS_MAX_HOSTS: int = 10000
+    
+    # Outbound politeness settings, per target host
+    HOST_MAX_CONCURRENCY: int = 4
+    HOST_REQUESTS_PER_SECOND: float = 5.0
+    HOST_RESPECT_CRAWL_DELAY: bool = True
+    HOST_MAX_CRAWL_DELAY: float = 10.0
+    HOST_SCHEDULE_OVERRIDES: Dict[str, Dict[str, Any]] = {}
+    # Most hosts whose state is kept; idle ones are forgotten beyond that
+    HOST_STATE_MAX_HOSTS: int = 10000
+    # Hedged requests: a second attempt is sent when the first is slower
+    # than the host's HEDGE_QUANTILE latency, while the budget allows
+    HEDGE_ENABLED: bool = False
+    HEDGE_QUANTILE: float = 0.95
+    HEDGE_MIN_SAMPLES: int = 20
+    HEDGE_LATENCY_WINDOW: int = 200
+    HEDGE_BUDGET_RATIO: float = 0.1
+    HEDGE_BUDGET_BURST: float = 5.0
+    ROBOTS_TIMEOUT: int = 5
+    ROBOTS_TTL: int = 3600
+    
+    # Extraction settings
+    PARSER_WORKERS: int = 4
+    EXTRACTION_PROCESSES: int = 0
+    EXTRACTION_QUEUE_SIZE: int = 64
+    # Admission control in front of the scrape endpoints: requests beyond
+    # the queue, or expected to wait longer than the target, get a 503
+    ADMISSION_MAX_CONCURRENCY: int = 64
+    ADMISSION_MAX_QUEUE: int = 256
+    ADMISSION_TARGET_WAIT: float = 10.0
+    ADMISSION_EWMA_ALPHA: float = 0.2
+    # How often a waiting scrape checks whether its client has disconnected
+    DISCONNECT_POLL_INTERVAL: float = 0.5
+    HTML_PARSER_BACKEND: str = "auto"
+    SELECTOR_CACHE_SIZE: int = 256
+    STREAM_CHUNK_SIZE: int = 64 * 1024
+    
+    # Extraction cache settings
+    TREE_CACHE_MAX_BYTES: int = 128 * 1024 * 1024
+    TREE_CACHE_TTL: int = 30
+    RESULT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    RESULT_CACHE_TTL: int = 300
+    
+    # Batch scraping settings
+    BATCH_MAX_REQUESTS: int = 5000
+    BATCH_CONCURRENCY: int = 50
+    # Optional cap on a batch's requests per host, below HOST_MAX_CONCURRENCY
+    BATCH_PER_HOST_CONCURRENCY: Optional[int] = None
+    
+    # Crawl settings
+    CRAWL_MAX_PAGES: int = 100
+    CRAWL_CONCURRENCY: int = 10
+    # On-disk frontiers used by crawl jobs
+    FRONTIER_DIR: str = os.path.join(tempfile.gettempdir(), "webscraper-frontiers")
+    FRONTIER_BATCH_SIZE: int = 1000
+    
+    # Background job settings; JOB_WORKERS=0 runs no jobs in the web process
+    JOB_WORKERS: int = 2
+    JOB_STORE_PATH: str = os.path.join(tempfile.gettempdir(), "webscraper-jobs.sqlite")
+    JOB_MAX_PAGES: int = 10000
+    JOB_RESULT_BATCH: int = 50
+    JOB_RESULT_PAGE_SIZE: int = 100
+    JOB_POLL_INTERVAL: float = 1.0
+    JOB_RETENTION: int = 24 * 3600
+    # Job queue backend: "sqlite" (one node) or "redis" (several nodes)
+    JOB_BACKEND: str = "sqlite"
+    JOB_REDIS_URL: str = "redis://localhost:6379/0"
+    JOB_REDIS_PREFIX: str = "webscraper:"
+    # A worker's lease on a job expires unless renewed by a heartbeat;
+    # an expired job is taken over by another worker, up to JOB_MAX_ATTEMPTS runs
+    JOB_LEASE_SECONDS: float = 30.0
+    JOB_HEARTBEAT_INTERVAL: float = 10.0
+    JOB_MAX_ATTEMPTS: int = 3
     
     # Security settings
     CORS_ORIGINS: List[str] = ["*"]
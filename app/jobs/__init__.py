@@ -0,0 +1 @@
+# Jobs package initialization
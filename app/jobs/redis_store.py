@@ -0,0 +1,323 @@
+import json
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.jobs.store import FINISHED_STATUSES, QUEUED, RUNNING, lease_error, new_job_id
+
+# The scripts below build some job keys from ARGV prefixes (CLAIM cannot
+# know which job it leases before it runs), which Redis Cluster rejects
+# unless every key lives in one slot. The store therefore needs a single
+# Redis server.
+
+# Claims the oldest job whose lease expired, else the oldest queued job.
+# KEYS: queue, leases, finished, counts. ARGV: now, lease expiry, token,
+# worker, max attempts, job key prefix, lease error.
+# Returns {job id, status}, where a status other than running means the
+# job was closed instead of claimed and the caller should claim again.
+CLAIM_SCRIPT = """
+local id = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', '(' .. ARGV[1], 'LIMIT', 0, 1)[1]
+if id then
+    redis.call('ZREM', KEYS[2], id)
+else
+    id = redis.call('ZRANGE', KEYS[1], 0, 0)[1]
+    if not id then
+        return nil
+    end
+    redis.call('ZREM', KEYS[1], id)
+end
+
+local job = ARGV[6] .. id
+local attempts = redis.call('HINCRBY', job, 'attempts', 1)
+local status = nil
+if redis.call('HGET', job, 'cancel_requested') == '1' then
+    status = 'cancelled'
+elseif attempts > tonumber(ARGV[5]) then
+    status = 'failed'
+    redis.call('HSET', job, 'attempts', attempts - 1, 'error', ARGV[7])
+end
+if status then
+    redis.call('HSET', job, 'status', status, 'finished_at', ARGV[1])
+    redis.call('HDEL', job, 'lease_token')
+    redis.call('ZADD', KEYS[3], ARGV[1], id)
+    redis.call('HINCRBY', KEYS[4], status, 1)
+    return {id, status}
+end
+
+redis.call('HSET', job, 'status', 'running', 'started_at', ARGV[1], 'worker', ARGV[4],
+    'lease_token', ARGV[3])
+redis.call('ZADD', KEYS[2], ARGV[2], id)
+return {id, 'running'}
+"""
+
+# KEYS: job, leases. ARGV: token, lease expiry, id.
+# Returns -1 if the lease is lost, else the cancel_requested flag.
+HEARTBEAT_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'lease_token') ~= ARGV[1] then
+    return -1
+end
+redis.call('ZADD', KEYS[2], ARGV[2], ARGV[3])
+return tonumber(redis.call('HGET', KEYS[1], 'cancel_requested') or '0')
+"""
+
+# KEYS: job, results, result URLs. ARGV: token, then (url, result, failed)
+# for each result. Results for a URL already stored are skipped; an empty
+# URL is never deduplicated.
+# Returns -1 if the lease is lost, else the cancel_requested flag.
+ADD_RESULTS_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'lease_token') ~= ARGV[1] then
+    return -1
+end
+local added, failed = 0, 0
+for i = 2, #ARGV, 3 do
+    if ARGV[i] == '' or redis.call('SADD', KEYS[3], ARGV[i]) == 1 then
+        redis.call('RPUSH', KEYS[2], ARGV[i + 1])
+        added = added + 1
+        failed = failed + tonumber(ARGV[i + 2])
+    end
+end
+redis.call('HINCRBY', KEYS[1], 'pages_done', added)
+redis.call('HINCRBY', KEYS[1], 'pages_failed', failed)
+return tonumber(redis.call('HGET', KEYS[1], 'cancel_requested') or '0')
+"""
+
+# KEYS: job, queue, leases. ARGV: token, id.
+RELEASE_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'lease_token') ~= ARGV[1] then
+    return 0
+end
+redis.call('ZREM', KEYS[3], ARGV[2])
+redis.call('HINCRBY', KEYS[1], 'attempts', -1)
+redis.call('HDEL', KEYS[1], 'lease_token', 'worker', 'started_at')
+redis.call('HSET', KEYS[1], 'status', 'queued')
+redis.call('ZADD', KEYS[2], redis.call('HGET', KEYS[1], 'created_at'), ARGV[2])
+return 1
+"""
+
+# KEYS: job, leases, finished, counts. ARGV: token, id, status, now, error.
+FINISH_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'lease_token') ~= ARGV[1] then
+    return 0
+end
+redis.call('HDEL', KEYS[1], 'lease_token')
+redis.call('HSET', KEYS[1], 'status', ARGV[3], 'finished_at', ARGV[4], 'error', ARGV[5])
+redis.call('ZREM', KEYS[2], ARGV[2])
+redis.call('ZADD', KEYS[3], ARGV[4], ARGV[2])
+redis.call('HINCRBY', KEYS[4], ARGV[3], 1)
+return 1
+"""
+
+# KEYS: job, queue, finished, counts. ARGV: id, now.
+CANCEL_SCRIPT = """
+local status = redis.call('HGET', KEYS[1], 'status')
+if status == 'queued' then
+    redis.call('ZREM', KEYS[2], ARGV[1])
+    redis.call('HSET', KEYS[1], 'status', 'cancelled', 'finished_at', ARGV[2], 'cancel_requested', 1)
+    redis.call('ZADD', KEYS[3], ARGV[2], ARGV[1])
+    redis.call('HINCRBY', KEYS[4], 'cancelled', 1)
+elseif status == 'running' then
+    redis.call('HSET', KEYS[1], 'cancel_requested', 1)
+end
+return status
+"""
+
+# KEYS: finished, counts. ARGV: cutoff, job key prefix, results key
+# prefix, result URLs key prefix.
+PURGE_SCRIPT = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', '(' .. ARGV[1], 'LIMIT', 0, 1000)
+for _, id in ipairs(ids) do
+    local status = redis.call('HGET', ARGV[2] .. id, 'status')
+    if status then
+        redis.call('HINCRBY', KEYS[2], status, -1)
+    end
+    redis.call('DEL', ARGV[2] .. id, ARGV[3] .. id, ARGV[4] .. id)
+    redis.call('ZREM', KEYS[1], id)
+end
+return #ids
+"""
+
+def _optional_float(value: Optional[str]) -> Optional[float]:
+    return float(value) if value else None
+
+class RedisJobStore:
+    """
+    Durable state of background scrape jobs, stored in Redis
+
+    Same interface and lease semantics as JobStore, for workers spread
+    over several nodes. Each job is a hash with its results in a list;
+    queued jobs and leases are sorted sets scored by creation time and
+    lease expiry, and every state change that must be atomic runs as a
+    Lua script.
+
+    Only a single Redis server (with or without replicas) is supported,
+    not Redis Cluster: the scripts touch keys they are not passed in KEYS.
+    """
+
+    def __init__(self, url: str, prefix: str = "webscraper:"):
+        """
+        Initialize the store
+
+        Args:
+            url: Redis connection URL
+            prefix: Prefix of every key the store uses
+
+        Raises:
+            RuntimeError: If the redis package is not installed
+        """
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("JOB_BACKEND=redis needs the redis package (pip install .[redis])")
+
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self._queue = f"{prefix}jobs:queue"
+        self._leases = f"{prefix}jobs:leases"
+        self._finished = f"{prefix}jobs:finished"
+        self._counts = f"{prefix}jobs:finished_counts"
+        self._claim = self.client.register_script(CLAIM_SCRIPT)
+        self._heartbeat = self.client.register_script(HEARTBEAT_SCRIPT)
+        self._add_results = self.client.register_script(ADD_RESULTS_SCRIPT)
+        self._release = self.client.register_script(RELEASE_SCRIPT)
+        self._finish = self.client.register_script(FINISH_SCRIPT)
+        self._cancel = self.client.register_script(CANCEL_SCRIPT)
+        self._purge = self.client.register_script(PURGE_SCRIPT)
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.prefix}job:{job_id}"
+
+    def _results_key(self, job_id: str) -> str:
+        return f"{self.prefix}results:{job_id}"
+
+    def _result_urls_key(self, job_id: str) -> str:
+        return f"{self.prefix}result_urls:{job_id}"
+
+    def _job(self, job_id: str, fields: Dict[str, str]) -> Dict[str, Any]:
+        """Turn a job hash into a job dictionary"""
+        return {
+            "id": job_id,
+            "status": fields["status"],
+            "request": json.loads(fields["request"]),
+            "created_at": float(fields["created_at"]),
+            "started_at": _optional_float(fields.get("started_at")),
+            "finished_at": _optional_float(fields.get("finished_at")),
+            "pages_done": int(fields.get("pages_done", 0)),
+            "pages_failed": int(fields.get("pages_failed", 0)),
+            "error": fields.get("error") or None,
+            "cancel_requested": fields.get("cancel_requested") == "1",
+            "attempts": int(fields.get("attempts", 0)),
+            "worker": fields.get("worker"),
+        }
+
+    def create(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a new job; see JobStore.create"""
+        job_id = new_job_id()
+        now = time.time()
+        fields = {
+            "status": QUEUED,
+            "request": json.dumps(request),
+            "created_at": repr(now),
+            "pages_done": 0,
+            "pages_failed": 0,
+            "cancel_requested": 0,
+            "attempts": 0,
+        }
+        with self.client.pipeline() as pipe:
+            pipe.hset(self._job_key(job_id), mapping=fields)
+            pipe.zadd(self._queue, {job_id: now})
+            pipe.execute()
+        return self._job(job_id, {key: str(value) for key, value in fields.items()})
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job; see JobStore.get"""
+        fields = self.client.hgetall(self._job_key(job_id))
+        return self._job(job_id, fields) if fields else None
+
+    def claim(self, worker: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """Lease the next ready job; see JobStore.claim"""
+        while True:
+            now = time.time()
+            lease_token = uuid.uuid4().hex
+            claimed = self._claim(
+                keys=[self._queue, self._leases, self._finished, self._counts],
+                args=[repr(now), repr(now + lease_seconds), lease_token, worker,
+                      settings.JOB_MAX_ATTEMPTS, f"{self.prefix}job:", lease_error(settings.JOB_MAX_ATTEMPTS)]
+            )
+            if claimed is None:
+                return None
+            job_id, status = claimed
+            if status == RUNNING:
+                job = self.get(job_id)
+                job["lease_token"] = lease_token
+                return job
+
+    def heartbeat(self, job_id: str, lease_token: str, lease_seconds: float) -> bool:
+        """Extend a job's lease; see JobStore.heartbeat"""
+        flag = self._heartbeat(
+            keys=[self._job_key(job_id), self._leases],
+            args=[lease_token, repr(time.time() + lease_seconds), job_id]
+        )
+        return flag == 0
+
+    def add_results(self, job_id: str, lease_token: str, results: List[Dict[str, Any]]) -> bool:
+        """Append results to a running job; see JobStore.add_results"""
+        args = [lease_token]
+        for result in results:
+            args += [result.get("url") or "", json.dumps(result), 0 if result.get("success") else 1]
+        flag = self._add_results(
+            keys=[self._job_key(job_id), self._results_key(job_id), self._result_urls_key(job_id)],
+            args=args
+        )
+        return flag == 0
+
+    def release(self, job_id: str, lease_token: str) -> None:
+        """Give a running job back to the queue; see JobStore.release"""
+        self._release(
+            keys=[self._job_key(job_id), self._queue, self._leases],
+            args=[lease_token, job_id]
+        )
+
+    def finish(self, job_id: str, lease_token: str, status: str, error: Optional[str] = None) -> bool:
+        """Record that a job has finished; see JobStore.finish"""
+        return self._finish(
+            keys=[self._job_key(job_id), self._leases, self._finished, self._counts],
+            args=[lease_token, job_id, status, repr(time.time()), error or ""]
+        ) == 1
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancel a job; see JobStore.cancel"""
+        status = self._cancel(
+            keys=[self._job_key(job_id), self._queue, self._finished, self._counts],
+            args=[job_id, repr(time.time())]
+        )
+        return self.get(job_id) if status else None
+
+    def results(self, job_id: str, cursor: int = 0, limit: int = 100) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Read a page of a job's results; see JobStore.results"""
+        rows = self.client.lrange(self._results_key(job_id), cursor, cursor + limit)
+        next_cursor = cursor + limit if len(rows) > limit else None
+        return [json.loads(row) for row in rows[:limit]], next_cursor
+
+    def purge(self, older_than: float) -> int:
+        """Delete finished jobs and their results; see JobStore.purge"""
+        deleted = 0
+        while True:
+            count = self._purge(
+                keys=[self._finished, self._counts],
+                args=[repr(older_than), f"{self.prefix}job:", f"{self.prefix}results:", f"{self.prefix}result_urls:"]
+            )
+            deleted += count
+            if count < 1000:
+                return deleted
+
+    def stats(self) -> Dict[str, int]:
+        """Count jobs by status; see JobStore.stats"""
+        with self.client.pipeline() as pipe:
+            pipe.zcard(self._queue)
+            pipe.zcard(self._leases)
+            pipe.hgetall(self._counts)
+            queued, running, finished = pipe.execute()
+        counts = {QUEUED: queued, RUNNING: running}
+        counts.update({status: int(finished.get(status, 0)) for status in FINISHED_STATUSES})
+        return {status: count for status, count in counts.items() if count}
@@ -0,0 +1,292 @@
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.jobs.store import CANCELLED, FAILED, SUCCEEDED, job_store
+from app.models.schema import ScraperRequest
+from app.scraper.crawler import Crawler
+from app.scraper.frontier import DiskFrontier
+from app.scraper.session_pool import session_pool
+from app.scraper.scraper import WebScraper
+
+logger = logging.getLogger(__name__)
+
+class JobRunner:
+    """
+    Worker pool for background scrape jobs
+
+    Runs up to ``workers`` jobs at once on an event loop in its own thread,
+    so job work never competes with the web tier's event loop. Workers
+    lease jobs from the store and renew the lease with a heartbeat every
+    JOB_HEARTBEAT_INTERVAL seconds while a job runs. Results are written
+    back in batches of JOB_RESULT_BATCH pages (or every JOB_POLL_INTERVAL
+    seconds). A job stops when a heartbeat or a write finds it cancelled
+    or its lease taken over.
+
+    Crawls keep their frontier in FRONTIER_DIR, checkpointed after each
+    batch of results is written, so a crawl taken over or requeued on the
+    same node picks up where it stopped instead of starting again.
+
+    Any number of runners, in the API processes or in ``worker.py`` on
+    other nodes, can share one store; each job runs on one of them.
+    """
+
+    def __init__(self, store, workers: int):
+        """
+        Initialize the runner
+
+        Args:
+            store: Where jobs are claimed from and results written to, a
+                JobStore or RedisJobStore
+            workers: Maximum jobs run at once; 0 runs none
+        """
+        self.store = store
+        self.workers = workers
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._main_task: Optional[asyncio.Task] = None
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._stopping = False
+
+    def start(self) -> None:
+        """Start the workers in a background thread"""
+        if self.workers <= 0 or self._thread is not None:
+            return
+        self._stopping = False
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), name="job-runner", daemon=True)
+        self._thread.start()
+        ready.wait()
+        logger.info(f"Started job runner with {self.workers} workers")
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """
+        Stop the workers
+
+        Jobs still running are given back to the queue, for this or another
+        runner to start again.
+
+        Args:
+            timeout: Seconds to wait for the workers to stop
+        """
+        if self._thread is None:
+            return
+        self._stopping = True
+        self._loop.call_soon_threadsafe(self._main_task.cancel)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def notify(self) -> None:
+        """Wake an idle worker to look for a newly queued job"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def cancel(self, job_id: str) -> None:
+        """Cancel a job if it is running in this runner"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._cancel_task, job_id)
+
+    def _cancel_task(self, job_id: str) -> None:
+        task = self._tasks.get(job_id)
+        if task is not None:
+            task.cancel()
+
+    def _run(self, ready: threading.Event) -> None:
+        """Run the workers' event loop until stopped"""
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._wake = asyncio.Event()
+        self._main_task = loop.create_task(self._main())
+        ready.set()
+        try:
+            loop.run_until_complete(asyncio.gather(self._main_task, return_exceptions=True))
+        finally:
+            self._loop = None
+            loop.close()
+
+    async def _main(self) -> None:
+        tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        tasks.append(asyncio.create_task(self._purge_finished()))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await session_pool.aclose()
+
+    async def _worker(self) -> None:
+        """Claim and run jobs one at a time"""
+        while True:
+            self._wake.clear()
+            job = await asyncio.to_thread(self.store.claim, self.worker_id, settings.JOB_LEASE_SECONDS)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), settings.JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            task = asyncio.create_task(self._execute(job))
+            heartbeat = asyncio.create_task(self._heartbeat(job, task))
+            self._tasks[job["id"]] = task
+            try:
+                await asyncio.wait({task})
+            finally:
+                del self._tasks[job["id"]]
+                heartbeat.cancel()
+                if not task.done():
+                    task.cancel()
+                await asyncio.gather(task, heartbeat, return_exceptions=True)
+
+    async def _heartbeat(self, job: Dict[str, Any], task: asyncio.Task) -> None:
+        """Renew a job's lease until it finishes, cancelling it if it should stop"""
+        while True:
+            await asyncio.sleep(settings.JOB_HEARTBEAT_INTERVAL)
+            keep_running = await asyncio.to_thread(
+                self.store.heartbeat, job["id"], job["lease_token"], settings.JOB_LEASE_SECONDS
+            )
+            if not keep_running:
+                logger.info(f"Stopping job {job['id']}: cancelled or taken over")
+                task.cancel()
+                return
+
+    async def _purge_finished(self) -> None:
+        """Delete finished jobs, and frontiers left behind, once they are older than JOB_RETENTION"""
+        while True:
+            cutoff = time.time() - settings.JOB_RETENTION
+            deleted = await asyncio.to_thread(self.store.purge, cutoff)
+            if deleted:
+                logger.info(f"Purged {deleted} finished jobs")
+            await asyncio.to_thread(self._purge_frontiers, cutoff)
+            await asyncio.sleep(min(settings.JOB_RETENTION, 3600))
+
+    def _purge_frontiers(self, cutoff: float) -> None:
+        """Delete frontier files not written to since cutoff, such as those of jobs that failed over"""
+        try:
+            names = os.listdir(settings.FRONTIER_DIR)
+        except FileNotFoundError:
+            return
+        for name in names:
+            path = os.path.join(settings.FRONTIER_DIR, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    async def _single_page(self, scraper: WebScraper, url: str) -> AsyncIterator[Dict[str, Any]]:
+        """Scrape one page as a job's only result"""
+        data = await scraper.ascrape(url)
+        yield {"url": url, "depth": 0, "success": True, "data": data}
+
+    def _pages(
+        self, job_id: str, request: ScraperRequest
+    ) -> Tuple[AsyncIterator[Dict[str, Any]], Optional[DiskFrontier]]:
+        """
+        Start the scrape or crawl a job runs
+
+        Returns:
+            The job's page results, and the frontier a crawl runs from
+        """
+        config = request.config.model_dump(exclude_none=True) if request.config else {}
+        scraper = WebScraper(config=config, selector=request.selector, scrape_type=request.scrape_type)
+        url = str(request.url)
+        if not scraper.follow_links:
+            return self._single_page(scraper, url), None
+
+        frontier = DiskFrontier(os.path.join(settings.FRONTIER_DIR, f"{job_id}.sqlite"))
+        crawler = Crawler(
+            scraper,
+            max_depth=scraper.max_depth,
+            max_pages=config.get('max_pages', settings.JOB_MAX_PAGES),
+            same_host_only=scraper.same_host_only,
+            page_limit=settings.JOB_MAX_PAGES,
+            frontier=frontier
+        )
+        return crawler.crawl(url), frontier
+
+    async def _add_results(
+        self, job_id: str, lease_token: str, batch: List[Dict[str, Any]], frontier: Optional[DiskFrontier]
+    ) -> bool:
+        """Write a batch of results, then checkpoint the crawl's frontier past them"""
+        keep_running = await asyncio.to_thread(self.store.add_results, job_id, lease_token, batch)
+        if frontier is not None and keep_running:
+            # Only once the results are stored, so a resumed crawl never skips
+            # a page; a write refused for a lost lease stored nothing. The
+            # crawl is paused at a yield meanwhile, so nothing else touches
+            # the frontier while the thread commits it.
+            checkpoint = asyncio.ensure_future(asyncio.to_thread(frontier.checkpoint))
+            try:
+                await asyncio.shield(checkpoint)
+            except asyncio.CancelledError:
+                # Let the commit finish before the frontier is closed
+                await asyncio.gather(checkpoint, return_exceptions=True)
+                raise
+        return keep_running
+
+    async def _execute(self, job: Dict[str, Any]) -> None:
+        """Run a claimed job to completion, recording its outcome"""
+        job_id, lease_token = job["id"], job["lease_token"]
+        logger.info(f"Running job {job_id} (attempt {job['attempts']})")
+        status, error = SUCCEEDED, None
+        frontier = None
+        try:
+            pages, frontier = self._pages(job_id, ScraperRequest(**job["request"]))
+            batch: List[Dict[str, Any]] = []
+            flushed_at = time.monotonic()
+            async for page in pages:
+                batch.append(page)
+                if len(batch) >= settings.JOB_RESULT_BATCH or time.monotonic() - flushed_at >= settings.JOB_POLL_INTERVAL:
+                    keep_running = await self._add_results(job_id, lease_token, batch, frontier)
+                    batch, flushed_at = [], time.monotonic()
+                    if not keep_running:
+                        status = CANCELLED
+                        break
+            if batch:
+                await self._add_results(job_id, lease_token, batch, frontier)
+        except asyncio.CancelledError:
+            status = None if self._stopping else CANCELLED
+        except Exception as e:
+            logger.warning(f"Job {job_id} failed: {str(e)}")
+            status, error = FAILED, str(e)
+        finally:
+            # Recorded synchronously so it happens even while being cancelled.
+            # Both are no-ops if another worker has taken the job over.
+            finished = False
+            if status is None:
+                self.store.release(job_id, lease_token)
+                logger.info(f"Job {job_id} requeued")
+            else:
+                finished = self.store.finish(job_id, lease_token, status, error)
+                logger.info(f"Job {job_id} {status}")
+            if frontier is not None:
+                # Kept for whichever run of the job comes next
+                frontier.close(delete=finished)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get job counts
+
+        Returns:
+            Dictionary with the jobs in the store by status, the workers in
+            this process and how many jobs they are running
+        """
+        return {
+            **self.store.stats(),
+            "worker_id": self.worker_id,
+            "workers": self.workers if self._thread is not None else 0,
+            "running_here": len(self._tasks),
+        }
+
+# Runner started with the API, or by worker.py
+job_runner = JobRunner(job_store, settings.JOB_WORKERS)
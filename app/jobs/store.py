@@ -0,0 +1,425 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    request TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    pages_done INTEGER NOT NULL DEFAULT 0,
+    pages_failed INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_token TEXT,
+    lease_expires REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS job_results (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    url TEXT,
+    result TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+CREATE UNIQUE INDEX IF NOT EXISTS job_results_url ON job_results (job_id, url);
+"""
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+
+JOB_FIELDS = (
+    "id", "status", "request", "created_at", "started_at", "finished_at",
+    "pages_done", "pages_failed", "error", "cancel_requested", "attempts", "worker",
+)
+
+JOB_COLUMNS = ", ".join(JOB_FIELDS)
+
+def _job(row: Tuple) -> Dict[str, Any]:
+    """Turn a jobs row into a job dictionary"""
+    job = dict(zip(JOB_FIELDS, row))
+    job["request"] = json.loads(job["request"])
+    job["cancel_requested"] = bool(job["cancel_requested"])
+    return job
+
+def new_job_id() -> str:
+    """Generate a unique job ID"""
+    return uuid.uuid4().hex
+
+def lease_error(attempts: int) -> str:
+    """Error recorded for a job whose leases expired too often"""
+    return f"Gave up after {attempts} attempts: the worker running the job stopped responding"
+
+class JobStore:
+    """
+    Durable state of background scrape jobs, stored in SQLite
+
+    Keeps each job's request, status and progress, and the results it has
+    produced so far, numbered so they can be read page by page while the
+    job is still running.
+
+    A worker claims a job with a lease and must renew it with heartbeats.
+    If the lease runs out (the worker died or hung), the next claim takes
+    the job over and runs it again, up to JOB_MAX_ATTEMPTS times. Results
+    are kept across runs and stored at most once per page URL, so a rerun
+    (or a crawl resumed from its frontier) only adds the pages that are
+    missing. Writes from a worker that lost its lease are ignored. Several
+    processes on one node can share the database file; for several nodes
+    use the Redis backend.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the store
+
+        Args:
+            path: Path of the SQLite database file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database, once per process; the lock must be held"""
+        # Connections must not be shared with forked worker processes
+        if self._db is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(SCHEMA)
+            self._pid = os.getpid()
+        return self._db
+
+    def _transaction(self, func):
+        """Run func(db) in a write transaction; the lock must be held"""
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            result = func(db)
+            db.execute("COMMIT")
+            return result
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _holds_lease(db: sqlite3.Connection, job_id: str, lease_token: str) -> bool:
+        row = db.execute(
+            "SELECT 1 FROM jobs WHERE id = ? AND status = ? AND lease_token = ?",
+            (job_id, RUNNING, lease_token)
+        ).fetchone()
+        return row is not None
+
+    def create(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Queue a new job
+
+        Args:
+            request: The scrape request to run, as JSON-compatible data
+
+        Returns:
+            The new job
+        """
+        job_id = new_job_id()
+        with self._lock:
+            db = self._connection()
+            db.execute(
+                "INSERT INTO jobs (id, status, request, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, QUEUED, json.dumps(request), time.time())
+            )
+            row = db.execute(f"SELECT {JOB_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _job(row)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a job
+
+        Args:
+            job_id: The job's ID
+
+        Returns:
+            The job, or None if there is no such job
+        """
+        with self._lock:
+            row = self._connection().execute(
+                f"SELECT {JOB_COLUMNS} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return _job(row) if row else None
+
+    def claim(self, worker: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """
+        Lease the oldest queued job, or a running job whose lease expired
+
+        Args:
+            worker: Identifies the claiming worker
+            lease_seconds: How long the lease lasts without a heartbeat
+
+        Returns:
+            The claimed job with its ``lease_token``, or None if no job is
+            ready
+        """
+        def claim_next(db: sqlite3.Connection) -> Optional[Dict[str, Any]]:
+            now = time.time()
+            while True:
+                row = db.execute(
+                    f"SELECT {JOB_COLUMNS} FROM jobs "
+                    "WHERE status = ? OR (status = ? AND lease_expires < ?) "
+                    "ORDER BY created_at LIMIT 1",
+                    (QUEUED, RUNNING, now)
+                ).fetchone()
+                if row is None:
+                    return None
+
+                job = _job(row)
+                attempts = job["attempts"] + 1
+                if job["cancel_requested"] or attempts > settings.JOB_MAX_ATTEMPTS:
+                    # Taken over from a dead worker, but not worth running again
+                    status, error = (CANCELLED, None) if job["cancel_requested"] else (FAILED, lease_error(job["attempts"]))
+                    db.execute(
+                        "UPDATE jobs SET status = ?, error = ?, finished_at = ?, lease_token = NULL WHERE id = ?",
+                        (status, error, now, job["id"])
+                    )
+                    continue
+
+                lease_token = uuid.uuid4().hex
+                db.execute(
+                    "UPDATE jobs SET status = ?, started_at = ?, attempts = ?, worker = ?, "
+                    "lease_token = ?, lease_expires = ? WHERE id = ?",
+                    (RUNNING, now, attempts, worker, lease_token, now + lease_seconds, job["id"])
+                )
+                job.update(
+                    status=RUNNING, started_at=now, attempts=attempts, worker=worker,
+                    lease_token=lease_token
+                )
+                return job
+
+        with self._lock:
+            return self._transaction(claim_next)
+
+    def heartbeat(self, job_id: str, lease_token: str, lease_seconds: float) -> bool:
+        """
+        Extend a job's lease
+
+        Args:
+            job_id: The job's ID
+            lease_token: The token the job was claimed with
+            lease_seconds: How long the lease lasts from now
+
+        Returns:
+            Whether the job should keep running, False if the lease was
+            lost or the job has been asked to cancel
+        """
+        with self._lock:
+            db = self._connection()
+            updated = db.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND status = ? AND lease_token = ?",
+                (time.time() + lease_seconds, job_id, RUNNING, lease_token)
+            ).rowcount
+            if not updated:
+                return False
+            cancel_requested, = db.execute(
+                "SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return not cancel_requested
+
+    def add_results(self, job_id: str, lease_token: str, results: List[Dict[str, Any]]) -> bool:
+        """
+        Append results to a running job and count them towards its progress
+
+        A result for a URL the job already has a result for is skipped.
+
+        Args:
+            job_id: The job's ID
+            lease_token: The token the job was claimed with
+            results: Page results, each with a ``url`` and a ``success`` flag
+
+        Returns:
+            Whether the job should keep running, False if the lease was
+            lost (the results are then dropped) or the job has been asked
+            to cancel
+        """
+        def append(db: sqlite3.Connection) -> bool:
+            if not self._holds_lease(db, job_id, lease_token):
+                return False
+            pages_done, cancel_requested = db.execute(
+                "SELECT pages_done, cancel_requested FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            seq = pages_done
+            failed = 0
+            for result in results:
+                inserted = db.execute(
+                    "INSERT OR IGNORE INTO job_results (job_id, seq, url, result) VALUES (?, ?, ?, ?)",
+                    (job_id, seq, result.get("url"), json.dumps(result))
+                ).rowcount
+                if inserted:
+                    seq += 1
+                    failed += not result.get("success")
+            db.execute(
+                "UPDATE jobs SET pages_done = ?, pages_failed = pages_failed + ? WHERE id = ?",
+                (seq, failed, job_id)
+            )
+            return not cancel_requested
+
+        with self._lock:
+            return self._transaction(append)
+
+    def release(self, job_id: str, lease_token: str) -> None:
+        """
+        Give a running job back to the queue, such as when a worker shuts down
+
+        Its results so far are kept and the attempt is not counted.
+
+        Args:
+            job_id: The job's ID
+            lease_token: The token the job was claimed with
+        """
+        def requeue(db: sqlite3.Connection) -> None:
+            if not self._holds_lease(db, job_id, lease_token):
+                return
+            db.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts - 1, worker = NULL, started_at = NULL, "
+                "lease_token = NULL, lease_expires = NULL WHERE id = ?",
+                (QUEUED, job_id)
+            )
+
+        with self._lock:
+            self._transaction(requeue)
+
+    def finish(self, job_id: str, lease_token: str, status: str, error: Optional[str] = None) -> bool:
+        """
+        Record that a job has finished, if the lease is still held
+
+        Args:
+            job_id: The job's ID
+            lease_token: The token the job was claimed with
+            status: One of FINISHED_STATUSES
+            error: Why the job failed, if it did
+
+        Returns:
+            Whether the job was finished, False if the lease was lost
+        """
+        with self._lock:
+            updated = self._connection().execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, error = ?, lease_token = NULL "
+                "WHERE id = ? AND status = ? AND lease_token = ?",
+                (status, time.time(), error, job_id, RUNNING, lease_token)
+            ).rowcount
+        return bool(updated)
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Cancel a job
+
+        A queued job is cancelled at once; a running one is flagged and
+        stops at its next heartbeat or progress update.
+
+        Args:
+            job_id: The job's ID
+
+        Returns:
+            The job after the change, or None if there is no such job
+        """
+        def flag(db: sqlite3.Connection) -> Optional[Tuple]:
+            db.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, cancel_requested = 1 "
+                "WHERE id = ? AND status = ?",
+                (CANCELLED, time.time(), job_id, QUEUED)
+            )
+            db.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?",
+                (job_id, RUNNING)
+            )
+            return db.execute(f"SELECT {JOB_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+        with self._lock:
+            row = self._transaction(flag)
+        return _job(row) if row else None
+
+    def results(self, job_id: str, cursor: int = 0, limit: int = 100) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Read a page of a job's results
+
+        Args:
+            job_id: The job's ID
+            cursor: Position of the first result to read
+            limit: Maximum number of results to read
+
+        Returns:
+            The results and the cursor of the next page, or None if there
+            are no more results yet
+        """
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT seq, result FROM job_results WHERE job_id = ? AND seq >= ? ORDER BY seq LIMIT ?",
+                (job_id, cursor, limit + 1)
+            ).fetchall()
+        next_cursor = rows[limit][0] if len(rows) > limit else None
+        return [json.loads(result) for _, result in rows[:limit]], next_cursor
+
+    def purge(self, older_than: float) -> int:
+        """
+        Delete finished jobs and their results
+
+        Args:
+            older_than: Delete jobs that finished before this time
+
+        Returns:
+            Number of jobs deleted
+        """
+        placeholders = ", ".join("?" for _ in FINISHED_STATUSES)
+        condition = f"status IN ({placeholders}) AND finished_at < ?"
+        params = (*FINISHED_STATUSES, older_than)
+
+        def delete(db: sqlite3.Connection) -> int:
+            db.execute(
+                f"DELETE FROM job_results WHERE job_id IN (SELECT id FROM jobs WHERE {condition})",
+                params
+            )
+            return db.execute(f"DELETE FROM jobs WHERE {condition}", params).rowcount
+
+        with self._lock:
+            return self._transaction(delete)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Count jobs by status
+
+        Returns:
+            Dictionary of {status: number of jobs}
+        """
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall()
+        return {status: count for status, count in rows}
+
+def create_job_store():
+    """Create the job store configured by the JOB_BACKEND setting"""
+    if settings.JOB_BACKEND == "sqlite":
+        return JobStore(settings.JOB_STORE_PATH)
+    if settings.JOB_BACKEND == "redis":
+        from app.jobs.redis_store import RedisJobStore
+        return RedisJobStore(settings.JOB_REDIS_URL, settings.JOB_REDIS_PREFIX)
+    raise ValueError(f"Unknown job backend: {settings.JOB_BACKEND}")
+
+# Shared store used by the API and the job runner
+job_store = create_job_store()
@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Dict, List, Optional, Any, Union
 from enum import Enum
 from pydantic import BaseModel, Field, HttpUrl, model_validator
@@ -10,15 +11,29 @@ class ScrapeType(str, Enum):
     IMAGES = "images"
     FULL = "full"
 
+class ParserBackend(str, Enum):
+    """HTML parser backend used to build the document tree"""
+    AUTO = "auto"
+    LXML = "lxml"
+    HTML5_PARSER = "html5-parser"
+    HTML5LIB = "html5lib"
+    HTML_PARSER = "html.parser"
+
 class ScraperConfig(BaseModel):
     """Configuration options for the scraper"""
     follow_links: bool = Field(False, description="Whether to follow links on the page")
-    max_depth: int = Field(1, description="Maximum depth for following links")
+    max_depth: int = Field(1, ge=0, description="Maximum depth for following links")
+    max_pages: Optional[int] = Field(None, ge=1, description="Maximum number of pages to crawl when following links")
+    same_host_only: bool = Field(True, description="Only follow links on the same host as the URL")
     timeout: int = Field(30, description="Request timeout in seconds")
+    deadline: Optional[float] = Field(None, gt=0, description="Total time budget in seconds for the request and its retries")
+    hedge: Optional[bool] = Field(None, description="Send a second attempt when the first is slow, defaults to the server setting")
+    hedge_delay: Optional[float] = Field(None, gt=0, description="Seconds before hedging, defaults to the host's observed latency quantile")
     user_agent: Optional[str] = Field(None, description="Custom user agent string")
     headers: Optional[Dict[str, str]] = Field(None, description="Custom HTTP headers")
     cookies: Optional[Dict[str, str]] = Field(None, description="Custom cookies")
     proxies: Optional[Dict[str, str]] = Field(None, description="Proxy configuration")
+    parser_backend: Optional[ParserBackend] = Field(None, description="HTML parser backend, defaults to the server setting")
 
 class ScraperRequest(BaseModel):
     """Request model for the scraper endpoint"""
@@ -43,6 +58,12 @@ class ScraperRequest(BaseModel):
         }
     }
 
+class BatchScraperRequest(BaseModel):
+    """Request model for the batch scraper endpoint"""
+    requests: List[ScraperRequest] = Field(..., min_length=1, description="The scrape requests to run")
+    max_concurrency: Optional[int] = Field(None, ge=1, description="Maximum number of scrapes in flight")
+    per_host_concurrency: Optional[int] = Field(None, ge=1, description="Lower cap than the host scheduler's on scrapes in flight per host")
+
 class ScrapeResult(BaseModel):
     """Result of a scraping operation"""
     url: HttpUrl
@@ -60,6 +81,63 @@ class ScraperResponse(BaseResponse):
     url: HttpUrl
     data: Any
 
+class BatchItemResult(BaseModel):
+    """Result of a single item in a batch scrape"""
+    index: int
+    url: HttpUrl
+    success: bool
+    data: Any = None
+    error: Optional[str] = None
+
+class CrawlPageResult(BaseModel):
+    """Result of a single page in a crawl"""
+    url: HttpUrl
+    depth: int
+    success: bool
+    data: Any = None
+    error: Optional[str] = None
+
+class BatchScraperResponse(BaseResponse):
+    """Response model for the batch scraper endpoint"""
+    total: int
+    succeeded: int
+    failed: int
+    results: List[BatchItemResult]
+
+class JobStatus(str, Enum):
+    """Lifecycle state of a background job"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+class JobInfo(BaseModel):
+    """Status and progress of a background job"""
+    id: str
+    status: JobStatus
+    url: HttpUrl
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    pages_done: int = Field(0, description="Pages scraped so far, successful or not")
+    pages_failed: int = Field(0, description="Pages that could not be scraped")
+    max_pages: int = Field(1, description="Most pages the job will scrape")
+    cancel_requested: bool = False
+    attempts: int = Field(0, description="Times the job has been started, including takeovers after a worker failed")
+    worker: Optional[str] = Field(None, description="The worker that last ran the job")
+    error: Optional[str] = None
+
+class JobResponse(BaseResponse):
+    """Response model for the job endpoints"""
+    job: JobInfo
+
+class JobResultsResponse(BaseResponse):
+    """A page of a job's results"""
+    job: JobInfo
+    results: List[CrawlPageResult]
+    next_cursor: Optional[int] = Field(None, description="Cursor of the next page, if more results are stored")
+
 class ScraperConfigResponse(BaseResponse):
     """Response model for the config endpoint"""
     config: Dict[str, Any]
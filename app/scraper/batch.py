@@ -0,0 +1,114 @@
+import asyncio
+import logging
+from typing import Dict, Any, AsyncIterator, List, Optional
+
+from app.core.config import settings
+from app.models.schema import ScraperRequest
+from app.scraper.scraper import WebScraper
+from app.utils.validators import validate_url, validate_selector
+
+logger = logging.getLogger(__name__)
+
+class BatchScraper:
+    """
+    Runs many scrape requests concurrently
+    
+    Concurrency is bounded by a global cap. Requests to each host go
+    through the shared host scheduler like any other scrape, so a large
+    batch against one site stays within that host's limits; a batch may
+    ask for a lower per-host cap, which the scheduler applies. All items
+    share the process-wide connection pool and parser executor.
+    """
+    
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        per_host_concurrency: Optional[int] = None
+    ):
+        """
+        Initialize the batch scraper
+        
+        Args:
+            max_concurrency: Maximum number of scrapes in flight, capped by settings
+            per_host_concurrency: Optional lower cap on requests in flight per host,
+                capped by settings; by default the host scheduler's limit applies
+        """
+        self.max_concurrency = min(
+            max_concurrency or settings.BATCH_CONCURRENCY,
+            settings.BATCH_CONCURRENCY
+        )
+        caps = [cap for cap in (per_host_concurrency, settings.BATCH_PER_HOST_CONCURRENCY) if cap]
+        self.per_host_concurrency = min(caps) if caps else None
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+    
+    async def _scrape_item(self, index: int, request: ScraperRequest) -> Dict[str, Any]:
+        """
+        Scrape a single batch item, capturing any failure in the result
+        
+        Args:
+            index: Position of the item in the batch
+            request: The scrape request
+            
+        Returns:
+            Dictionary describing the item's success or failure
+        """
+        url = str(request.url)
+        
+        async with self._semaphore:
+            try:
+                validate_url(url)
+                validate_selector(request.selector)
+                
+                config = request.config.model_dump(exclude_none=True) if request.config else {}
+                if self.per_host_concurrency:
+                    config['host_concurrency'] = self.per_host_concurrency
+                scraper = WebScraper(
+                    config=config,
+                    selector=request.selector,
+                    scrape_type=request.scrape_type
+                )
+                result = await scraper.ascrape(url)
+                
+                return {"index": index, "url": url, "success": True, "data": result}
+            
+            except Exception as e:
+                logger.warning(f"Batch item {index} ({url}) failed: {str(e)}")
+                return {"index": index, "url": url, "success": False, "error": str(e)}
+    
+    async def iter_results(self, requests: List[ScraperRequest]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Scrape every request in the batch, yielding each result as soon as it is ready
+        
+        Results arrive in completion order, not request order. If the
+        consumer stops early, the remaining scrapes are cancelled.
+        
+        Args:
+            requests: The scrape requests
+            
+        Yields:
+            Per-item results
+        """
+        tasks = [
+            asyncio.create_task(self._scrape_item(i, request))
+            for i, request in enumerate(requests)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    async def run(self, requests: List[ScraperRequest]) -> List[Dict[str, Any]]:
+        """
+        Scrape every request in the batch
+        
+        Args:
+            requests: The scrape requests
+            
+        Returns:
+            Per-item results in request order
+        """
+        results = [item async for item in self.iter_results(requests)]
+        return sorted(results, key=lambda item: item["index"])
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from app.core.config import settings
+from app.scraper.frontier import Frontier, canonicalize_url
+
+logger = logging.getLogger(__name__)
+
+class Crawler:
+    """
+    Breadth-first crawler built on a WebScraper
+
+    Starting from a seed URL, pages are fetched concurrently and the links
+    extracted from each page are fed into a deduplicated frontier until
+    ``max_depth`` or ``max_pages`` is reached. Per-host politeness
+    (concurrency, request spacing and robots.txt Crawl-delay) is left to
+    the shared host_scheduler that every request of the scraper goes
+    through.
+    """
+
+    def __init__(
+        self,
+        scraper,
+        max_depth: int = 1,
+        max_pages: Optional[int] = None,
+        same_host_only: bool = True,
+        concurrency: Optional[int] = None,
+        page_limit: Optional[int] = None,
+        frontier=None
+    ):
+        """
+        Initialize the crawler
+
+        Args:
+            scraper: The WebScraper used to fetch and extract each page
+            max_depth: Maximum link depth to follow from the seed URL
+            max_pages: Maximum number of pages to fetch
+            same_host_only: Only follow links on the seed URL's host
+            concurrency: Maximum number of pages fetched at once
+            page_limit: Upper bound on max_pages, CRAWL_MAX_PAGES by default
+            frontier: Frontier to crawl from, such as a DiskFrontier to resume;
+                a new in-memory Frontier by default
+        """
+        self.scraper = scraper
+        self.max_depth = max_depth
+        page_limit = page_limit or settings.CRAWL_MAX_PAGES
+        self.max_pages = min(max_pages or page_limit, page_limit)
+        self.same_host_only = same_host_only
+        self.concurrency = concurrency or settings.CRAWL_CONCURRENCY
+
+        self.frontier = frontier if frontier is not None else Frontier()
+        self._seed_host: Optional[str] = None
+
+    async def _fetch_page(self, url: str, depth: int) -> Tuple[Dict[str, Any], List[Dict[str, str]]]:
+        """
+        Fetch and extract a single page
+
+        Args:
+            url: The canonical URL to fetch
+            depth: Link depth of the page from the seed URL
+
+        Returns:
+            The page result and the links found on the page
+        """
+        try:
+            data, links = await self.scraper.afetch_page(url)
+        except Exception as e:
+            logger.warning(f"Crawl of {url} failed: {str(e)}")
+            return {"url": url, "depth": depth, "success": False, "error": str(e)}, []
+
+        return {"url": url, "depth": depth, "success": True, "data": data}, links
+
+    def _enqueue_links(self, page_url: str, links: List[Dict[str, str]], depth: int) -> None:
+        """Canonicalize extracted links and add the crawlable ones to the frontier"""
+        urls = []
+        for link in links:
+            url = canonicalize_url(link["url"], base=page_url)
+            if url is None:
+                continue
+            if self.same_host_only and urlparse(url).hostname != self._seed_host:
+                continue
+            urls.append(url)
+        self.frontier.extend(urls, depth)
+
+    async def crawl(self, seed_url: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Crawl from a seed URL, yielding each page result as soon as it is ready
+
+        With a resumed frontier the crawl carries on where it stopped, and
+        pages it already completed count towards max_pages.
+
+        Args:
+            seed_url: The URL to start crawling from
+
+        Yields:
+            Page results with the page URL, depth and extracted data or error
+        """
+        seed = canonicalize_url(seed_url)
+        if seed is None:
+            raise ValueError(f"Invalid URL: {seed_url}")
+        self._seed_host = urlparse(seed).hostname
+        self.frontier.add(seed, 0)
+
+        scheduled = self.frontier.completed
+        pending = set()
+        try:
+            while True:
+                while self.frontier and len(pending) < self.concurrency and scheduled < self.max_pages:
+                    url, depth = self.frontier.pop()
+                    pending.add(asyncio.create_task(self._fetch_page(url, depth)))
+                    scheduled += 1
+
+                if not pending:
+                    break
+
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    page, links = task.result()
+                    if links and page["depth"] < self.max_depth:
+                        self._enqueue_links(page["url"], links, page["depth"] + 1)
+                    self.frontier.complete(page["url"])
+                    yield page
+        finally:
+            for task in pending:
+                task.cancel()
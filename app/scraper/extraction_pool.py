@@ -0,0 +1,368 @@
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import pickle
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Hashable, Optional
+
+from bs4.dammit import UnicodeDammit
+
+from app.core.config import settings
+from app.scraper.html_parser import HTMLParser
+from app.scraper.parser_backends import resolve_backend
+from app.utils.cache import MemoryLRUCache
+
+logger = logging.getLogger(__name__)
+
+# Rough memory used by a parsed tree per character of HTML, for sizing the tree cache
+TREE_BYTES_PER_CHAR = 40
+
+# Recently parsed documents of this process, so repeat extractions skip parsing.
+# Structure: {(digest, encoding, backend, parse_only): HTMLParser}
+tree_cache = MemoryLRUCache(settings.TREE_CACHE_MAX_BYTES, settings.TREE_CACHE_TTL)
+
+class ExtractionQueueFull(Exception):
+    """Raised when the extraction queue has no free slots"""
+    pass
+
+def charset_from_content_type(content_type: Optional[str]) -> Optional[str]:
+    """
+    Get the charset declared in a Content-Type header
+
+    Args:
+        content_type: The Content-Type header value
+
+    Returns:
+        The charset, or None if the header does not declare one
+    """
+    if not content_type:
+        return None
+    for param in content_type.split(";")[1:]:
+        key, _, value = param.partition("=")
+        if key.strip().lower() == "charset" and value.strip():
+            return value.strip().strip("\"'")
+    return None
+
+def decode_html(content: bytes, encoding: Optional[str] = None) -> str:
+    """
+    Decode a raw HTML body
+
+    Uses the declared encoding when there is one, otherwise detects it from
+    the markup (meta charset, BOM) and the bytes themselves.
+
+    Args:
+        content: The raw response body
+        encoding: The charset declared by the response, if any
+
+    Returns:
+        The decoded HTML
+    """
+    if encoding:
+        try:
+            return content.decode(encoding)
+        except (LookupError, UnicodeDecodeError):
+            pass
+    markup = UnicodeDammit(content, [encoding] if encoding else [], is_html=True).unicode_markup
+    return markup if markup is not None else content.decode("utf-8", errors="replace")
+
+def content_digest(content: bytes) -> bytes:
+    """Hash a response body for use in cache keys"""
+    return hashlib.blake2b(content, digest_size=16).digest()
+
+def _parsed_document(
+    scraper,
+    content: bytes,
+    encoding: Optional[str],
+    digest: bytes,
+    with_links: bool
+) -> HTMLParser:
+    """
+    Get a parser for a page, reusing a cached tree of the same content
+
+    A cached tree of the whole document serves any scrape type, a cached
+    partial tree only scrapes that keep the same tags.
+    """
+    backend = resolve_backend(scraper.parser_backend)
+    parse_only = scraper._parse_only(with_links)
+
+    key = (digest, encoding, backend, None)
+    document = tree_cache.get(key)
+    if document is None and parse_only:
+        key = (digest, encoding, backend, tuple(parse_only))
+        document = tree_cache.get(key)
+
+    if document is None:
+        html_content = decode_html(content, encoding)
+        document = HTMLParser(html_content, backend=backend, parse_only=parse_only)
+        tree_cache.set(key, document, len(html_content) * TREE_BYTES_PER_CHAR)
+
+    return document.with_selector(scraper.selector) if scraper.selector else document
+
+def run_extraction(
+    content: bytes,
+    encoding: Optional[str],
+    options: Dict[str, Any],
+    digest: Optional[bytes] = None
+) -> Any:
+    """
+    Decode, parse and extract a page
+
+    Args:
+        content: The raw response body
+        encoding: The charset declared by the response, if any
+        options: Scraper options (scrape_type, selector, parser_backend,
+            with_links)
+        digest: The content_digest of the body, if already computed
+
+    Returns:
+        The extracted data, or ``[data, links]`` when with_links is set
+    """
+    # Imported here so worker processes do not import the scraper at
+    # module load and the scraper can import this module
+    from app.scraper.scraper import WebScraper
+
+    scraper = WebScraper(
+        config={"parser_backend": options.get("parser_backend")},
+        selector=options.get("selector"),
+        scrape_type=options["scrape_type"]
+    )
+    with_links = bool(options.get("with_links"))
+    parser = _parsed_document(
+        scraper, content, encoding, digest or content_digest(content), with_links
+    )
+
+    if with_links:
+        return list(scraper._extract_data_and_links(parser))
+    return scraper._extract_data(parser)
+
+def _run_extraction_serialized(
+    content: bytes,
+    encoding: Optional[str],
+    options: Dict[str, Any],
+    digest: Optional[bytes] = None
+) -> bytes:
+    """
+    Run an extraction in a worker process and return the result pickled
+
+    Pickled rather than JSON so results keep their exact shape, such as the
+    integer column keys of table rows, whichever mode the pool runs in.
+    """
+    result = run_extraction(content, encoding, options, digest)
+    return pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+
+class ExtractionPool:
+    """
+    Bounded pool that runs HTML extraction off the calling thread
+
+    With ``EXTRACTION_PROCESSES`` > 0, extraction runs in a pool of worker
+    processes so CPU-bound parsing scales across cores instead of holding
+    the GIL of the web worker. Inputs are raw response bytes and results
+    come back pickled. With 0 processes, extraction runs on a
+    thread pool of ``PARSER_WORKERS`` threads.
+
+    At most ``workers + EXTRACTION_QUEUE_SIZE`` extractions can be queued
+    or running; further submissions raise ExtractionQueueFull.
+
+    Results are cached by a hash of the content plus the extraction
+    options, so extracting the same page the same way again skips the
+    workers entirely. Each worker also keeps recently parsed trees, so a
+    different extraction of the same page skips the parse.
+    """
+
+    def __init__(
+        self,
+        processes: int = 0,
+        threads: int = 4,
+        queue_size: int = 64,
+        result_cache_bytes: int = 0,
+        result_cache_ttl: float = 0
+    ):
+        """
+        Initialize the pool
+
+        Args:
+            processes: Number of worker processes, 0 to use threads
+            threads: Number of worker threads when not using processes
+            queue_size: Number of extractions that may wait for a worker
+            result_cache_bytes: Memory budget of the result cache, 0 to disable it
+            result_cache_ttl: Seconds a cached result stays valid
+        """
+        self.processes = processes
+        self.workers = processes or threads
+        self.queue_size = queue_size
+        self._slots = threading.BoundedSemaphore(self.workers + queue_size)
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        # Pickled results, as returned by worker processes
+        self.result_cache = MemoryLRUCache(result_cache_bytes, result_cache_ttl)
+
+    def _get_executor(self) -> Executor:
+        """Create the executor on first use"""
+        with self._lock:
+            if self._executor is None:
+                if self.processes:
+                    # Spawn rather than fork: web workers run threads, and
+                    # forking a threaded process can deadlock the child
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.processes,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers,
+                        thread_name_prefix="html-parser",
+                    )
+            return self._executor
+
+    def submit(
+        self,
+        content: bytes,
+        encoding: Optional[str],
+        options: Dict[str, Any],
+        digest: Optional[bytes] = None
+    ) -> Future:
+        """
+        Queue an extraction, bypassing the result cache
+
+        Args:
+            content: The raw response body
+            encoding: The charset declared by the response, if any
+            options: Scraper options passed to run_extraction
+            digest: The content_digest of the body, if already computed
+
+        Returns:
+            A future resolving to the extraction result (pickled bytes
+            when running in processes)
+
+        Raises:
+            ExtractionQueueFull: If the queue has no free slots
+        """
+        if not self._slots.acquire(blocking=False):
+            raise ExtractionQueueFull("Extraction queue is full, try again later")
+
+        try:
+            func = _run_extraction_serialized if self.processes else run_extraction
+            future = self._get_executor().submit(func, content, encoding, options, digest)
+        except Exception:
+            self._slots.release()
+            raise
+
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    @staticmethod
+    def _result_key(digest: bytes, encoding: Optional[str], options: Dict[str, Any]) -> Hashable:
+        """Build the result cache key for a page and extraction options"""
+        scrape_type = options["scrape_type"]
+        return (
+            digest,
+            encoding,
+            getattr(scrape_type, "value", scrape_type),
+            options.get("selector"),
+            resolve_backend(options.get("parser_backend")),
+            bool(options.get("with_links")),
+        )
+
+    def _cached_result(self, key: Hashable) -> Any:
+        """Get a result from the cache, or None if it is not cached"""
+        serialized = self.result_cache.get(key)
+        if serialized is None:
+            return None
+        return pickle.loads(serialized)
+
+    def _store_result(self, key: Hashable, value: Any) -> Any:
+        """Cache the value a worker returned and get the extraction result from it"""
+        if self.processes:
+            self.result_cache.set(key, value, len(value))
+            return pickle.loads(value)
+
+        if self.result_cache.max_bytes:
+            serialized = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            self.result_cache.set(key, serialized, len(serialized))
+        return value
+
+    def extract(
+        self,
+        content: bytes,
+        encoding: Optional[str],
+        options: Dict[str, Any]
+    ) -> Any:
+        """
+        Run an extraction and wait for the result
+
+        Args:
+            content: The raw response body
+            encoding: The charset declared by the response, if any
+            options: Scraper options passed to run_extraction
+
+        Returns:
+            The extraction result
+        """
+        digest = content_digest(content)
+        key = self._result_key(digest, encoding, options)
+        result = self._cached_result(key)
+        if result is not None:
+            return result
+
+        value = self.submit(content, encoding, options, digest).result()
+        return self._store_result(key, value)
+
+    async def aextract(
+        self,
+        content: bytes,
+        encoding: Optional[str],
+        options: Dict[str, Any]
+    ) -> Any:
+        """
+        Run an extraction without blocking the event loop
+
+        Cancelling the call cancels the extraction too if it is still
+        queued; one already running finishes in its worker.
+
+        Args:
+            content: The raw response body
+            encoding: The charset declared by the response, if any
+            options: Scraper options passed to run_extraction
+
+        Returns:
+            The extraction result
+        """
+        digest = content_digest(content)
+        key = self._result_key(digest, encoding, options)
+        result = self._cached_result(key)
+        if result is not None:
+            return result
+
+        future = self.submit(content, encoding, options, digest)
+        return self._store_result(key, await asyncio.wrap_future(future))
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the pool's mode, capacity and cache statistics"""
+        stats = {
+            "mode": "processes" if self.processes else "threads",
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "result_cache": self.result_cache.stats(),
+        }
+        # Worker processes each keep their own tree cache
+        if not self.processes:
+            stats["tree_cache"] = tree_cache.stats()
+        return stats
+
+    def shutdown(self) -> None:
+        """Shut down the worker pool"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+# Shared pool used by the API and Flask front ends
+extraction_pool = ExtractionPool(
+    processes=settings.EXTRACTION_PROCESSES,
+    threads=settings.PARSER_WORKERS,
+    queue_size=settings.EXTRACTION_QUEUE_SIZE,
+    result_cache_bytes=settings.RESULT_CACHE_MAX_BYTES,
+    result_cache_ttl=settings.RESULT_CACHE_TTL,
+)
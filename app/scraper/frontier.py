@@ -0,0 +1,352 @@
+import hashlib
+import os
+import sqlite3
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urljoin, urlparse, urlunparse
+
+from app.core.config import settings
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+def canonicalize_url(url: str, base: Optional[str] = None) -> Optional[str]:
+    """
+    Canonicalize a URL so equivalent URLs compare equal
+
+    Resolves relative URLs against ``base``, lowercases the scheme and host,
+    drops default ports and fragments, and normalizes an empty path to ``/``.
+
+    Args:
+        url: The URL (absolute or relative) to canonicalize
+        base: Optional base URL to resolve relative URLs against
+
+    Returns:
+        The canonical URL, or None if it is not an HTTP(S) URL
+    """
+    if base:
+        url = urljoin(base, url.strip())
+
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parsed.hostname:
+        return None
+
+    netloc = parsed.hostname.lower()
+    try:
+        port = parsed.port
+    except ValueError:
+        return None
+    if port and port != DEFAULT_PORTS[scheme]:
+        netloc = f"{netloc}:{port}"
+
+    return urlunparse((scheme, netloc, parsed.path or "/", parsed.params, parsed.query, ""))
+
+def url_hash(url: str) -> int:
+    """64-bit hash of a canonical URL"""
+    return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+class SeenSet:
+    """
+    Memory-efficient set of URLs already queued for a crawl
+
+    Stores a 64-bit hash of each canonical URL instead of the URL string.
+    """
+
+    def __init__(self):
+        self._hashes: Set[int] = set()
+
+    @staticmethod
+    def _hash(url: str) -> int:
+        return url_hash(url)
+
+    def add(self, url: str) -> bool:
+        """
+        Add a URL to the set
+
+        Returns:
+            True if the URL was not already in the set
+        """
+        key = self._hash(url)
+        if key in self._hashes:
+            return False
+        self._hashes.add(key)
+        return True
+
+    def __contains__(self, url: str) -> bool:
+        return self._hash(url) in self._hashes
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+class Frontier:
+    """
+    Breadth-first URL frontier with deduplication
+
+    URLs are canonicalized and only queued the first time they are seen.
+    """
+
+    def __init__(self):
+        self._queue: Deque[Tuple[str, int]] = deque()
+        self.seen = SeenSet()
+        self.completed = 0
+
+    def add(self, url: str, depth: int) -> bool:
+        """
+        Queue a canonical URL at a depth if it has not been seen before
+
+        Returns:
+            True if the URL was queued
+        """
+        if not self.seen.add(url):
+            return False
+        self._queue.append((url, depth))
+        return True
+
+    def extend(self, urls: Iterable[str], depth: int) -> int:
+        """
+        Queue several canonical URLs at the same depth
+
+        Returns:
+            Number of URLs that were newly queued
+        """
+        return sum(1 for url in urls if self.add(url, depth))
+
+    def pop(self) -> Tuple[str, int]:
+        """Take the next URL and its depth off the frontier"""
+        return self._queue.popleft()
+
+    def complete(self, url: str) -> None:
+        """Record that a popped URL has been crawled"""
+        self.completed += 1
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+DISK_FRONTIER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen (
+    hash INTEGER PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS queue (
+    hash INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    host TEXT NOT NULL,
+    depth INTEGER NOT NULL,
+    leased INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS queue_host ON queue (host, leased, depth);
+CREATE TABLE IF NOT EXISTS hosts (
+    host TEXT PRIMARY KEY,
+    queued INTEGER NOT NULL,
+    turn INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS hosts_turn ON hosts (turn) WHERE queued > 0;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# Most host parameters SQLite accepts in one statement
+SQLITE_MAX_VARIABLES = 500
+
+class DiskFrontier:
+    """
+    Crawl frontier and seen-set kept in a SQLite file
+
+    Drop-in replacement for Frontier for crawls too large to keep in
+    memory. Newly found URLs are checked against the on-disk seen-set one
+    page at a time and buffered, then written in batches of
+    ``batch_size``, so memory stays flat however large the frontier grows.
+    Each host has its own queue, ordered by depth, and pop takes turns
+    between hosts.
+
+    Changes become durable at each checkpoint, made every
+    ``checkpoint_interval`` seconds or by calling checkpoint. Reopening the
+    file resumes from the last checkpoint: URLs that were popped but not
+    completed go back on the queue, so a page may be crawled twice but
+    none is lost.
+
+    A frontier is not thread-safe, but it may be handed between threads,
+    such as to checkpoint it off the event loop while nothing else uses it.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: Optional[int] = None,
+        checkpoint_interval: Optional[float] = None
+    ):
+        """
+        Open a frontier, resuming it if the file exists
+
+        Args:
+            path: Path of the SQLite database file
+            batch_size: URLs buffered before they are written,
+                FRONTIER_BATCH_SIZE by default
+            checkpoint_interval: Seconds between automatic checkpoints;
+                None (the default) only checkpoints when asked
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.batch_size = batch_size or settings.FRONTIER_BATCH_SIZE
+        self.checkpoint_interval = checkpoint_interval
+
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(DISK_FRONTIER_SCHEMA)
+        self._pending: Dict[int, Tuple[str, str, int]] = {}
+        self._checkpointed_at = time.monotonic()
+
+        # Resume: URLs in flight at the last checkpoint are queued again
+        self._begin()
+        self._db.execute("UPDATE queue SET leased = 0 WHERE leased = 1")
+        self._db.execute("DELETE FROM hosts")
+        self._db.execute(
+            "INSERT INTO hosts (host, queued, turn) "
+            "SELECT host, COUNT(*), 0 FROM queue GROUP BY host"
+        )
+        self._db.execute("COMMIT")
+
+        meta = dict(self._db.execute("SELECT key, value FROM meta").fetchall())
+        self.completed = meta.get("completed", 0)
+        self._turn = meta.get("turn", 0)
+        self._queued = self._db.execute("SELECT COUNT(*) FROM queue").fetchone()[0]
+
+    def _begin(self) -> None:
+        """Open the write transaction the next checkpoint commits"""
+        if not self._db.in_transaction:
+            self._db.execute("BEGIN")
+
+    def _maybe_checkpoint(self) -> None:
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        if self.checkpoint_interval is not None and time.monotonic() - self._checkpointed_at >= self.checkpoint_interval:
+            self.checkpoint()
+
+    def _flush(self) -> None:
+        """Write buffered URLs to the database, uncommitted"""
+        if not self._pending:
+            return
+        self._begin()
+        rows = [(key, url, host, depth) for key, (url, host, depth) in self._pending.items()]
+        self._db.executemany("INSERT INTO seen (hash) VALUES (?)", [(row[0],) for row in rows])
+        self._db.executemany(
+            "INSERT INTO queue (hash, url, host, depth) VALUES (?, ?, ?, ?)", rows
+        )
+        per_host: Dict[str, int] = {}
+        for _, _, host, _ in rows:
+            per_host[host] = per_host.get(host, 0) + 1
+        self._db.executemany(
+            "INSERT INTO hosts (host, queued, turn) VALUES (?, ?, ?) "
+            "ON CONFLICT (host) DO UPDATE SET queued = queued + excluded.queued",
+            [(host, count, self._turn) for host, count in per_host.items()]
+        )
+        self._pending.clear()
+
+    def _unseen(self, keys: List[int]) -> Set[int]:
+        """Filter URL hashes down to those not in the seen-set"""
+        unseen = {key for key in keys if key not in self._pending}
+        candidates = list(unseen)
+        for start in range(0, len(candidates), SQLITE_MAX_VARIABLES):
+            chunk = candidates[start:start + SQLITE_MAX_VARIABLES]
+            placeholders = ", ".join("?" for _ in chunk)
+            for key, in self._db.execute(f"SELECT hash FROM seen WHERE hash IN ({placeholders})", chunk):
+                unseen.discard(key)
+        return unseen
+
+    def add(self, url: str, depth: int) -> bool:
+        """
+        Queue a canonical URL at a depth if it has not been seen before
+
+        Returns:
+            True if the URL was queued
+        """
+        return self.extend([url], depth) == 1
+
+    def extend(self, urls: Iterable[str], depth: int) -> int:
+        """
+        Queue several canonical URLs at the same depth
+
+        Returns:
+            Number of URLs that were newly queued
+        """
+        by_hash = {url_hash(url): url for url in urls}
+        unseen = self._unseen(list(by_hash))
+        for key in unseen:
+            url = by_hash[key]
+            self._pending[key] = (url, (urlparse(url).hostname or "").lower(), depth)
+        self._queued += len(unseen)
+        self._maybe_checkpoint()
+        return len(unseen)
+
+    def pop(self) -> Tuple[str, int]:
+        """
+        Take the next URL and its depth off the frontier
+
+        The URL comes from the host whose turn is next, at that host's
+        lowest queued depth. It stays leased until completed, so it is
+        queued again if the crawl resumes from an earlier checkpoint.
+
+        Raises:
+            IndexError: If the frontier is empty
+        """
+        if self._queued == len(self._pending):
+            # Nothing left on disk: write out the buffer to pop from it
+            self._flush()
+        self._begin()
+        row = self._db.execute(
+            "SELECT host FROM hosts WHERE queued > 0 ORDER BY turn LIMIT 1"
+        ).fetchone()
+        if row is None:
+            raise IndexError("pop from an empty frontier")
+        host, = row
+        key, url, depth = self._db.execute(
+            "SELECT hash, url, depth FROM queue WHERE host = ? AND leased = 0 ORDER BY depth LIMIT 1",
+            (host,)
+        ).fetchone()
+        self._turn += 1
+        self._db.execute("UPDATE queue SET leased = 1 WHERE hash = ?", (key,))
+        self._db.execute("UPDATE hosts SET queued = queued - 1, turn = ? WHERE host = ?", (self._turn, host))
+        self._queued -= 1
+        return url, depth
+
+    def complete(self, url: str) -> None:
+        """Record that a popped URL has been crawled"""
+        self._begin()
+        self._db.execute("DELETE FROM queue WHERE hash = ?", (url_hash(url),))
+        self.completed += 1
+        self._maybe_checkpoint()
+
+    def checkpoint(self) -> None:
+        """Write buffered URLs and commit everything done since the last checkpoint"""
+        self._flush()
+        self._begin()
+        self._db.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [("completed", self.completed), ("turn", self._turn)]
+        )
+        self._db.execute("COMMIT")
+        self._checkpointed_at = time.monotonic()
+
+    def close(self, delete: bool = False) -> None:
+        """
+        Close the frontier, discarding changes since the last checkpoint
+
+        Args:
+            delete: Also delete the file, once the crawl no longer needs it
+        """
+        if self._db.in_transaction:
+            self._db.execute("ROLLBACK")
+        self._db.close()
+        if delete:
+            for suffix in ("", "-wal", "-shm"):
+                try:
+                    os.remove(self.path + suffix)
+                except FileNotFoundError:
+                    pass
+
+    def __len__(self) -> int:
+        return self._queued
@@ -0,0 +1,427 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+import httpx
+import requests
+
+from app.core.config import settings
+from app.scraper.retry import Deadline, DeadlineExceeded
+from app.scraper.session_pool import session_pool
+from app.scraper.single_flight import single_flight
+
+logger = logging.getLogger(__name__)
+
+class _AsyncSlots:
+    """
+    A host's requests running on one event loop
+
+    Works like a semaphore, except that each caller may ask for a lower
+    limit than the host's, which then counts all of the host's requests
+    on the loop. A released slot goes to the oldest waiter it fits.
+    """
+
+    def __init__(self):
+        self.active = 0
+        # Structure: deque of (limit, future)
+        self._waiters = deque()
+
+    async def acquire(self, limit: int) -> None:
+        """Wait until fewer than limit requests are running, and take a slot"""
+        if self.active < limit:
+            self.active += 1
+            return
+        waiter = (limit, asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except BaseException:
+            if waiter[1].done() and not waiter[1].cancelled():
+                # Handed a slot just as the wait was cancelled
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self) -> None:
+        """Give a slot back, handing it to the oldest waiter it fits"""
+        self.active -= 1
+        for waiter in list(self._waiters):
+            limit, future = waiter
+            if future.done():
+                self._waiters.remove(waiter)
+            elif self.active < limit:
+                self._waiters.remove(waiter)
+                self.active += 1
+                future.set_result(None)
+                return
+
+class _HostState:
+    """Scheduling state and counters for one target host"""
+
+    def __init__(self, options: Dict[str, Any]):
+        self.max_concurrency = options["max_concurrency"]
+        rate = options["requests_per_second"]
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.semaphore = threading.BoundedSemaphore(self.max_concurrency)
+        # Structure: {event_loop: _AsyncSlots}
+        self.async_slots = weakref.WeakKeyDictionary()
+        self.next_start = 0.0
+        self.active = 0
+        self.robots: Optional[RobotFileParser] = None
+        self.robots_expires = 0.0
+        self.requests = 0
+        self.delayed = 0
+        self.delay_total = 0.0
+        self.latencies = deque(maxlen=settings.HEDGE_LATENCY_WINDOW)
+        self.hedge_tokens = settings.HEDGE_BUDGET_BURST
+        self.hedges = 0
+
+class HostScheduler:
+    """
+    Outbound politeness scheduler for target hosts
+
+    Every request to a host takes a slot from that host: at most
+    ``max_concurrency`` requests run at once, and request starts are
+    spaced by at least ``1 / requests_per_second`` seconds, or by the
+    host's robots.txt Crawl-delay when that is longer. Waiting only blocks
+    the request that waits, so requests to other hosts keep going while
+    one host is throttled.
+
+    Limits come from the HOST_* settings and can be overridden per host
+    with HOST_SCHEDULE_OVERRIDES. The rate is shared by all callers; the
+    concurrency limit applies separately to threads and to each event loop.
+
+    State is kept for at most HOST_STATE_MAX_HOSTS hosts: beyond that, the
+    least recently used hosts with no request running or scheduled are
+    forgotten, along with their robots.txt and latency history.
+    """
+
+    def __init__(self, max_hosts: Optional[int] = None):
+        self._lock = threading.Lock()
+        self.max_hosts = max_hosts or settings.HOST_STATE_MAX_HOSTS
+        # Least recently used first
+        self._hosts: "OrderedDict[str, _HostState]" = OrderedDict()
+
+    def _host_options(self, host: str) -> Dict[str, Any]:
+        """Get the schedule options for a host, applying any per-host overrides"""
+        options = {
+            "max_concurrency": settings.HOST_MAX_CONCURRENCY,
+            "requests_per_second": settings.HOST_REQUESTS_PER_SECOND,
+        }
+        options.update(settings.HOST_SCHEDULE_OVERRIDES.get(host, {}))
+        return options
+
+    def _state(self, host: str) -> _HostState:
+        """Get the state of a host, creating it on first use"""
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                state = _HostState(self._host_options(host))
+                self._hosts[host] = state
+                if len(self._hosts) > self.max_hosts:
+                    self._evict_idle()
+            else:
+                self._hosts.move_to_end(host)
+            return state
+
+    def _evict_idle(self) -> None:
+        """Forget least recently used idle hosts until under max_hosts; the lock must be held"""
+        now = time.monotonic()
+        # The most recent host is the one being added, so it is never a candidate
+        for host, state in list(self._hosts.items())[:-1]:
+            if len(self._hosts) <= self.max_hosts:
+                break
+            if not state.active and state.next_start <= now:
+                del self._hosts[host]
+
+    def _reserve(self, state: _HostState, crawl_delay: float, deadline: Optional[Deadline] = None) -> float:
+        """
+        Reserve the next start time of a host
+
+        Nothing is reserved when the wait does not fit in the deadline, so a
+        rejected request does not push back the requests after it.
+
+        Returns:
+            Seconds to wait before starting the request
+
+        Raises:
+            DeadlineExceeded: If the wait would not leave time for the request
+        """
+        interval = max(state.interval, crawl_delay)
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, state.next_start)
+            delay = start - now
+            self._check_delay(delay, deadline)
+            state.next_start = start + interval
+            state.requests += 1
+            if delay > 0:
+                state.delayed += 1
+                state.delay_total += delay
+            return delay
+
+    @staticmethod
+    def _host_key(url: str) -> str:
+        """Identify the target of a URL by host and port, the scope of its robots.txt"""
+        parsed = urlparse(url)
+        host = (parsed.hostname or "").lower()
+        try:
+            port = parsed.port
+        except ValueError:
+            port = None
+        return f"{host}:{port}" if port else host
+
+    @staticmethod
+    def _robots_url(url: str) -> str:
+        parsed = urlparse(url)
+        return f"{parsed.scheme}://{parsed.netloc}/robots.txt"
+
+    @staticmethod
+    def _parse_robots(status_code: int, text: str) -> RobotFileParser:
+        """Parse a robots.txt response; anything but a 200 allows everything"""
+        parser = RobotFileParser()
+        parser.parse(text.splitlines() if status_code == 200 else [])
+        return parser
+
+    def _fetch_robots(self, url: str, user_agent: Optional[str]) -> RobotFileParser:
+        """Download and parse a host's robots.txt"""
+        robots_url = self._robots_url(url)
+        try:
+            response = session_pool.get(
+                robots_url,
+                headers={"User-Agent": user_agent or settings.DEFAULT_USER_AGENT},
+                timeout=settings.ROBOTS_TIMEOUT
+            )
+            return self._parse_robots(response.status_code, response.text)
+        except requests.exceptions.RequestException as e:
+            logger.debug(f"Could not fetch {robots_url}: {str(e)}")
+            return self._parse_robots(0, "")
+
+    async def _afetch_robots(self, url: str, user_agent: Optional[str]) -> RobotFileParser:
+        """Download and parse a host's robots.txt without blocking the event loop"""
+        robots_url = self._robots_url(url)
+        try:
+            response = await session_pool.aget(
+                robots_url,
+                headers={"User-Agent": user_agent or settings.DEFAULT_USER_AGENT},
+                timeout=settings.ROBOTS_TIMEOUT
+            )
+            return self._parse_robots(response.status_code, response.text)
+        except httpx.HTTPError as e:
+            logger.debug(f"Could not fetch {robots_url}: {str(e)}")
+            return self._parse_robots(0, "")
+
+    def _store_robots(self, state: _HostState, robots: RobotFileParser) -> None:
+        state.robots = robots
+        state.robots_expires = time.monotonic() + settings.ROBOTS_TTL
+
+    def _crawl_delay(self, state: _HostState, user_agent: Optional[str]) -> float:
+        """Get the robots.txt Crawl-delay for a user agent, capped by HOST_MAX_CRAWL_DELAY"""
+        delay = state.robots.crawl_delay(user_agent or "*") if state.robots else None
+        return min(float(delay or 0), settings.HOST_MAX_CRAWL_DELAY)
+
+    def _robots_expired(self, state: _HostState) -> bool:
+        return settings.HOST_RESPECT_CRAWL_DELAY and time.monotonic() >= state.robots_expires
+
+    def _hold(self, state: _HostState, change: int) -> None:
+        """Count a request starting (1) or ending (-1), so a busy host is never forgotten"""
+        with self._lock:
+            state.active += change
+
+    def _check_delay(self, delay: float, deadline: Optional[Deadline]) -> None:
+        """Fail fast if waiting for a slot would leave no time for the request"""
+        if deadline is not None and not deadline.allows_wait(delay):
+            raise DeadlineExceeded(f"Deadline of {deadline.seconds}s exceeded waiting for a request slot")
+
+    @contextmanager
+    def slot(
+        self,
+        url: str,
+        user_agent: Optional[str] = None,
+        deadline: Optional[Deadline] = None
+    ) -> Iterator[None]:
+        """
+        Wait for a slot to request a URL and hold it while the request runs
+
+        Blocks the calling thread, for synchronous callers; the wait never
+        goes past the deadline. Async code uses aslot.
+
+        Args:
+            url: The URL that will be requested
+            user_agent: User agent to look up the robots.txt Crawl-delay for
+            deadline: Optional budget the wait must fit in
+
+        Raises:
+            DeadlineExceeded: If the wait would not leave time for the request
+        """
+        host = self._host_key(url)
+        state = self._state(host)
+
+        if self._robots_expired(state):
+            robots = single_flight.do(("robots", host), lambda: self._fetch_robots(url, user_agent))
+            self._store_robots(state, robots)
+
+        timeout = deadline.remaining() if deadline is not None else None
+        if not state.semaphore.acquire(timeout=timeout):
+            raise DeadlineExceeded(f"Deadline of {deadline.seconds}s exceeded waiting for a request slot")
+        self._hold(state, 1)
+        try:
+            delay = self._reserve(state, self._crawl_delay(state, user_agent), deadline)
+            if delay > 0:
+                time.sleep(delay)
+            yield
+        finally:
+            self._hold(state, -1)
+            state.semaphore.release()
+
+    @asynccontextmanager
+    async def aslot(
+        self,
+        url: str,
+        user_agent: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+        max_concurrency: Optional[int] = None
+    ) -> AsyncIterator[None]:
+        """
+        Async version of slot, waiting without blocking the event loop
+
+        Args:
+            url: The URL that will be requested
+            user_agent: User agent to look up the robots.txt Crawl-delay for
+            deadline: Optional budget the wait must fit in
+            max_concurrency: Optional lower limit on the host's concurrent
+                requests for this caller, such as a batch asking to go
+                easier on a host
+
+        Raises:
+            DeadlineExceeded: If the wait would not leave time for the request
+        """
+        host = self._host_key(url)
+        state = self._state(host)
+
+        if self._robots_expired(state):
+            robots = await single_flight.ado(("robots", host), lambda: self._afetch_robots(url, user_agent))
+            self._store_robots(state, robots)
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            slots = state.async_slots.get(loop)
+            if slots is None:
+                slots = _AsyncSlots()
+                state.async_slots[loop] = slots
+
+        limit = min(max_concurrency or state.max_concurrency, state.max_concurrency)
+        timeout = deadline.remaining() if deadline is not None else None
+        try:
+            await asyncio.wait_for(slots.acquire(limit), timeout)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"Deadline of {deadline.seconds}s exceeded waiting for a request slot")
+        self._hold(state, 1)
+        try:
+            delay = self._reserve(state, self._crawl_delay(state, user_agent), deadline)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield
+        finally:
+            self._hold(state, -1)
+            slots.release()
+
+    def record_latency(self, url: str, seconds: float) -> None:
+        """
+        Record how long a request to a host took to respond
+
+        Every recorded request also earns HEDGE_BUDGET_RATIO hedge tokens
+        for the host, up to HEDGE_BUDGET_BURST.
+
+        Args:
+            url: The requested URL
+            seconds: Time from the start of the request to its response
+        """
+        state = self._state(self._host_key(url))
+        with self._lock:
+            state.latencies.append(seconds)
+            state.hedge_tokens = min(
+                settings.HEDGE_BUDGET_BURST,
+                state.hedge_tokens + settings.HEDGE_BUDGET_RATIO
+            )
+
+    def _quantile(self, state: _HostState, quantile: float) -> Optional[float]:
+        """Get a latency quantile of a host; the lock must be held"""
+        if len(state.latencies) < settings.HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(state.latencies)
+        return ordered[min(len(ordered) - 1, math.ceil(quantile * len(ordered)) - 1)]
+
+    def hedge_delay(self, url: str) -> Optional[float]:
+        """
+        Get how long to wait for a response before hedging a request
+
+        Args:
+            url: The requested URL
+
+        Returns:
+            The host's HEDGE_QUANTILE latency, or None until enough
+            responses have been recorded
+        """
+        state = self._state(self._host_key(url))
+        with self._lock:
+            return self._quantile(state, settings.HEDGE_QUANTILE)
+
+    def take_hedge(self, url: str) -> bool:
+        """
+        Spend a hedge token of a host, if it has one
+
+        Tokens accrue at HEDGE_BUDGET_RATIO per request, so hedges add at
+        most that fraction of extra load to a host.
+
+        Args:
+            url: The requested URL
+
+        Returns:
+            Whether a hedge may be sent
+        """
+        state = self._state(self._host_key(url))
+        with self._lock:
+            if state.hedge_tokens < 1:
+                return False
+            state.hedge_tokens -= 1
+            state.hedges += 1
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get per-host scheduling counters
+
+        Returns:
+            Dictionary with, per host, the requests scheduled, how many had
+            to wait, the total wait, the Crawl-delay in effect, the hedges
+            sent and the hedging latency quantile
+        """
+        with self._lock:
+            hosts = dict(self._hosts)
+
+        per_host = {}
+        for host, state in hosts.items():
+            with self._lock:
+                hedge_after = self._quantile(state, settings.HEDGE_QUANTILE)
+            per_host[host] = {
+                "requests": state.requests,
+                "delayed": state.delayed,
+                "delay_seconds": round(state.delay_total, 3),
+                "crawl_delay": self._crawl_delay(state, None),
+                "hedges": state.hedges,
+                "hedge_after": round(hedge_after, 3) if hedge_after is not None else None,
+            }
+        return {"hosts": per_host}
+
+# Shared scheduler used by every WebScraper instance
+host_scheduler = HostScheduler()
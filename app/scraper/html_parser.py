@@ -1,9 +1,12 @@
 import logging
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Optional, Sequence, Union
 from bs4 import BeautifulSoup, Tag
-import pandas as pd
 import trafilatura
 
+from app.scraper.parser_backends import build_soup, resolve_backend
+from app.scraper.tables import extract_table
+from app.utils.selector_cache import compile_selector
+
 logger = logging.getLogger(__name__)
 
 class HTMLParser:
@@ -12,17 +15,60 @@ class HTMLParser:
     using BeautifulSoup and other specialized libraries
     """
     
-    def __init__(self, html_content: str, selector: Optional[str] = None):
+    def __init__(
+        self,
+        html_content: str,
+        selector: Optional[str] = None,
+        backend: Optional[str] = None,
+        parse_only: Optional[Sequence[str]] = None
+    ):
         """
         Initialize the parser with HTML content
         
         Args:
             html_content: The HTML content to parse
             selector: Optional CSS selector to target specific elements
+            backend: Parser backend to build the tree with, defaults to the
+                HTML_PARSER_BACKEND setting; falls back if not installed
+            parse_only: Optional tag names to keep in the tree, for scrapes
+                that only need those elements. Ignored when a selector is
+                given, since the selector may match any element.
         """
         self.html = html_content
         self.selector = selector
-        self.soup = BeautifulSoup(html_content, 'html.parser')
+        self.backend = resolve_backend(backend)
+        self.parse_only = None if selector else parse_only
+        self._soup: Optional[BeautifulSoup] = None
+    
+    @property
+    def soup(self) -> BeautifulSoup:
+        """
+        The parsed document tree
+        
+        Built on first access and cached, so extractions that never touch
+        the tree (such as text via trafilatura) skip the parse entirely.
+        """
+        if self._soup is None:
+            self._soup = build_soup(self.html, self.backend, self.parse_only)
+        return self._soup
+        
+    def with_selector(self, selector: Optional[str]) -> "HTMLParser":
+        """
+        Get a parser for the same document with a different selector
+        
+        The new parser shares this parser's tree, so the document is not
+        parsed again. Only use a selector on a parser built without
+        parse_only, since the selector may match any element.
+        
+        Args:
+            selector: CSS selector to target specific elements
+            
+        Returns:
+            A parser over the same tree
+        """
+        parser = HTMLParser(self.html, selector, self.backend, self.parse_only)
+        parser._soup = self.soup
+        return parser
         
     def _get_target_elements(self) -> List[Tag]:
         """Get the target elements based on selector"""
@@ -30,7 +76,7 @@ class HTMLParser:
             return [self.soup]
         
         try:
-            elements = self.soup.select(self.selector)
+            elements = compile_selector(self.selector).select(self.soup)
             if not elements:
                 logger.warning(f"No elements found for selector: {self.selector}")
             return elements
@@ -62,10 +108,54 @@ class HTMLParser:
         
         return [el.get_text(strip=True, separator=' ') for el in elements]
     
-    def extract_tables(self) -> List[Dict[str, Any]]:
+    def _table_record(
+        self,
+        index: int,
+        table: Tag,
+        as_dataframe: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """Convert a table element into a table record, or None if it cannot be parsed"""
+        try:
+            headers, data = extract_table(table)
+            record = {
+                "table_index": index,
+                "headers": headers,
+                "data": data
+            }
+            if as_dataframe:
+                import pandas as pd
+                record["dataframe"] = pd.DataFrame(data, columns=headers)
+            return record
+        except Exception as e:
+            logger.error(f"Error parsing table {index}: {str(e)}")
+            return None
+    
+    def _link_record(self, a_tag: Tag) -> Dict[str, str]:
+        """Convert an anchor element into a link record"""
+        return {
+            "url": a_tag['href'],
+            "text": a_tag.get_text(strip=True) or "",
+            "title": a_tag.get('title', ""),
+        }
+    
+    def _image_record(self, img_tag: Tag) -> Dict[str, str]:
+        """Convert an image element into an image record"""
+        return {
+            "src": img_tag['src'],
+            "alt": img_tag.get('alt', ""),
+            "title": img_tag.get('title', ""),
+            "width": img_tag.get('width', ""),
+            "height": img_tag.get('height', ""),
+        }
+    
+    def extract_tables(self, as_dataframe: bool = False) -> List[Dict[str, Any]]:
         """
         Extract tables from the HTML
         
+        Args:
+            as_dataframe: Also include each table as a pandas DataFrame
+                under "dataframe"
+        
         Returns:
             List of tables as dictionaries
         """
@@ -81,16 +171,9 @@ class HTMLParser:
                 continue
             
             for i, table in enumerate(html_tables):
-                try:
-                    # Use pandas to extract the table
-                    df = pd.read_html(str(table))[0]
-                    tables.append({
-                        "table_index": i,
-                        "headers": df.columns.tolist(),
-                        "data": df.to_dict(orient='records')
-                    })
-                except Exception as e:
-                    logger.error(f"Error parsing table {i}: {str(e)}")
+                record = self._table_record(i, table, as_dataframe)
+                if record is not None:
+                    tables.append(record)
         
         return tables
     
@@ -107,11 +190,7 @@ class HTMLParser:
         for element in elements:
             for a_tag in element.find_all('a', href=True):
                 try:
-                    links.append({
-                        "url": a_tag['href'],
-                        "text": a_tag.get_text(strip=True) or "",
-                        "title": a_tag.get('title', ""),
-                    })
+                    links.append(self._link_record(a_tag))
                 except Exception as e:
                     logger.error(f"Error extracting link: {str(e)}")
         
@@ -130,28 +209,62 @@ class HTMLParser:
         for element in elements:
             for img_tag in element.find_all('img', src=True):
                 try:
-                    images.append({
-                        "src": img_tag['src'],
-                        "alt": img_tag.get('alt', ""),
-                        "title": img_tag.get('title', ""),
-                        "width": img_tag.get('width', ""),
-                        "height": img_tag.get('height', ""),
-                    })
+                    images.append(self._image_record(img_tag))
                 except Exception as e:
                     logger.error(f"Error extracting image: {str(e)}")
         
         return images
     
+    def _extract_elements(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Extract tables, links and images in a single walk of the tree
+        
+        Produces the same output as calling extract_tables, extract_links
+        and extract_images separately, without traversing the tree three times.
+        
+        Returns:
+            Dictionary with the tables, links and images
+        """
+        tables = []
+        links = []
+        images = []
+        
+        for element in self._get_target_elements():
+            table_index = 0
+            for tag in element.find_all(['a', 'img', 'table']):
+                try:
+                    if tag.name == 'a':
+                        if tag.has_attr('href'):
+                            links.append(self._link_record(tag))
+                    elif tag.name == 'img':
+                        if tag.has_attr('src'):
+                            images.append(self._image_record(tag))
+                    else:
+                        record = self._table_record(table_index, tag)
+                        table_index += 1
+                        if record is not None:
+                            tables.append(record)
+                except Exception as e:
+                    logger.error(f"Error extracting {tag.name}: {str(e)}")
+        
+        return {
+            "tables": tables,
+            "links": links,
+            "images": images,
+        }
+    
     def extract_full(self) -> Dict[str, Any]:
         """
         Extract all types of data from the HTML
         
+        Links, images and tables come from one walk over the tree. Without
+        a selector, text comes from trafilatura, which parses the raw HTML
+        into a tree of its own.
+        
         Returns:
             Dictionary with all extracted data
         """
         return {
             "text": self.extract_text(),
-            "tables": self.extract_tables(),
-            "links": self.extract_links(),
-            "images": self.extract_images(),
+            **self._extract_elements(),
         }
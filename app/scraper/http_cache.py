@@ -0,0 +1,352 @@
+import email.utils
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Mapping, Optional
+
+from app.core.config import settings
+from app.scraper.extraction_pool import charset_from_content_type
+
+logger = logging.getLogger(__name__)
+
+# Bumped whenever the schema changes; an older cache is simply dropped
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    vary TEXT NOT NULL,
+    body BLOB NOT NULL,
+    content_type TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    expires_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+def cache_key(url: str, method: str = "GET", proxies: Optional[Mapping[str, str]] = None) -> str:
+    """
+    Build the key a response is stored under
+
+    Args:
+        url: The requested URL
+        method: The request method
+        proxies: The proxies the request goes through, if any
+
+    Returns:
+        The method and URL, plus the proxies since they may see a
+        different response
+    """
+    key = f"{method.upper()} {url}"
+    if proxies:
+        key += f" via {json.dumps(dict(proxies), sort_keys=True)}"
+    return key
+
+def _header(headers: Mapping[str, str], name: str) -> Optional[str]:
+    """Look up a header case-insensitively in a plain mapping"""
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+def _vary_values(response_headers: Mapping[str, str], request_headers: Mapping[str, str]) -> Dict[str, Optional[str]]:
+    """Get the request header values a response varies on, by lowercase name"""
+    names = [name.strip().lower() for name in (response_headers.get("Vary") or "").split(",")]
+    return {name: _header(request_headers, name) for name in sorted(set(names)) if name}
+
+def _cache_directives(headers: Mapping[str, str]) -> Dict[str, Optional[str]]:
+    """Parse a Cache-Control header into {directive: value}"""
+    directives = {}
+    for part in headers.get("Cache-Control", "").split(","):
+        name, _, value = part.partition("=")
+        name = name.strip().lower()
+        if name:
+            directives[name] = value.strip().strip('"') or None
+    return directives
+
+def freshness_lifetime(headers: Mapping[str, str]) -> Optional[float]:
+    """
+    Get how long a response may be used without revalidation
+
+    Args:
+        headers: The response headers
+
+    Returns:
+        The remaining lifetime in seconds (0 when it must always be
+        revalidated), or None if the response must not be stored
+    """
+    directives = _cache_directives(headers)
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0.0
+
+    try:
+        age = float(headers.get("Age", 0))
+    except ValueError:
+        age = 0.0
+
+    if "max-age" in directives:
+        try:
+            return max(0.0, float(directives["max-age"]) - age)
+        except (TypeError, ValueError):
+            return 0.0
+
+    expires = headers.get("Expires")
+    if expires:
+        try:
+            expires_at = email.utils.parsedate_to_datetime(expires).timestamp()
+        except (TypeError, ValueError):
+            return 0.0
+        return max(0.0, expires_at - time.time())
+
+    return 0.0
+
+class CachedResponse:
+    """A stored response body with its validators"""
+
+    def __init__(
+        self,
+        body: bytes,
+        content_type: Optional[str],
+        etag: Optional[str],
+        last_modified: Optional[str],
+        expires_at: float
+    ):
+        self.body = body
+        self.content_type = content_type
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+
+    @property
+    def charset(self) -> Optional[str]:
+        """The charset declared for the body, if any"""
+        return charset_from_content_type(self.content_type)
+
+    @property
+    def is_fresh(self) -> bool:
+        """Whether the response can be used without revalidation"""
+        return time.time() < self.expires_at
+
+    def validators(self) -> Dict[str, str]:
+        """Get the conditional request headers that revalidate this response"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+class HTTPCache:
+    """
+    On-disk cache of HTTP response bodies, stored in SQLite
+
+    Responses are kept with their ETag / Last-Modified validators and an
+    expiry time from ``Cache-Control: max-age`` (or ``Expires``). Fresh
+    entries are used without a request; stale entries are revalidated with
+    a conditional request, and a 304 reuses the stored body. Responses
+    marked ``no-store`` or ``Vary: *``, or with neither a lifetime nor a
+    validator, are not stored. The least recently used entries are evicted
+    once the total body size goes over ``max_bytes``.
+
+    Entries are keyed by ``cache_key`` (method, URL and proxies). Each key
+    holds one variant: a response is only used for a request whose headers
+    named by its ``Vary`` match the ones it was stored for, and storing
+    another variant replaces it. Several processes can share the database
+    file, and the size cap applies to their combined entries.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        """
+        Initialize the cache
+
+        Args:
+            path: Path of the SQLite database file
+            max_bytes: Maximum total size of the stored bodies
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "stale": 0,
+            "revalidations": 0,
+            "stores": 0,
+            "evictions": 0,
+        }
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database, once per process; the lock must be held"""
+        # Connections must not be shared with forked worker processes
+        if self._db is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            if self._db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                self._db.execute("DROP TABLE IF EXISTS responses")
+                self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._db.executescript(SCHEMA)
+            self._pid = os.getpid()
+        return self._db
+
+    def lookup(self, key: str, request_headers: Mapping[str, str]) -> Optional[CachedResponse]:
+        """
+        Get the stored response for a request
+
+        Args:
+            key: The request's cache_key
+            request_headers: The headers the request will be sent with
+
+        Returns:
+            The stored response (check ``is_fresh`` before using it without
+            revalidation), or None if nothing is stored for these headers
+        """
+        with self._lock:
+            db = self._connection()
+            row = db.execute(
+                "SELECT vary, body, content_type, etag, last_modified, expires_at "
+                "FROM responses WHERE key = ?",
+                (key,)
+            ).fetchone()
+            vary = json.loads(row[0]) if row is not None else {}
+            if row is None or any(_header(request_headers, name) != value for name, value in vary.items()):
+                self._counters["misses"] += 1
+                return None
+
+            db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            cached = CachedResponse(*row[1:])
+            self._counters["hits" if cached.is_fresh else "stale"] += 1
+            return cached
+
+    def store(self, key: str, request_headers: Mapping[str, str], headers: Mapping[str, str], body: bytes) -> None:
+        """
+        Store a successful response, if its headers allow it
+
+        Args:
+            key: The request's cache_key
+            request_headers: The headers the request was sent with
+            headers: The response headers
+            body: The response body
+        """
+        lifetime = freshness_lifetime(headers)
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if lifetime is None or (not lifetime and not etag and not last_modified):
+            return
+        if headers.get("Vary", "").strip() == "*":
+            return
+        if len(body) > self.max_bytes:
+            return
+
+        vary = json.dumps(_vary_values(headers, request_headers))
+        now = time.time()
+        with self._lock:
+            db = self._connection()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute(
+                    "INSERT OR REPLACE INTO responses "
+                    "(key, vary, body, content_type, etag, last_modified, expires_at, last_used, size) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, vary, body, headers.get("Content-Type"), etag, last_modified,
+                     now + lifetime, now, len(body))
+                )
+                self._evict(db)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            self._counters["stores"] += 1
+
+    def revalidated(self, key: str, headers: Mapping[str, str]) -> None:
+        """
+        Record a 304 Not Modified for a stored response and refresh its expiry
+
+        Args:
+            key: The request's cache_key
+            headers: The headers of the 304 response
+        """
+        lifetime = freshness_lifetime(headers)
+        with self._lock:
+            db = self._connection()
+            self._counters["revalidations"] += 1
+            if lifetime is None:
+                return
+            db.execute(
+                "UPDATE responses SET expires_at = ?, "
+                "etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) "
+                "WHERE key = ?",
+                (time.time() + lifetime, headers.get("ETag"), headers.get("Last-Modified"), key)
+            )
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        """
+        Delete least recently used entries until under the size cap
+
+        The total is read from the database, since other processes sharing
+        the file store entries too. The lock must be held, inside a write
+        transaction.
+        """
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = db.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            self._counters["evictions"] += 1
+
+    def clear(self) -> None:
+        """Delete every stored response"""
+        with self._lock:
+            self._connection().execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get hit, miss and revalidation counters
+
+        A hit is a fresh response used without a request, a revalidation
+        a stale one confirmed by a 304, both of which skip the download.
+
+        Returns:
+            Dictionary with the counters, entries and bytes stored
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            entries, stored_bytes = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+
+        lookups = counters["hits"] + counters["misses"] + counters["stale"]
+        return {
+            **counters,
+            "entries": entries,
+            "bytes": stored_bytes,
+            "max_bytes": self.max_bytes,
+            "hit_rate": (counters["hits"] + counters["revalidations"]) / lookups if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        """Close the database"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+# Shared cache used by every WebScraper instance
+http_cache = HTTPCache(settings.HTTP_CACHE_PATH, settings.HTTP_CACHE_MAX_BYTES)
@@ -0,0 +1,108 @@
+import logging
+from functools import lru_cache
+from typing import List, Optional, Sequence, Union
+
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.builder import builder_registry
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Backends in order of preference for "auto" and for falling back when
+# the requested backend is not installed
+BACKEND_PREFERENCE = ["lxml", "html5-parser", "html.parser"]
+
+# Backends that are BeautifulSoup tree builders
+TREE_BUILDER_BACKENDS = {"lxml", "html5lib", "html.parser"}
+
+# Backends that can discard unwanted tags while parsing
+STRAINER_BACKENDS = {"lxml", "html.parser"}
+
+def _html5_parser_available() -> bool:
+    """Check whether html5-parser can be imported"""
+    try:
+        import html5_parser  # noqa: F401
+        return True
+    except Exception:
+        # html5-parser raises RuntimeError (not ImportError) when its
+        # libxml2 does not match lxml's, which makes it unusable too
+        return False
+
+@lru_cache(maxsize=None)
+def is_backend_available(backend: str) -> bool:
+    """
+    Check whether a parser backend is installed and usable
+    
+    Args:
+        backend: The backend name
+        
+    Returns:
+        True if the backend can be used
+    """
+    if backend == "html5-parser":
+        return _html5_parser_available()
+    if backend in TREE_BUILDER_BACKENDS:
+        return builder_registry.lookup(backend) is not None
+    return False
+
+def available_backends() -> List[str]:
+    """Get the names of every usable parser backend"""
+    return [
+        backend for backend in ["lxml", "html5-parser", "html5lib", "html.parser"]
+        if is_backend_available(backend)
+    ]
+
+@lru_cache(maxsize=None)
+def resolve_backend(backend: Optional[str] = None) -> str:
+    """
+    Resolve a requested backend to one that is available
+    
+    Args:
+        backend: The requested backend, "auto", or None for the configured default
+        
+    Returns:
+        The backend name to use
+    """
+    requested = getattr(backend, "value", backend) or settings.HTML_PARSER_BACKEND
+    
+    if requested != "auto":
+        if is_backend_available(requested):
+            return requested
+        logger.warning(f"Parser backend '{requested}' is not available, falling back")
+    
+    for candidate in BACKEND_PREFERENCE:
+        if is_backend_available(candidate):
+            return candidate
+    
+    return "html.parser"
+
+def build_soup(
+    html_content: Union[str, bytes],
+    backend: str,
+    parse_only: Optional[Sequence[str]] = None
+) -> BeautifulSoup:
+    """
+    Build a BeautifulSoup tree with the given backend
+    
+    Args:
+        html_content: The HTML content to parse
+        backend: A resolved backend name
+        parse_only: Optional tag names to keep; everything else is discarded
+            during parsing. Backends that cannot strain are swapped for
+            one that can.
+        
+    Returns:
+        The parsed document
+    """
+    if parse_only and backend not in STRAINER_BACKENDS:
+        backend = "lxml" if is_backend_available("lxml") else "html.parser"
+    
+    if backend == "html5-parser":
+        from html5_parser import parse
+        return parse(html_content, treebuilder='soup', return_root=False)
+    
+    if parse_only:
+        return BeautifulSoup(html_content, backend, parse_only=SoupStrainer(list(parse_only)))
+    
+    return BeautifulSoup(html_content, backend)
@@ -0,0 +1,114 @@
+import email.utils
+import random
+import time
+from typing import Optional
+
+from app.core.config import settings
+
+# Statuses worth retrying: the request may succeed if sent again later
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+class DeadlineExceeded(Exception):
+    """Raised when a scrape's time budget cannot cover the next step"""
+    pass
+
+class Deadline:
+    """
+    Total time budget of a request and all its retries
+
+    Attempts, backoff waits and Retry-After waits all draw from the same
+    budget, so a request never takes much longer than its deadline
+    however many retries it is allowed.
+    """
+
+    def __init__(self, seconds: float):
+        """
+        Initialize the deadline
+
+        Args:
+            seconds: The budget, starting now
+        """
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """Seconds left in the budget"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def attempt_timeout(self, timeout: float) -> float:
+        """
+        Get the timeout for the next attempt
+
+        Args:
+            timeout: The configured per-attempt timeout
+
+        Returns:
+            The timeout, shortened to the remaining budget
+
+        Raises:
+            DeadlineExceeded: If too little budget is left for an attempt
+        """
+        remaining = self.remaining()
+        if remaining < settings.RETRY_MIN_ATTEMPT_TIME:
+            raise DeadlineExceeded(f"Deadline of {self.seconds}s exceeded")
+        return min(timeout, remaining)
+
+    def allows_wait(self, delay: float) -> bool:
+        """Whether waiting for delay seconds still leaves time for an attempt"""
+        return self.remaining() - delay >= settings.RETRY_MIN_ATTEMPT_TIME
+
+def backoff_delay(attempt: int, base: float) -> float:
+    """
+    Exponential backoff with full jitter
+
+    Args:
+        attempt: Number of the attempt that just failed, from 0
+        base: Delay before the first retry
+
+    Returns:
+        A random delay between 0 and base * 2 ** attempt, capped at
+        RETRY_BACKOFF_MAX
+    """
+    return random.uniform(0, min(settings.RETRY_BACKOFF_MAX, base * 2 ** attempt))
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header
+
+    Args:
+        value: The header value, in seconds or as an HTTP date
+
+    Returns:
+        Seconds to wait, or None if the header is missing or invalid
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at - time.time())
+
+def retry_delay(attempt: int, base: float, status_code: Optional[int] = None, retry_after: Optional[str] = None) -> Optional[float]:
+    """
+    Get how long to wait before retrying a failed attempt
+
+    Args:
+        attempt: Number of the attempt that just failed, from 0
+        base: Delay before the first retry
+        status_code: HTTP status of the failed attempt, if it got a response
+        retry_after: The response's Retry-After header, if any
+
+    Returns:
+        Seconds to wait, or None if the failure is not worth retrying
+    """
+    if status_code is not None and status_code not in RETRYABLE_STATUSES:
+        return None
+    delay = backoff_delay(attempt, base)
+    server_delay = parse_retry_after(retry_after)
+    if server_delay is not None:
+        delay = max(delay, server_delay)
+    return delay
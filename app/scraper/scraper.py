@@ -1,22 +1,55 @@
+import asyncio
+import json
 import logging
 import requests
 import time
 import datetime
-from typing import Dict, Any, Optional, List, Union
+from typing import Dict, Any, AsyncIterator, Optional, List, Tuple, Union
 from urllib.parse import urlparse
 
+import httpx
+
 from app.core.config import settings
+from app.scraper.crawler import Crawler
+from app.scraper.extraction_pool import charset_from_content_type, extraction_pool
+from app.scraper.host_scheduler import host_scheduler
 from app.scraper.html_parser import HTMLParser
+from app.scraper.retry import Deadline, DeadlineExceeded, retry_delay
+from app.scraper.http_cache import cache_key, http_cache
+from app.scraper.session_pool import session_pool
+from app.scraper.single_flight import single_flight
+from app.scraper.streaming import STREAMABLE_TYPES, aiter_records
 from app.models.schema import ScrapeType
 
 logger = logging.getLogger(__name__)
 
+# Scrape types that only need a few tags, so the parser can skip the rest
+PARSE_ONLY_TAGS = {
+    ScrapeType.LINKS: ['a'],
+    ScrapeType.IMAGES: ['img'],
+}
+
+def _cache_call(method, *args):
+    """
+    Call an HTTP cache method, treating a failure as a cache miss
+    
+    The cache only saves downloads, so a broken or locked database is
+    logged and the request goes to the network instead.
+    """
+    try:
+        return method(*args)
+    except Exception as e:
+        logger.warning(f"HTTP cache {method.__name__} failed, bypassing the cache: {str(e)}")
+        return None
+
 class WebScraper:
     """
     Web Scraper for extracting data from websites
     
     This class handles the HTTP requests and coordination of
-    extraction using the HTMLParser
+    extraction using the HTMLParser. Every request goes through the
+    shared host scheduler, which keeps each target host within its
+    request rate and concurrency limits.
     """
     
     def __init__(
@@ -42,6 +75,18 @@ class WebScraper:
         self.timeout = self.config.get('timeout', settings.REQUEST_TIMEOUT)
         self.max_retries = self.config.get('max_retries', settings.MAX_RETRIES)
         self.retry_delay = self.config.get('retry_delay', settings.RETRY_DELAY)
+        self.deadline = self.config.get('deadline', settings.REQUEST_DEADLINE)
+        self.hedge = self.config.get('hedge', settings.HEDGE_ENABLED)
+        self.hedge_delay = self.config.get('hedge_delay')
+        # Optional lower cap on concurrent requests to each host, below the scheduler's
+        self.host_concurrency = self.config.get('host_concurrency')
+        self.parser_backend = self.config.get('parser_backend')
+        
+        # Crawl settings
+        self.follow_links = self.config.get('follow_links', False)
+        self.max_depth = self.config.get('max_depth', 1)
+        self.max_pages = self.config.get('max_pages', settings.CRAWL_MAX_PAGES)
+        self.same_host_only = self.config.get('same_host_only', True)
         
         # Set up headers
         self.headers = {
@@ -54,18 +99,18 @@ class WebScraper:
         if 'headers' in self.config:
             self.headers.update(self.config['headers'])
     
-    def _make_request(self, url: str) -> str:
+    def _request_params(self, url: str) -> Dict[str, Any]:
         """
-        Make an HTTP request to the specified URL with retries
+        Validate the URL and build the keyword arguments for a request
         
         Args:
             url: The URL to request
             
         Returns:
-            HTML content of the page
+            Request keyword arguments
             
         Raises:
-            Exception: If the request fails after all retries
+            ValueError: If the URL is invalid
         """
         # Validate URL
         parsed_url = urlparse(url)
@@ -74,7 +119,6 @@ class WebScraper:
         
         # Set up request parameters
         params = {
-            'url': url,
             'headers': self.headers,
             'timeout': self.timeout,
         }
@@ -85,64 +129,551 @@ class WebScraper:
         
         if 'proxies' in self.config:
             params['proxies'] = self.config['proxies']
+        
+        return params
+    
+    def _async_request_params(self, url: str) -> Dict[str, Any]:
+        """
+        Build the keyword arguments for an async (httpx) request
+        
+        Args:
+            url: The URL to request
+            
+        Returns:
+            Request keyword arguments
+            
+        Raises:
+            ValueError: If the URL is invalid
+        """
+        params = self._request_params(url)
+        
+        # httpx takes cookies on the client, so send them as a header instead
+        cookies = params.pop('cookies', None)
+        if cookies:
+            params['headers'] = {
+                **params['headers'],
+                'Cookie': '; '.join(f"{name}={value}" for name, value in cookies.items()),
+            }
+        
+        return params
+    
+    def _use_http_cache(self) -> bool:
+        """Whether this scraper's responses can be served from and stored in the HTTP cache"""
+        # Cookies and credentials may personalize the page, so never share it
+        return (
+            settings.HTTP_CACHE_ENABLED
+            and 'cookies' not in self.config
+            and not any(name.lower() == 'authorization' for name in self.headers)
+        )
+    
+    def _retry_wait(self, attempt: int, deadline: Deadline, response, error: Exception) -> float:
+        """
+        Decide whether to retry a failed attempt and how long to wait first
+        
+        Args:
+            attempt: Number of the attempt that failed, from 0
+            deadline: The request's time budget
+            response: The failed attempt's response, if it got one
+            error: The error the attempt failed with
             
+        Returns:
+            Seconds to wait before the next attempt, within the deadline
+            
+        Raises:
+            DeadlineExceeded: If the wait would leave no time for a retry
+            Exception: If the request should not be retried
+        """
+        status_code = response.status_code if response is not None else None
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        delay = retry_delay(attempt, self.retry_delay, status_code, retry_after)
+        
+        if delay is None or attempt == self.max_retries - 1:
+            raise Exception(f"Failed to retrieve content after {attempt+1} attempts: {str(error)}")
+        if not deadline.allows_wait(delay):
+            raise DeadlineExceeded(f"Deadline of {deadline.seconds}s exceeded after {attempt+1} attempts: {str(error)}")
+        return min(delay, deadline.remaining())
+    
+    def _make_request(self, url: str) -> Tuple[bytes, Optional[str]]:
+        """
+        Make an HTTP request to the specified URL with retries
+        
+        Fresh responses in the HTTP cache are used without a request, and
+        stale ones are revalidated with a conditional request. Attempts and
+        the jittered backoff between them share one deadline, and errors
+        that a retry cannot fix (such as a 404) fail at once.
+        
+        This is the blocking path behind scrape(), for WSGI callers. It
+        uses the same Deadline and _retry_wait as _amake_request, but
+        sleeps the calling thread for backoff and host slots; every sleep
+        is clamped to the remaining deadline.
+        
+        Args:
+            url: The URL to request
+            
+        Returns:
+            Raw body of the page and the charset declared for it, if any
+            
+        Raises:
+            DeadlineExceeded: If the deadline leaves no time for an attempt
+            Exception: If the request fails after all retries
+        """
+        params = self._request_params(url)
+        
+        use_cache = self._use_http_cache()
+        key = cache_key(url, proxies=params.get('proxies'))
+        request_headers = params['headers']
+        cached = _cache_call(http_cache.lookup, key, request_headers) if use_cache else None
+        if cached is not None:
+            if cached.is_fresh:
+                logger.info(f"Using cached response for {url}")
+                return cached.body, cached.charset
+            params['headers'] = {**params['headers'], **cached.validators()}
+            
+        deadline = Deadline(self.deadline)
+        
         # Try making the request with retries
         for attempt in range(self.max_retries):
             try:
                 logger.info(f"Making request to {url} (attempt {attempt+1}/{self.max_retries})")
-                response = requests.get(**params)
+                params['timeout'] = deadline.attempt_timeout(self.timeout)
+                with host_scheduler.slot(url, self.user_agent, deadline):
+                    started = time.monotonic()
+                    response = session_pool.get(url, **params)
+                    host_scheduler.record_latency(url, time.monotonic() - started)
+                
+                if cached is not None and response.status_code == 304:
+                    logger.info(f"Cached response for {url} is still valid")
+                    _cache_call(http_cache.revalidated, key, response.headers)
+                    return cached.body, cached.charset
                 
                 # Check if request was successful
                 response.raise_for_status()
                 
+                if use_cache:
+                    _cache_call(http_cache.store, key, request_headers, response.headers, response.content)
+                
                 # Log success and return content
                 logger.info(f"Successfully retrieved content from {url}")
-                return response.text
+                return response.content, charset_from_content_type(response.headers.get('Content-Type'))
                 
             except requests.exceptions.RequestException as e:
                 logger.warning(f"Request failed (attempt {attempt+1}/{self.max_retries}): {str(e)}")
                 
-                # If this was the last attempt, raise the exception
-                if attempt == self.max_retries - 1:
-                    raise Exception(f"Failed to retrieve content after {self.max_retries} attempts: {str(e)}")
+                # Raises if the error is not retryable or the budget is spent
+                delay = self._retry_wait(attempt, deadline, e.response, e)
+                time.sleep(delay)
+    
+    async def _aattempt(self, url: str, params: Dict[str, Any], deadline: Deadline) -> httpx.Response:
+        """
+        Send one request within the host's schedule and the deadline
+        
+        Args:
+            url: The URL to request
+            params: Keyword arguments for the request
+            deadline: The request's time budget
+            
+        Returns:
+            The response, whatever its status
+        """
+        async with host_scheduler.aslot(url, self.user_agent, deadline, self.host_concurrency):
+            started = time.monotonic()
+            # The timeout applies per network operation, so also cap the whole attempt
+            response = await asyncio.wait_for(
+                session_pool.aget(url, **params), deadline.remaining()
+            )
+            host_scheduler.record_latency(url, time.monotonic() - started)
+            return response
+    
+    async def _ahedged_attempt(self, url: str, params: Dict[str, Any], deadline: Deadline) -> httpx.Response:
+        """
+        Send a request, and a second one if the first is slow to respond
+        
+        The hedge starts once the first attempt has taken longer than
+        hedge_delay (by default the host's observed latency quantile) and
+        only if the host's hedge budget allows it. The first response wins
+        and the other request is cancelled.
+        
+        Args:
+            url: The URL to request
+            params: Keyword arguments for the request
+            deadline: The request's time budget
+            
+        Returns:
+            The first response received
+        """
+        delay = self.hedge_delay or host_scheduler.hedge_delay(url)
+        if not self.hedge or delay is None:
+            return await self._aattempt(url, params, deadline)
+        
+        primary = asyncio.ensure_future(self._aattempt(url, params, deadline))
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done or not deadline.allows_wait(0) or not host_scheduler.take_hedge(url):
+                return await primary
+            
+            logger.info(f"Hedging request to {url} after {delay:.3f}s")
+            pending.add(asyncio.ensure_future(self._aattempt(url, params, deadline)))
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Read every finished attempt's error, so none goes unretrieved
+                errors = {task: task.exception() for task in done}
+                for task, error in errors.items():
+                    if error is None:
+                        return task.result()
+                # A failed attempt leaves the race to the other one
+                if not pending:
+                    raise next(iter(errors.values()))
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+    
+    async def _amake_request(self, url: str) -> Tuple[bytes, Optional[str]]:
+        """
+        Make a non-blocking HTTP request to the specified URL with retries
+        
+        Uses the HTTP cache and deadline like _make_request, with the disk
+        access run off the event loop. Each attempt is cut off when the
+        budget runs out, and waits never block the event loop. With hedging
+        enabled, a slow attempt is raced against a second one.
+        
+        Args:
+            url: The URL to request
+            
+        Returns:
+            Raw body of the page and the charset declared for it, if any
+            
+        Raises:
+            DeadlineExceeded: If the deadline leaves no time for an attempt
+            Exception: If the request fails after all retries
+        """
+        params = self._async_request_params(url)
+        
+        use_cache = self._use_http_cache()
+        key = cache_key(url, proxies=params.get('proxies'))
+        request_headers = params['headers']
+        cached = await asyncio.to_thread(_cache_call, http_cache.lookup, key, request_headers) if use_cache else None
+        if cached is not None:
+            if cached.is_fresh:
+                logger.info(f"Using cached response for {url}")
+                return cached.body, cached.charset
+            params['headers'] = {**params['headers'], **cached.validators()}
+        
+        deadline = Deadline(self.deadline)
+        
+        for attempt in range(self.max_retries):
+            try:
+                logger.info(f"Making async request to {url} (attempt {attempt+1}/{self.max_retries})")
+                params['timeout'] = deadline.attempt_timeout(self.timeout)
+                response = await self._ahedged_attempt(url, params, deadline)
+                
+                if cached is not None and response.status_code == 304:
+                    logger.info(f"Cached response for {url} is still valid")
+                    await asyncio.to_thread(_cache_call, http_cache.revalidated, key, response.headers)
+                    return cached.body, cached.charset
+                
+                response.raise_for_status()
+                
+                if use_cache:
+                    await asyncio.to_thread(_cache_call, http_cache.store, key, request_headers, response.headers, response.content)
+                
+                logger.info(f"Successfully retrieved content from {url}")
+                return response.content, charset_from_content_type(response.headers.get('Content-Type'))
+                
+            except (httpx.HTTPError, asyncio.TimeoutError) as e:
+                error = e if str(e) else TimeoutError(f"Attempt timed out after {params['timeout']:.1f}s")
+                logger.warning(f"Request failed (attempt {attempt+1}/{self.max_retries}): {str(error)}")
                 
-                # Otherwise, wait and retry
-                time.sleep(self.retry_delay)
+                response = e.response if isinstance(e, httpx.HTTPStatusError) else None
+                delay = self._retry_wait(attempt, deadline, response, error)
+                await asyncio.sleep(delay)
     
-    def scrape(self, url: str) -> Dict[str, Any]:
+    def _check_streamable(self) -> None:
         """
-        Scrape the specified URL and extract data
+        Check that this scraper's extraction can run on a streamed body
+        
+        Raises:
+            ValueError: If the scrape type or selector needs the full tree
+        """
+        if self.scrape_type not in STREAMABLE_TYPES:
+            raise ValueError("Only links and images can be streamed")
+        if self.selector:
+            raise ValueError("A selector cannot be used when streaming")
+    
+    async def astream_records(self, url: str) -> AsyncIterator[Dict[str, str]]:
+        """
+        Stream link or image records from a page as its body downloads
+        
+        The body is read in chunks and fed to an incremental tokenizer, so
+        memory stays bounded however large the page is. The request is not
+        retried, since records are yielded as soon as they are found.
         
         Args:
             url: The URL to scrape
             
-        Returns:
-            Dictionary with the scraped data and metadata
+        Yields:
+            Link or image records
+            
+        Raises:
+            ValueError: If the URL is invalid or the scrape cannot be streamed
         """
-        # Get HTML content
-        html_content = self._make_request(url)
+        self._check_streamable()
+        params = self._async_request_params(url)
         
-        # Parse the HTML
-        parser = HTMLParser(html_content, self.selector)
+        logger.info(f"Making streaming async request to {url}")
+        async with host_scheduler.aslot(url, self.user_agent, max_concurrency=self.host_concurrency), \
+                session_pool.astream("GET", url, **params) as response:
+            response.raise_for_status()
+            encoding = charset_from_content_type(response.headers.get('Content-Type'))
+            chunks = response.aiter_bytes(chunk_size=settings.STREAM_CHUNK_SIZE)
+            async for record in aiter_records(chunks, self.scrape_type, encoding):
+                yield record
+    
+    def _extract_data(self, parser: HTMLParser) -> Any:
+        """
+        Extract data from parsed HTML based on scrape type
         
-        # Extract data based on scrape type
+        Args:
+            parser: The parser holding the page
+            
+        Returns:
+            The extracted data
+        """
         if self.scrape_type == ScrapeType.TEXT:
-            data = parser.extract_text()
+            return parser.extract_text()
         elif self.scrape_type == ScrapeType.TABLES:
-            data = parser.extract_tables()
+            return parser.extract_tables()
         elif self.scrape_type == ScrapeType.LINKS:
-            data = parser.extract_links()
+            return parser.extract_links()
         elif self.scrape_type == ScrapeType.IMAGES:
-            data = parser.extract_images()
+            return parser.extract_images()
         elif self.scrape_type == ScrapeType.FULL:
-            data = parser.extract_full()
+            return parser.extract_full()
         else:
             raise ValueError(f"Unsupported scrape type: {self.scrape_type}")
+    
+    def _parse_only(self, with_links: bool = False) -> Optional[List[str]]:
+        """
+        Get the tags the tree needs to keep for this scraper's scrape type
         
-        # Return the result with metadata
+        Args:
+            with_links: Keep anchors in the tree even if the scrape type does not need them
+            
+        Returns:
+            The tag names, or None if the whole document is needed
+        """
+        if self.selector:
+            return None
+        
+        parse_only = PARSE_ONLY_TAGS.get(self.scrape_type)
+        if parse_only and with_links:
+            parse_only = parse_only + ['a']
+        return parse_only
+    
+    def _parser(self, html_content: str, with_links: bool = False) -> HTMLParser:
+        """
+        Create the HTML parser for this scraper's selector, backend and scrape type
+        
+        Args:
+            html_content: The HTML content to parse
+            with_links: Keep anchors in the tree even if the scrape type does not need them
+        """
+        return HTMLParser(
+            html_content, self.selector, self.parser_backend,
+            parse_only=self._parse_only(with_links)
+        )
+    
+    def _extract(self, html_content: str) -> Any:
+        """
+        Parse HTML content and extract data based on scrape type
+        
+        Args:
+            html_content: The HTML content to extract from
+            
+        Returns:
+            The extracted data
+        """
+        return self._extract_data(self._parser(html_content))
+    
+    def _extract_page(self, html_content: str) -> Tuple[Any, List[Dict[str, str]]]:
+        """
+        Extract data and outgoing links from a page with a single parse
+        
+        Args:
+            html_content: The HTML content to extract from
+            
+        Returns:
+            The extracted data and the page's links
+        """
+        return self._extract_data_and_links(self._parser(html_content, with_links=True))
+    
+    def _extract_data_and_links(self, parser: HTMLParser) -> Tuple[Any, List[Dict[str, str]]]:
+        """
+        Extract data and outgoing links from an already parsed page
+        
+        Args:
+            parser: The parser holding the page, with anchors kept
+            
+        Returns:
+            The extracted data and the page's links
+        """
+        data = self._extract_data(parser)
+        
+        if self.scrape_type == ScrapeType.LINKS:
+            links = data
+        elif self.scrape_type == ScrapeType.FULL:
+            links = data["links"]
+        else:
+            links = parser.extract_links()
+        
+        return data, links
+    
+    def _build_result(self, url: str, data: Any) -> Dict[str, Any]:
+        """Wrap extracted data with result metadata"""
         return {
             "url": url,
             "scrape_type": self.scrape_type,
             "timestamp": datetime.datetime.now().isoformat(),
             "data": data
         }
+    
+    def extraction_options(self, with_links: bool = False) -> Dict[str, Any]:
+        """
+        Get the options that describe this scraper's extraction
+        
+        These are sent with the raw page to the extraction pool, which
+        rebuilds an equivalent scraper in its worker.
+        
+        Args:
+            with_links: Also return the page's outgoing links
+        """
+        return {
+            "scrape_type": self.scrape_type,
+            "selector": self.selector,
+            "parser_backend": self.parser_backend,
+            "with_links": with_links,
+        }
+    
+    async def afetch_page(self, url: str) -> Tuple[Any, List[Dict[str, str]]]:
+        """
+        Fetch a page and extract its data and outgoing links
+        
+        Args:
+            url: The URL to fetch
+            
+        Returns:
+            The extracted data and the page's links
+        """
+        content, encoding = await self._amake_request(url)
+        
+        data, links = await extraction_pool.aextract(
+            content, encoding, self.extraction_options(with_links=True)
+        )
+        return data, links
+    
+    async def acrawl(self, url: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Crawl breadth-first from a URL up to max_depth
+        
+        Args:
+            url: The seed URL
+            
+        Yields:
+            Page results as each page completes
+        """
+        crawler = Crawler(
+            self,
+            max_depth=self.max_depth,
+            max_pages=self.max_pages,
+            same_host_only=self.same_host_only
+        )
+        async for page in crawler.crawl(url):
+            yield page
+    
+    def _flight_key(self, url: str) -> str:
+        """
+        Identify scrapes that produce the same result
+        
+        Covers everything that changes what is fetched or extracted, but not
+        timeouts and retry settings.
+        """
+        return json.dumps({
+            "url": url,
+            "scrape_type": getattr(self.scrape_type, "value", self.scrape_type),
+            "selector": self.selector,
+            "parser_backend": getattr(self.parser_backend, "value", self.parser_backend),
+            "headers": self.headers,
+            "cookies": self.config.get('cookies'),
+            "proxies": self.config.get('proxies'),
+            "follow_links": self.follow_links,
+            "max_depth": self.max_depth,
+            "max_pages": self.max_pages,
+            "same_host_only": self.same_host_only,
+        }, sort_keys=True)
+    
+    def scrape(self, url: str) -> Dict[str, Any]:
+        """
+        Scrape the specified URL and extract data
+        
+        When ``follow_links`` is set, the URL is crawled and the result
+        holds every crawled page. Identical scrapes already in flight are
+        joined instead of repeated.
+        
+        Blocks the calling thread, so use ascrape from async code. Retries,
+        backoff and host scheduling follow the same deadline as ascrape.
+        
+        Args:
+            url: The URL to scrape
+            
+        Returns:
+            Dictionary with the scraped data and metadata
+        """
+        return dict(single_flight.do(self._flight_key(url), lambda: self._scrape(url)))
+    
+    async def ascrape(self, url: str) -> Dict[str, Any]:
+        """
+        Scrape the specified URL without blocking the event loop
+        
+        The HTTP request is made with a non-blocking client and the
+        extraction runs on the shared extraction pool. When
+        ``follow_links`` is set, the URL is crawled and the result holds
+        every crawled page. Identical scrapes already in flight are joined
+        instead of repeated.
+        
+        Args:
+            url: The URL to scrape
+            
+        Returns:
+            Dictionary with the scraped data and metadata
+        """
+        return dict(await single_flight.ado(self._flight_key(url), lambda: self._ascrape(url)))
+    
+    def _scrape(self, url: str) -> Dict[str, Any]:
+        """Scrape a URL, see scrape"""
+        if self.follow_links:
+            return asyncio.run(self._ascrape_and_close(url))
+        
+        # Get HTML content
+        content, encoding = self._make_request(url)
+        
+        data = extraction_pool.extract(content, encoding, self.extraction_options())
+        return self._build_result(url, data)
+    
+    async def _ascrape_and_close(self, url: str) -> Dict[str, Any]:
+        """Scrape a URL on a loop of its own, closing the loop's pooled clients before it ends"""
+        try:
+            return await self._ascrape(url)
+        finally:
+            await session_pool.aclose()
+    
+    async def _ascrape(self, url: str) -> Dict[str, Any]:
+        """Scrape a URL without blocking the event loop, see ascrape"""
+        if self.follow_links:
+            pages = [page async for page in self.acrawl(url)]
+            return self._build_result(url, {"pages": pages})
+        
+        content, encoding = await self._amake_request(url)
+        
+        data = await extraction_pool.aextract(content, encoding, self.extraction_options())
+        return self._build_result(url, data)
\ No newline at end of file
@@ -0,0 +1,462 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import Dict, Any, AsyncIterator, Iterator, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class _CountingHTTPConnection(HTTPConnection):
+    """HTTP connection that reports requests and new sockets to the pool stats"""
+
+    def connect(self) -> None:
+        session_pool.record_connect(self.host)
+        super().connect()
+
+    def request(self, *args, **kwargs) -> None:
+        session_pool.record_request(self.host)
+        super().request(*args, **kwargs)
+
+
+class _CountingHTTPSConnection(HTTPSConnection):
+    """HTTPS connection that reports requests and new sockets to the pool stats"""
+
+    def connect(self) -> None:
+        session_pool.record_connect(self.host)
+        super().connect()
+
+    def request(self, *args, **kwargs) -> None:
+        session_pool.record_request(self.host)
+        super().request(*args, **kwargs)
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _CountingHTTPConnection
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _CountingHTTPSConnection
+
+
+_POOL_CLASSES = {
+    "http": _CountingHTTPConnectionPool,
+    "https": _CountingHTTPSConnectionPool,
+}
+
+
+class _PooledAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools record hit/miss counters"""
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = _POOL_CLASSES
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        if not proxy.lower().startswith("socks"):
+            manager.pool_classes_by_scheme = _POOL_CLASSES
+        return manager
+
+
+class _HostEntry:
+    """A pooled session dedicated to a single host"""
+
+    def __init__(self, session: requests.Session, options: Dict[str, Any]):
+        self.session = session
+        self.options = options
+        self.last_used = time.monotonic()
+        self.active = 0
+
+
+class _AsyncHostEntry:
+    """A pooled async client dedicated to a single host (and proxy setup) on one event loop"""
+
+    def __init__(self, client: httpx.AsyncClient, options: Dict[str, Any]):
+        self.client = client
+        self.options = options
+        self.last_used = time.monotonic()
+        self.active = 0
+
+
+class SessionPool:
+    """
+    Process-wide pool of keep-alive HTTP sessions
+
+    Every host gets its own ``requests.Session`` whose connection pool is
+    sized from settings (optionally overridden per host), so all
+    ``WebScraper`` instances reuse the same TCP/TLS connections. Sessions
+    that sit idle for longer than their max idle time are closed and
+    rebuilt on next use, unless a request is still using them.
+
+    The async side keeps one ``httpx.AsyncClient`` per host and event loop
+    with the same per-host limits, and feeds the same hit/miss counters.
+    Proxied requests get their own client per host and proxy mapping,
+    since httpx binds proxies per client. Clients no request has used for
+    their max idle time are closed too, and ``aclose`` closes the rest of
+    a loop's clients before it ends.
+    """
+
+    def __init__(self, max_hosts: Optional[int] = None):
+        """
+        Initialize the pool
+
+        Args:
+            max_hosts: Most hosts to keep hit/miss counters for
+                (default POOL_STATS_MAX_HOSTS)
+        """
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, _HostEntry] = {}
+        # Structure: {event_loop: {client key: _AsyncHostEntry}}
+        self._async_clients = weakref.WeakKeyDictionary()
+        # Structure: {event_loop: time of the last idle sweep}
+        self._last_async_sweep = weakref.WeakKeyDictionary()
+        self.max_hosts = max_hosts or settings.POOL_STATS_MAX_HOSTS
+        # Least recently used first
+        self._counters: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+        self._last_sweep = time.monotonic()
+
+    def _host_options(self, host: str) -> Dict[str, Any]:
+        """Get the pool options for a host, applying any per-host overrides"""
+        options = {
+            "pool_maxsize": settings.POOL_MAXSIZE,
+            "max_idle": settings.POOL_MAX_IDLE,
+            "keep_alive": settings.POOL_KEEP_ALIVE,
+        }
+        options.update(settings.POOL_HOST_OVERRIDES.get(host, {}))
+        return options
+
+    def _new_session(self, options: Dict[str, Any]) -> requests.Session:
+        """Create a session with a pooled adapter configured from options"""
+        session = requests.Session()
+
+        # Scrapes are independent of one another, so never carry cookies
+        # set by one target response over into the next request
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
+        adapter = _PooledAdapter(
+            pool_connections=1,
+            pool_maxsize=options["pool_maxsize"],
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        if not options["keep_alive"]:
+            session.headers["Connection"] = "close"
+
+        return session
+
+    @staticmethod
+    def _is_idle(entry, now: float) -> bool:
+        """Whether a pooled session or client is unused and past its max idle time"""
+        return not entry.active and now - entry.last_used > entry.options["max_idle"]
+
+    def _sweep_idle(self, now: float) -> None:
+        """Close sessions that have been idle for longer than their max idle time; the lock must be held"""
+        for host, entry in list(self._hosts.items()):
+            if self._is_idle(entry, now):
+                logger.debug(f"Closing idle connection pool for {host}")
+                entry.session.close()
+                del self._hosts[host]
+        self._last_sweep = now
+
+    @contextmanager
+    def session(self, url: str) -> Iterator[requests.Session]:
+        """
+        Use the pooled session for the host of a URL
+
+        A session is not closed for idleness while in use.
+
+        Args:
+            url: The URL that will be requested
+
+        Yields:
+            The shared session for the URL's host
+        """
+        host = (urlparse(url).hostname or "").lower()
+        now = time.monotonic()
+
+        with self._lock:
+            if now - self._last_sweep > settings.POOL_MAX_IDLE:
+                self._sweep_idle(now)
+
+            entry = self._hosts.get(host)
+            if entry and self._is_idle(entry, now):
+                entry.session.close()
+                entry = None
+
+            if entry is None:
+                options = self._host_options(host)
+                entry = _HostEntry(self._new_session(options), options)
+                self._hosts[host] = entry
+            entry.active += 1
+
+        try:
+            yield entry.session
+        finally:
+            with self._lock:
+                entry.active -= 1
+                entry.last_used = time.monotonic()
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request through the pooled session for the URL's host
+
+        Args:
+            method: HTTP method
+            url: The URL to request
+            **kwargs: Extra arguments passed to ``requests.Session.request``
+
+        Returns:
+            The HTTP response
+        """
+        with self.session(url) as session:
+            return session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """Send a GET request through the pool"""
+        return self.request("GET", url, **kwargs)
+
+    def _new_async_client(
+        self,
+        options: Dict[str, Any],
+        proxies: Optional[Dict[str, str]] = None
+    ) -> httpx.AsyncClient:
+        """Create an async client with limits configured from options, going through proxies if given"""
+        limits = httpx.Limits(
+            max_connections=options["pool_maxsize"],
+            max_keepalive_connections=options["pool_maxsize"] if options["keep_alive"] else 0,
+            keepalive_expiry=options["max_idle"],
+        )
+        # Each proxy transport keeps its own connection pool with the same limits
+        mounts = {
+            f"{scheme}://": httpx.AsyncHTTPTransport(proxy=proxy, limits=limits)
+            for scheme, proxy in (proxies or {}).items()
+        }
+        return httpx.AsyncClient(
+            limits=limits,
+            mounts=mounts or None,
+            follow_redirects=True,
+            cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+        )
+
+    def _sweep_idle_async(self, clients: Dict[str, _AsyncHostEntry], now: float) -> List[httpx.AsyncClient]:
+        """Remove a loop's clients that have been idle for too long; the lock must be held"""
+        idle = []
+        for key, entry in list(clients.items()):
+            if self._is_idle(entry, now):
+                logger.debug(f"Closing idle async connection pool for {key}")
+                idle.append(entry.client)
+                del clients[key]
+        return idle
+
+    @asynccontextmanager
+    async def async_client(
+        self,
+        url: str,
+        proxies: Optional[Dict[str, str]] = None
+    ) -> AsyncIterator[httpx.AsyncClient]:
+        """
+        Use the pooled async client for the host of a URL
+
+        Clients are bound to the running event loop, so each loop gets
+        its own set. A client is not closed for idleness while in use.
+
+        Args:
+            url: The URL that will be requested
+            proxies: Optional requests-style proxy mapping; each mapping
+                gets its own clients
+
+        Yields:
+            The shared async client for the URL's host and proxies
+        """
+        host = (urlparse(url).hostname or "").lower()
+        key = f"{host} via {json.dumps(proxies, sort_keys=True)}" if proxies else host
+        loop = asyncio.get_running_loop()
+        now = time.monotonic()
+
+        with self._lock:
+            clients = self._async_clients.setdefault(loop, {})
+            idle = []
+            if now - self._last_async_sweep.setdefault(loop, now) > settings.POOL_MAX_IDLE:
+                idle = self._sweep_idle_async(clients, now)
+                self._last_async_sweep[loop] = now
+
+            entry = clients.get(key)
+            if entry is None or entry.client.is_closed:
+                options = self._host_options(host)
+                entry = _AsyncHostEntry(self._new_async_client(options, proxies), options)
+                clients[key] = entry
+            entry.active += 1
+
+        for client in idle:
+            await client.aclose()
+        try:
+            yield entry.client
+        finally:
+            with self._lock:
+                entry.active -= 1
+                entry.last_used = time.monotonic()
+
+    async def arequest(
+        self,
+        method: str,
+        url: str,
+        proxies: Optional[Dict[str, str]] = None,
+        **kwargs
+    ) -> httpx.Response:
+        """
+        Send a request through the pooled async client for the URL's host
+
+        Args:
+            method: HTTP method
+            url: The URL to request
+            proxies: Optional requests-style proxy mapping
+            **kwargs: Extra arguments passed to ``httpx.AsyncClient.request``
+
+        Returns:
+            The HTTP response
+        """
+        kwargs["extensions"] = self._trace_extensions(url, kwargs.get("extensions"))
+
+        async with self.async_client(url, proxies) as client:
+            return await client.request(method, url, **kwargs)
+
+    @asynccontextmanager
+    async def astream(
+        self,
+        method: str,
+        url: str,
+        proxies: Optional[Dict[str, str]] = None,
+        **kwargs
+    ) -> AsyncIterator[httpx.Response]:
+        """
+        Send a request through the pool without reading the body up front
+
+        Use as ``async with session_pool.astream(...) as response`` and read
+        the body with ``response.aiter_bytes()``.
+
+        Args:
+            method: HTTP method
+            url: The URL to request
+            proxies: Optional requests-style proxy mapping
+            **kwargs: Extra arguments passed to ``httpx.AsyncClient.stream``
+
+        Yields:
+            The HTTP response with its body still unread
+        """
+        kwargs["extensions"] = self._trace_extensions(url, kwargs.get("extensions"))
+
+        async with self.async_client(url, proxies) as client:
+            async with client.stream(method, url, **kwargs) as response:
+                yield response
+
+    def _trace_extensions(self, url: str, extensions: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Add a trace hook that feeds the hit/miss counters to request extensions"""
+        host = (urlparse(url).hostname or "").lower()
+
+        async def trace(event: str, info: Dict[str, Any]) -> None:
+            if event.endswith("connect_tcp.complete"):
+                self.record_connect(host)
+            elif event.endswith("send_request_headers.started"):
+                self.record_request(host)
+
+        return {**(extensions or {}), "trace": trace}
+
+    async def aget(self, url: str, **kwargs) -> httpx.Response:
+        """Send an async GET request through the pool"""
+        return await self.arequest("GET", url, **kwargs)
+
+    def _host_counters(self, host: str) -> Dict[str, int]:
+        """Get a host's counters, dropping the least recently used hosts beyond max_hosts; the lock must be held"""
+        counters = self._counters.get(host)
+        if counters is None:
+            counters = self._counters[host] = {"requests": 0, "connections": 0}
+            while len(self._counters) > self.max_hosts:
+                self._counters.popitem(last=False)
+        else:
+            self._counters.move_to_end(host)
+        return counters
+
+    def record_request(self, host: str) -> None:
+        """Count a request sent over a pooled connection"""
+        with self._lock:
+            self._host_counters(host)["requests"] += 1
+
+    def record_connect(self, host: str) -> None:
+        """Count a new TCP (and TLS) connection being opened"""
+        with self._lock:
+            self._host_counters(host)["connections"] += 1
+
+    def stats(self, host: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get pool hit/miss counters
+
+        A hit is a request served over an already open connection, a miss
+        is a request that needed a new connection (and handshake).
+
+        Args:
+            host: Restrict the stats to a single host
+
+        Returns:
+            Dictionary with overall and per-host counters
+        """
+        with self._lock:
+            counters = {
+                h: dict(c) for h, c in self._counters.items()
+                if host is None or h == host
+            }
+            open_pools = len(self._hosts)
+
+        per_host = {}
+        total_requests = total_misses = 0
+        for h, c in counters.items():
+            misses = min(c["connections"], c["requests"])
+            per_host[h] = {
+                "requests": c["requests"],
+                "hits": c["requests"] - misses,
+                "misses": misses,
+            }
+            total_requests += c["requests"]
+            total_misses += misses
+
+        return {
+            "open_pools": open_pools,
+            "requests": total_requests,
+            "hits": total_requests - total_misses,
+            "misses": total_misses,
+            "hit_rate": (total_requests - total_misses) / total_requests if total_requests else 0.0,
+            "hosts": per_host,
+        }
+
+    def close(self) -> None:
+        """Close every pooled session"""
+        with self._lock:
+            for entry in self._hosts.values():
+                entry.session.close()
+            self._hosts.clear()
+
+    async def aclose(self) -> None:
+        """Close the async clients bound to the running event loop, before the loop ends"""
+        with self._lock:
+            clients = self._async_clients.pop(asyncio.get_running_loop(), {})
+        for entry in clients.values():
+            await entry.client.aclose()
+
+
+# Shared pool used by every WebScraper instance
+session_pool = SessionPool()
@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import weakref
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+class _AsyncFlight:
+    """An in-flight async call and the number of callers waiting on it"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Deduplicate identical concurrent calls
+
+    While a call for a key is in flight, further calls with the same key
+    wait for it and receive its result (or exception) instead of starting
+    their own. The key is forgotten as soon as the call finishes, so
+    nothing is cached.
+
+    Async calls are tracked per event loop. The shared call is cancelled
+    only once every caller waiting on it has been cancelled.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        # Structure: {event_loop: {key: _AsyncFlight}}
+        self._async_calls = weakref.WeakKeyDictionary()
+        self._counters = {"calls": 0, "coalesced": 0}
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """
+        Run a call, or wait for the identical one already in flight
+
+        Args:
+            key: Identifies calls that produce the same result
+            func: The call to run if none is in flight
+
+        Returns:
+            The call's result
+        """
+        with self._lock:
+            self._counters["calls"] += 1
+            future = self._calls.get(key)
+            if future is not None:
+                self._counters["coalesced"] += 1
+                leader = False
+            else:
+                future = Future()
+                self._calls[key] = future
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(func())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return future.result()
+
+    async def ado(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await a call, or wait for the identical one already in flight
+
+        Args:
+            key: Identifies calls that produce the same result
+            func: Creates the awaitable to run if none is in flight
+
+        Returns:
+            The call's result
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._counters["calls"] += 1
+            calls = self._async_calls.setdefault(loop, {})
+            flight = calls.get(key)
+            if flight is None:
+                flight = _AsyncFlight(loop.create_task(func()))
+                calls[key] = flight
+                flight.task.add_done_callback(lambda _: self._forget(calls, key, flight))
+            else:
+                self._counters["coalesced"] += 1
+            flight.waiters += 1
+
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            with self._lock:
+                flight.waiters -= 1
+                abandoned = flight.waiters == 0 and not flight.task.done()
+                if abandoned and calls.get(key) is flight:
+                    # Later callers must start a new call, not join a cancelled one
+                    del calls[key]
+            if abandoned:
+                flight.task.cancel()
+            raise
+
+    def _forget(self, calls: Dict[Hashable, _AsyncFlight], key: Hashable, flight: _AsyncFlight) -> None:
+        """Drop a finished async call"""
+        with self._lock:
+            if calls.get(key) is flight:
+                del calls[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get coalescing counters
+
+        Returns:
+            Dictionary with the number of calls, how many of them joined a
+            call already in flight and how many calls are in flight now
+        """
+        with self._lock:
+            in_flight = len(self._calls) + sum(len(calls) for calls in self._async_calls.values())
+            calls = self._counters["calls"]
+            return {
+                "calls": calls,
+                "coalesced": self._counters["coalesced"],
+                "in_flight": in_flight,
+                "coalesced_rate": self._counters["coalesced"] / calls if calls else 0.0,
+            }
+
+# Shared by every WebScraper so identical concurrent scrapes run once
+single_flight = SingleFlight()
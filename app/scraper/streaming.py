@@ -0,0 +1,274 @@
+import codecs
+import re
+from html.parser import HTMLParser as _TokenizingParser
+from typing import AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.models.schema import ScrapeType
+
+# Scrape types the streaming extractor can produce
+STREAMABLE_TYPES = {ScrapeType.LINKS, ScrapeType.IMAGES}
+
+# Longest anchor text kept per link, so one huge anchor cannot grow memory
+MAX_LINK_TEXT = 2048
+
+# How far into the document to look for a <meta charset> declaration
+CHARSET_SNIFF_BYTES = 4096
+
+META_CHARSET_PATTERN = re.compile(
+    rb'<meta[^>]+charset\s*=\s*["\']?\s*([a-zA-Z0-9_:.\-]+)',
+    re.IGNORECASE,
+)
+
+def _attribute(attrs: Dict[str, Optional[str]], name: str) -> str:
+    """Read an attribute, treating a value-less attribute as an empty string"""
+    return attrs.get(name) or ""
+
+class _RecordBuilder:
+    """
+    Turn tokenizer events for anchors and images into records
+
+    Used as the target of an incremental tokenizer: it only sees start,
+    end and text events, never a tree, and keeps just the anchor that is
+    currently open. Records are buffered until ``drain`` is called.
+    """
+
+    def __init__(self, scrape_type: ScrapeType):
+        self.scrape_type = scrape_type
+        self._records: List[Dict[str, str]] = []
+        # Open anchor: its attributes, finished text pieces and current text node
+        self._anchor: Optional[Dict[str, Optional[str]]] = None
+        self._anchor_text: List[str] = []
+        self._anchor_text_length = 0
+        self._text_node: List[str] = []
+
+    def _flush_text_node(self) -> None:
+        """Finish the text node inside the open anchor, stripped like get_text(strip=True)"""
+        if not self._text_node:
+            return
+        text = "".join(self._text_node).strip()
+        self._text_node = []
+        if text and self._anchor_text_length < MAX_LINK_TEXT:
+            text = text[:MAX_LINK_TEXT - self._anchor_text_length]
+            self._anchor_text.append(text)
+            self._anchor_text_length += len(text)
+
+    def _close_anchor(self) -> None:
+        """Emit the open anchor as a link record"""
+        self._flush_text_node()
+        attrs = self._anchor
+        self._records.append({
+            "url": _attribute(attrs, "href"),
+            "text": "".join(self._anchor_text),
+            "title": _attribute(attrs, "title"),
+        })
+        self._anchor = None
+        self._anchor_text = []
+        self._anchor_text_length = 0
+
+    def start(self, tag: str, attrs: Dict[str, Optional[str]]) -> None:
+        if self._anchor is not None:
+            self._flush_text_node()
+
+        if tag == "a" and self.scrape_type == ScrapeType.LINKS:
+            # Anchors cannot nest, so a new one closes the previous one
+            if self._anchor is not None:
+                self._close_anchor()
+            if "href" in attrs:
+                self._anchor = dict(attrs)
+        elif tag == "img" and self.scrape_type == ScrapeType.IMAGES:
+            if "src" in attrs:
+                self._records.append({
+                    "src": _attribute(attrs, "src"),
+                    "alt": _attribute(attrs, "alt"),
+                    "title": _attribute(attrs, "title"),
+                    "width": _attribute(attrs, "width"),
+                    "height": _attribute(attrs, "height"),
+                })
+
+    def end(self, tag: str) -> None:
+        if self._anchor is None:
+            return
+        if tag == "a":
+            self._close_anchor()
+        else:
+            self._flush_text_node()
+
+    def data(self, data: str) -> None:
+        if self._anchor is not None and self._anchor_text_length < MAX_LINK_TEXT:
+            self._text_node.append(data)
+
+    def close(self) -> None:
+        if self._anchor is not None:
+            self._close_anchor()
+
+    def drain(self) -> List[Dict[str, str]]:
+        """Take the records produced so far"""
+        records, self._records = self._records, []
+        return records
+
+class _StreamTokenizer(_TokenizingParser):
+    """
+    Incremental tokenizer feeding events to a record builder
+
+    The standard library's tokenizer only keeps the unparsed tail of its
+    input, so memory stays bounded by the largest single tag. lxml's feed
+    parsers are faster but keep the whole document in memory even with a
+    callback target, so they are not used here.
+    """
+
+    def __init__(self, target: _RecordBuilder):
+        super().__init__(convert_charrefs=True)
+        self.target = target
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        self.target.start(tag, dict(attrs))
+
+    def handle_endtag(self, tag: str) -> None:
+        self.target.end(tag)
+
+    def handle_data(self, data: str) -> None:
+        self.target.data(data)
+
+class StreamingExtractor:
+    """
+    Extract links or images from an HTML document fed in chunks
+
+    Chunks of raw bytes are decoded incrementally and tokenized as they
+    arrive, and every complete record is returned right away, so a page of
+    any size can be processed without holding it (or a tree of it) in
+    memory. Only the LINKS and IMAGES scrape types are supported; records
+    have the same shape as HTMLParser's.
+    """
+
+    def __init__(self, scrape_type: ScrapeType, encoding: Optional[str] = None):
+        """
+        Initialize the extractor
+
+        Args:
+            scrape_type: ScrapeType.LINKS or ScrapeType.IMAGES
+            encoding: The charset declared by the response, if any;
+                otherwise it is sniffed from the start of the document
+
+        Raises:
+            ValueError: If the scrape type cannot be streamed
+        """
+        if scrape_type not in STREAMABLE_TYPES:
+            raise ValueError(f"Scrape type {scrape_type} cannot be streamed")
+
+        self.encoding = encoding
+        self._builder = _RecordBuilder(scrape_type)
+        self._tokenizer = _StreamTokenizer(self._builder)
+        self._decoder = None
+        self._head = b""
+        self._fed = False
+
+    def _create_decoder(self, head: bytes) -> None:
+        """Pick the encoding from the response, a BOM or a meta tag, defaulting to UTF-8"""
+        candidates = [self.encoding]
+        if head.startswith(codecs.BOM_UTF8):
+            candidates.insert(0, "utf-8-sig")
+        match = META_CHARSET_PATTERN.search(head)
+        if match:
+            candidates.append(match.group(1).decode("ascii"))
+        candidates.append("utf-8")
+
+        for encoding in candidates:
+            if not encoding:
+                continue
+            try:
+                self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+                self.encoding = encoding
+                return
+            except LookupError:
+                continue
+
+    def _feed_text(self, text: str) -> None:
+        """Pass decoded text to the tokenizer"""
+        if text:
+            self._tokenizer.feed(text)
+            self._fed = True
+
+    def feed(self, chunk: bytes) -> List[Dict[str, str]]:
+        """
+        Feed the next chunk of the document
+
+        Args:
+            chunk: Raw bytes of the response body
+
+        Returns:
+            The records completed by this chunk
+        """
+        if self._decoder is None:
+            # Hold back the first few KB until the charset can be sniffed
+            self._head += chunk
+            if len(self._head) < CHARSET_SNIFF_BYTES:
+                return []
+            chunk, self._head = self._head, b""
+            self._create_decoder(chunk)
+
+        self._feed_text(self._decoder.decode(chunk))
+        return self._builder.drain()
+
+    def close(self) -> List[Dict[str, str]]:
+        """
+        Signal the end of the document
+
+        Returns:
+            The remaining records
+        """
+        if self._decoder is None:
+            head, self._head = self._head, b""
+            self._create_decoder(head)
+            chunk = head
+        else:
+            chunk = b""
+
+        self._feed_text(self._decoder.decode(chunk, final=True))
+        if self._fed:
+            self._tokenizer.close()
+        self._builder.close()
+        return self._builder.drain()
+
+def iter_records(
+    chunks: Iterable[bytes],
+    scrape_type: ScrapeType,
+    encoding: Optional[str] = None
+) -> Iterator[Dict[str, str]]:
+    """
+    Yield link or image records from a document as its chunks arrive
+
+    Args:
+        chunks: The raw response body in chunks
+        scrape_type: ScrapeType.LINKS or ScrapeType.IMAGES
+        encoding: The charset declared by the response, if any
+
+    Yields:
+        Link or image records
+    """
+    extractor = StreamingExtractor(scrape_type, encoding)
+    for chunk in chunks:
+        yield from extractor.feed(chunk)
+    yield from extractor.close()
+
+async def aiter_records(
+    chunks: AsyncIterable[bytes],
+    scrape_type: ScrapeType,
+    encoding: Optional[str] = None
+) -> AsyncIterator[Dict[str, str]]:
+    """
+    Async version of iter_records for chunks read without blocking
+
+    Args:
+        chunks: The raw response body in chunks
+        scrape_type: ScrapeType.LINKS or ScrapeType.IMAGES
+        encoding: The charset declared by the response, if any
+
+    Yields:
+        Link or image records
+    """
+    extractor = StreamingExtractor(scrape_type, encoding)
+    async for chunk in chunks:
+        for record in extractor.feed(chunk):
+            yield record
+    for record in extractor.close():
+        yield record
@@ -0,0 +1,178 @@
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from bs4 import Tag
+
+NUMBER_PATTERN = re.compile(r'^[+-]?(\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?$')
+
+def _span(cell: Tag, attribute: str) -> int:
+    """Read a colspan/rowspan attribute, treating invalid values as 1"""
+    try:
+        return max(1, min(int(cell.get(attribute, 1)), 1000))
+    except (TypeError, ValueError):
+        return 1
+
+def _table_rows(table: Tag) -> Iterator[Tuple[str, Tag]]:
+    """
+    Iterate over the rows that belong directly to a table
+
+    Rows of nested tables are skipped.
+
+    Yields:
+        The section each row is in ("thead", "tbody", "tfoot" or "" when
+        the row is a direct child of the table) and the row element
+    """
+    for child in table.children:
+        if not isinstance(child, Tag):
+            continue
+        if child.name == 'tr':
+            yield "", child
+        elif child.name in ('thead', 'tbody', 'tfoot'):
+            for row in child.find_all('tr', recursive=False):
+                yield child.name, row
+
+def _expand_grid(table: Tag) -> List[Tuple[str, List[Optional[str]], bool]]:
+    """
+    Lay the table out as a grid, copying cells into every slot their
+    colspan and rowspan cover
+
+    Returns:
+        One entry per row with the row's section, its cell texts and
+        whether every cell in it is a header cell
+    """
+    grid = []
+    # Cells from earlier rows still spanning down: {column: (rows_left, text, is_header)}
+    spanning: Dict[int, Tuple[int, Optional[str], bool]] = {}
+
+    for section, row in _table_rows(table):
+        values: List[Optional[str]] = []
+        header_flags: List[bool] = []
+
+        def fill_spanning() -> None:
+            while len(values) in spanning:
+                column = len(values)
+                rows_left, text, is_header = spanning[column]
+                values.append(text)
+                header_flags.append(is_header)
+                if rows_left > 1:
+                    spanning[column] = (rows_left - 1, text, is_header)
+                else:
+                    del spanning[column]
+
+        for cell in row.find_all(['td', 'th'], recursive=False):
+            fill_spanning()
+
+            text = cell.get_text(" ", strip=True) or None
+            is_header = cell.name == 'th'
+            rowspan = _span(cell, 'rowspan')
+
+            for _ in range(_span(cell, 'colspan')):
+                if rowspan > 1:
+                    spanning[len(values)] = (rowspan - 1, text, is_header)
+                values.append(text)
+                header_flags.append(is_header)
+
+        fill_spanning()
+
+        if values:
+            grid.append((section, values, all(header_flags)))
+
+    return grid
+
+def _column_names(header_rows: List[List[Optional[str]]], width: int) -> List[Any]:
+    """
+    Build unique column names from the header rows
+
+    Multi-row headers are joined per column, empty names become
+    "Unnamed: <n>" and duplicates get a ".<n>" suffix, as pandas does.
+    """
+    if not header_rows:
+        return list(range(width))
+
+    names = []
+    for column in range(width):
+        parts = []
+        for row in header_rows:
+            text = row[column] if column < len(row) else None
+            if text and (not parts or parts[-1] != text):
+                parts.append(text)
+        names.append(" ".join(parts) or f"Unnamed: {column}")
+
+    counts: Dict[str, int] = {}
+    unique = []
+    for name in names:
+        if name in counts:
+            counts[name] += 1
+            unique.append(f"{name}.{counts[name]}")
+        else:
+            counts[name] = 0
+            unique.append(name)
+    return unique
+
+def _to_number(text: str) -> Any:
+    """Parse a cell as an int or float, allowing "," thousands separators"""
+    cleaned = text.replace(",", "")
+    if not NUMBER_PATTERN.match(cleaned):
+        raise ValueError(f"Not a number: {text}")
+    try:
+        return int(cleaned)
+    except ValueError:
+        return float(cleaned)
+
+def _coerce_numeric_columns(rows: List[List[Optional[str]]], width: int) -> None:
+    """Convert columns whose values are all numeric to numbers, in place, as pandas does"""
+    for column in range(width):
+        texts = [row[column] for row in rows if column < len(row) and row[column] is not None]
+        try:
+            numbers = [_to_number(text) for text in texts]
+        except ValueError:
+            continue
+        if not numbers:
+            continue
+        if any(isinstance(number, float) for number in numbers):
+            numbers = [float(number) for number in numbers]
+        converted = iter(numbers)
+        for row in rows:
+            if column < len(row) and row[column] is not None:
+                row[column] = next(converted)
+
+def extract_table(table: Tag) -> Tuple[List[Any], List[Dict[Any, Any]]]:
+    """
+    Extract headers and row records directly from a parsed table
+
+    Handles colspan/rowspan and detects header rows from ``<thead>`` or,
+    without one, from leading rows made only of ``<th>`` cells. Tables
+    without a header get integer column names, and all-numeric columns
+    are converted to numbers.
+
+    Args:
+        table: The table element
+
+    Returns:
+        The column names and one dictionary per body row
+
+    Raises:
+        ValueError: If the table has no cells, like pandas.read_html
+    """
+    grid = _expand_grid(table)
+    if not grid:
+        raise ValueError("Table has no cells")
+    width = max((len(values) for _, values, _ in grid), default=0)
+
+    has_thead = any(section == 'thead' for section, _, _ in grid)
+    header_rows = []
+    body_rows = []
+    for section, values, all_headers in grid:
+        if has_thead:
+            is_header_row = section == 'thead'
+        else:
+            is_header_row = all_headers and not body_rows
+        (header_rows if is_header_row else body_rows).append(values)
+
+    headers = _column_names(header_rows, width)
+    _coerce_numeric_columns(body_rows, width)
+    data = [
+        {name: (values[i] if i < len(values) else None) for i, name in enumerate(headers)}
+        for values in body_rows
+    ]
+    return headers, data
@@ -0,0 +1,160 @@
+import asyncio
+import math
+import threading
+import time
+import weakref
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+
+class Overloaded(Exception):
+    """Raised when a request is shed because the server is saturated"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        """The Retry-After header value, in whole seconds"""
+        return str(max(1, math.ceil(self.retry_after)))
+
+class AdmissionController:
+    """
+    Bounded in-flight queue in front of the scrape endpoints
+
+    At most ``max_concurrency`` requests run at once and the rest wait in
+    a queue. A new request is rejected straight away when the queue is
+    full or its estimated wait is over ``target_wait``. The estimate is
+    the queue length times the average service time (an exponentially
+    weighted moving average of recent requests) divided by the
+    concurrency, so the queue a server accepts shrinks as targets slow
+    down and grows back as they recover. A queued request that still has
+    not started after ``target_wait`` is rejected too.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, target_wait: float, alpha: float = 0.2):
+        """
+        Initialize the controller
+
+        Args:
+            max_concurrency: Maximum requests running at once
+            max_queue: Maximum requests waiting to run
+            target_wait: Longest queueing time to accept, in seconds
+            alpha: Weight of the latest request in the service time average
+        """
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.target_wait = target_wait
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        # Structure: {event_loop: asyncio.Semaphore}
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._service_time: Optional[float] = None
+        self._active = 0
+        self._queued = 0
+        self._counters = {"admitted": 0, "rejected": 0, "timed_out": 0}
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphore = self._semaphores.get(loop)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(self.max_concurrency)
+                self._semaphores[loop] = semaphore
+            return semaphore
+
+    def _estimated_wait(self, position: int) -> float:
+        """Estimate how long a request at a queue position waits; the lock must be held"""
+        if self._active < self.max_concurrency:
+            return 0.0
+        return position * (self._service_time or 0.0) / self.max_concurrency
+
+    def _reject(self, message: str, retry_after: float, counter: str = "rejected") -> Overloaded:
+        with self._lock:
+            self._counters[counter] += 1
+        return Overloaded(message, retry_after)
+
+    async def acquire(self) -> float:
+        """
+        Wait for a request to be admitted
+
+        Returns:
+            The time the request started running, to pass to release
+
+        Raises:
+            Overloaded: If the request is shed
+        """
+        semaphore = self._semaphore()
+        with self._lock:
+            wait = self._estimated_wait(self._queued + 1)
+            full = self._queued >= self.max_queue
+            if not full and wait <= self.target_wait:
+                self._queued += 1
+        if full:
+            raise self._reject("Server is busy: scrape queue is full", max(wait, 1.0))
+        if wait > self.target_wait:
+            raise self._reject(f"Server is busy: estimated wait is {wait:.1f}s", wait)
+
+        try:
+            await asyncio.wait_for(semaphore.acquire(), self.target_wait)
+        except asyncio.TimeoutError:
+            with self._lock:
+                retry_after = self._estimated_wait(self._queued)
+            raise self._reject("Server is busy: timed out waiting in the scrape queue", retry_after, "timed_out")
+        finally:
+            with self._lock:
+                self._queued -= 1
+
+        with self._lock:
+            self._active += 1
+            self._counters["admitted"] += 1
+        return time.monotonic()
+
+    def release(self, started: float, record: bool = True) -> None:
+        """
+        Mark an admitted request as finished
+
+        Args:
+            started: The value returned by acquire
+            record: Whether the request's duration counts towards the
+                service time average; off for requests, such as streams,
+                whose duration says little about the next one's
+        """
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self._active -= 1
+            if record:
+                if self._service_time is None:
+                    self._service_time = elapsed
+                else:
+                    self._service_time += self.alpha * (elapsed - self._service_time)
+        self._semaphore().release()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get queue and shedding counters
+
+        Returns:
+            Dictionary with the requests running and queued, the service
+            time average, the current estimated wait and the admitted,
+            rejected and timed out counts
+        """
+        with self._lock:
+            return {
+                **self._counters,
+                "active": self._active,
+                "queued": self._queued,
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "service_time": round(self._service_time, 3) if self._service_time is not None else None,
+                "estimated_wait": round(self._estimated_wait(self._queued + 1), 3),
+            }
+
+# Shared by the scrape endpoints
+admission = AdmissionController(
+    max_concurrency=settings.ADMISSION_MAX_CONCURRENCY,
+    max_queue=settings.ADMISSION_MAX_QUEUE,
+    target_wait=settings.ADMISSION_TARGET_WAIT,
+    alpha=settings.ADMISSION_EWMA_ALPHA,
+)
@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+class MemoryLRUCache:
+    """
+    Thread-safe LRU cache bounded by total size and entry age
+
+    Every entry is stored with a size in bytes given by the caller. When
+    the total goes over ``max_bytes`` the least recently used entries are
+    evicted, and entries older than ``ttl`` seconds are treated as missing.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float):
+        """
+        Initialize the cache
+
+        Args:
+            max_bytes: Maximum total size of the cached entries, 0 disables the cache
+            ttl: Seconds an entry stays valid after it is stored
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # Structure: {key: (expires_at, size, value)}, least recently used first
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Look up an entry
+
+        Args:
+            key: The entry's key
+
+        Returns:
+            The cached value, or None if it is missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                self._remove(key)
+                entry = None
+
+            if entry is None:
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[2]
+
+    def set(self, key: Hashable, value: Any, size: int) -> None:
+        """
+        Store an entry, evicting least recently used entries to make room
+
+        Entries larger than the whole cache are not stored.
+
+        Args:
+            key: The entry's key
+            value: The value to cache
+            size: Size of the value in bytes
+        """
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (time.monotonic() + self.ttl, size, value)
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._evictions += 1
+
+    def _remove(self, key: Hashable) -> None:
+        """Drop an entry; the lock must be held"""
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get hit-rate and size statistics
+
+        Returns:
+            Dictionary with hits, misses, evictions, entries and bytes used
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+            }
@@ -1,6 +1,9 @@
+import math
+import os
+import sqlite3
+import threading
 import time
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Optional, Tuple
 import logging
 from fastapi import HTTPException, status, Request
 
@@ -8,9 +11,13 @@ from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
-# In-memory storage for rate limiting
-# Structure:  {ip_address: [timestamp1, timestamp2, ...]}
-request_history: Dict[str, List[datetime]] = {}
+# Sliding window counter state: (start of the current window, requests in
+# the previous window, requests in the current window)
+WindowState = Tuple[float, int, int]
+
+# Result of a rate limit check: (allowed, remaining requests, seconds until
+# the next request would be allowed)
+LimitResult = Tuple[bool, int, float]
 
 def get_client_ip(request: Request) -> str:
     """Get the client IP address from a request"""
@@ -19,74 +26,265 @@ def get_client_ip(request: Request) -> str:
         return forwarded.split(",")[0]
     return request.client.host or "127.0.0.1"
 
-def clean_old_requests() -> None:
-    """Clean requests older than 1 minute from the history"""
-    now = datetime.now()
-    cutoff = now - timedelta(minutes=1)
-    
-    for ip, timestamps in list(request_history.items()):
-        # Filter out old timestamps
-        new_timestamps = [ts for ts in timestamps if ts > cutoff]
-        
-        # Update history or remove empty entries
-        if new_timestamps:
-            request_history[ip] = new_timestamps
-        else:
-            del request_history[ip]
+class MemoryRateLimitBackend:
+    """
+    Rate limit state kept in this process
+
+    Each worker process has its own state, so with several workers the
+    effective limit is multiplied by the worker count.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states: Dict[str, WindowState] = {}
+
+    def update(self, key: str, func: Callable[[Optional[WindowState]], Tuple[WindowState, LimitResult]]) -> LimitResult:
+        """
+        Atomically apply a function to the state of a key
+
+        Args:
+            key: The client key
+            func: Maps the current state (None if there is none) to the new
+                state and the result to return
+
+        Returns:
+            The result produced by func
+        """
+        with self._lock:
+            state, result = func(self._states.get(key))
+            self._states[key] = state
+            return result
+
+    def purge(self, older_than: float) -> None:
+        """Drop the state of keys whose current window started before a time"""
+        with self._lock:
+            self._states = {
+                key: state for key, state in self._states.items()
+                if state[0] >= older_than
+            }
+
+class SQLiteRateLimitBackend:
+    """
+    Rate limit state shared by every worker process on a node
+
+    State lives in a SQLite database file and each update runs in its own
+    write transaction, so concurrent workers see one consistent count.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the backend
+
+        Args:
+            path: Path of the SQLite database file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database, once per process; the lock must be held"""
+        # Connections must not be shared with forked worker processes
+        if self._db is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits ("
+                "key TEXT PRIMARY KEY, window_start REAL NOT NULL, "
+                "previous INTEGER NOT NULL, current INTEGER NOT NULL)"
+            )
+            self._pid = os.getpid()
+        return self._db
+
+    def update(self, key: str, func: Callable[[Optional[WindowState]], Tuple[WindowState, LimitResult]]) -> LimitResult:
+        """
+        Atomically apply a function to the state of a key
+
+        Args:
+            key: The client key
+            func: Maps the current state (None if there is none) to the new
+                state and the result to return
+
+        Returns:
+            The result produced by func
+        """
+        with self._lock:
+            db = self._connection()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute(
+                    "SELECT window_start, previous, current FROM rate_limits WHERE key = ?",
+                    (key,)
+                ).fetchone()
+                state, result = func(tuple(row) if row else None)
+                if state != row:
+                    db.execute(
+                        "INSERT OR REPLACE INTO rate_limits (key, window_start, previous, current) "
+                        "VALUES (?, ?, ?, ?)",
+                        (key, *state)
+                    )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            return result
+
+    def purge(self, older_than: float) -> None:
+        """Drop the state of keys whose current window started before a time"""
+        with self._lock:
+            self._connection().execute("DELETE FROM rate_limits WHERE window_start < ?", (older_than,))
+
+class SlidingWindowRateLimiter:
+    """
+    Sliding window counter rate limiter
+
+    Keeps two counters per client, for the current and the previous fixed
+    window, and estimates the requests in the last ``window`` seconds by
+    weighting the previous count by how much of it still overlaps. Every
+    check is constant time whatever the number of clients, and the state
+    lives in a pluggable backend so it can be shared between processes.
+    """
+
+    def __init__(self, backend, limit: int, window: float = 60.0):
+        """
+        Initialize the limiter
+
+        Args:
+            backend: Where the per-client state is kept
+            limit: Maximum requests per window
+            window: Window length in seconds
+        """
+        self.backend = backend
+        self.limit = limit
+        self.window = window
+        self._next_purge = time.time() + window
+
+    def _current(self, state: Optional[WindowState], now: float) -> WindowState:
+        """Move a state forward to the window containing now"""
+        window_start = now - now % self.window
+        if state is None:
+            return (window_start, 0, 0)
+
+        start, previous, current = state
+        if window_start == start:
+            return state
+        if window_start - start == self.window:
+            return (window_start, current, 0)
+        return (window_start, 0, 0)
+
+    def _estimate(self, state: WindowState, now: float) -> float:
+        """Estimate the requests made in the sliding window ending now"""
+        start, previous, current = state
+        overlap = 1 - (now - start) / self.window
+        return previous * overlap + current
+
+    def _retry_after(self, state: WindowState, now: float) -> float:
+        """Seconds until the estimate drops below the limit"""
+        start, previous, current = state
+        if current >= self.limit:
+            return start + self.window - now
+        # Solve previous * (1 - t / window) + current + 1 <= limit for t
+        elapsed_needed = self.window * (1 - (self.limit - current - 1) / previous)
+        return max(0.0, start + elapsed_needed - now)
+
+    def _maybe_purge(self, now: float) -> None:
+        """Drop idle clients once per window, so state does not grow forever"""
+        if now < self._next_purge:
+            return
+        self._next_purge = now + self.window
+        self.backend.purge(now - 2 * self.window)
+
+    def hit(self, key: str) -> LimitResult:
+        """
+        Count a request for a client if it is within the limit
+
+        Args:
+            key: The client key, usually its IP address
+
+        Returns:
+            Whether the request is allowed, the remaining requests and the
+            seconds to wait before retrying when it is not
+        """
+        now = time.time()
+        self._maybe_purge(now)
+
+        def apply(state: Optional[WindowState]) -> Tuple[WindowState, LimitResult]:
+            state = self._current(state, now)
+            estimate = self._estimate(state, now)
+            if estimate + 1 > self.limit:
+                return state, (False, 0, self._retry_after(state, now))
+            start, previous, current = state
+            state = (start, previous, current + 1)
+            return state, (True, max(0, math.floor(self.limit - estimate - 1)), 0.0)
+
+        return self.backend.update(key, apply)
+
+    def remaining(self, key: str) -> int:
+        """
+        Get the requests a client can still make without counting one
+
+        Args:
+            key: The client key
+
+        Returns:
+            Number of remaining requests allowed in the current window
+        """
+        now = time.time()
+
+        def apply(state: Optional[WindowState]) -> Tuple[WindowState, LimitResult]:
+            state = self._current(state, now)
+            remaining = max(0, math.floor(self.limit - self._estimate(state, now)))
+            return state, (remaining > 0, remaining, 0.0)
+
+        return self.backend.update(key, apply)[1]
+
+def create_rate_limiter() -> SlidingWindowRateLimiter:
+    """Create the rate limiter configured by the RATE_LIMIT_* settings"""
+    if settings.RATE_LIMIT_BACKEND == "sqlite":
+        backend = SQLiteRateLimitBackend(settings.RATE_LIMIT_SQLITE_PATH)
+    elif settings.RATE_LIMIT_BACKEND == "memory":
+        backend = MemoryRateLimitBackend()
+    else:
+        raise ValueError(f"Unknown rate limit backend: {settings.RATE_LIMIT_BACKEND}")
+    return SlidingWindowRateLimiter(backend, settings.RATE_LIMIT_PER_MINUTE, 60.0)
+
+# Shared limiter used by the API and Flask front ends
+limiter = create_rate_limiter()
 
 def rate_limiter(request: Request) -> None:
     """
     Rate limiting middleware function
-    
+
     Args:
         request: The FastAPI request object
-    
+
     Raises:
         HTTPException: If rate limit is exceeded
     """
-    # Clean up old requests
-    clean_old_requests()
-    
     # Get client IP
     ip = get_client_ip(request)
-    
-    # Get limit from settings
-    limit = settings.RATE_LIMIT_PER_MINUTE
-    
-    # Initialize request history for this IP if not exists
-    if ip not in request_history:
-        request_history[ip] = []
-    
-    # Check if rate limit is exceeded
-    if len(request_history[ip]) >= limit:
+
+    allowed, _, retry_after = limiter.hit(ip)
+    if not allowed:
         logger.warning(f"Rate limit exceeded for IP: {ip}")
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail="Rate limit exceeded. Please try again later.",
-            headers={"Retry-After": "60"}
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
         )
-    
-    # Add current timestamp to history
-    request_history[ip].append(datetime.now())
 
 def get_remaining_requests(ip: str = "127.0.0.1") -> int:
     """
     Get remaining requests for an IP
-    
+
     Args:
         ip: IP address to check
-        
+
     Returns:
         Number of remaining requests allowed in current window
     """
-    # Clean up old requests first
-    clean_old_requests()
-    
-    # Get limit from settings
-    limit = settings.RATE_LIMIT_PER_MINUTE
-    
-    # Check current usage
-    current = len(request_history.get(ip, []))
-    
-    # Calculate remaining
-    return max(0, limit - current)
+    return limiter.remaining(ip)
@@ -0,0 +1,39 @@
+from functools import lru_cache
+from typing import Dict, Any
+
+import soupsieve
+
+from app.core.config import settings
+
+@lru_cache(maxsize=settings.SELECTOR_CACHE_SIZE)
+def compile_selector(selector: str) -> soupsieve.SoupSieve:
+    """
+    Compile a CSS selector, reusing the compiled form across requests
+    
+    Args:
+        selector: The CSS selector
+        
+    Returns:
+        The compiled selector
+        
+    Raises:
+        soupsieve.SelectorSyntaxError: If the selector is invalid
+    """
+    return soupsieve.compile(selector)
+
+def get_selector_cache_stats() -> Dict[str, Any]:
+    """
+    Get hit-rate statistics for the compiled selector cache
+    
+    Returns:
+        Dictionary with hits, misses, size and hit rate
+    """
+    info = compile_selector.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "max_size": info.maxsize,
+        "hit_rate": info.hits / lookups if lookups else 0.0,
+    }
@@ -2,6 +2,10 @@ import re
 from typing import Optional
 from urllib.parse import urlparse
 
+from soupsieve import SelectorSyntaxError
+
+from app.utils.selector_cache import compile_selector
+
 class ValidationError(Exception):
     """Custom validation error"""
     pass
@@ -30,7 +34,7 @@ def validate_url(url: str) -> bool:
         
         # Check if domain looks valid (basic check)
         domain_pattern = r'^[a-zA-Z0-9]([a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?(\.[a-zA-Z0-9]([a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?)*$'
-        if not re.match(domain_pattern, result.netloc):
+        if not re.match(domain_pattern, result.hostname or ""):
             raise ValidationError(f"Invalid domain in URL: {url}")
         
         return True
@@ -71,4 +75,11 @@ def validate_selector(selector: Optional[str]) -> bool:
         if re.search(pattern, selector, re.IGNORECASE):
             raise ValidationError(f"Selector contains potentially dangerous content: {selector}")
     
+    # Compiling through the shared cache means a selector that passes
+    # validation is already compiled when the parser uses it
+    try:
+        compile_selector(selector)
+    except SelectorSyntaxError as e:
+        raise ValidationError(f"Invalid CSS selector: {str(e)}")
+    
     return True
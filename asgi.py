@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
@@ -6,11 +8,22 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.router import api_router
 from app.core.config import settings
+from app.jobs.runner import job_runner
+from app.scraper.session_pool import session_pool
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Run background jobs alongside the API, unless JOB_WORKERS is 0
+    job_runner.start()
+    yield
+    job_runner.stop()
+    await session_pool.aclose()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description=settings.PROJECT_DESCRIPTION,
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS
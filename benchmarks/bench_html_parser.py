@@ -0,0 +1,148 @@
+"""
+Benchmarks for HTMLParser extraction
+
+Run from the repository root:
+
+    python -m benchmarks.bench_html_parser --size-mb 3
+"""
+import argparse
+import time
+import tracemalloc
+from typing import Callable
+
+from app.scraper.html_parser import HTMLParser
+from app.scraper.parser_backends import available_backends, build_soup
+
+def build_corpus(size_mb: float) -> str:
+    """Build a synthetic page of roughly the given size with links, images and tables"""
+    block = (
+        "<div class='item'><h2>Heading</h2>"
+        "<p>Some paragraph text with <a href='/page/{i}' title='Page {i}'>a link {i}</a> "
+        "and <a href='https://example.com/{i}'>another</a>.</p>"
+        "<img src='/img/{i}.png' alt='Image {i}' width='100' height='50'>"
+        "<ul>" + "".join(f"<li>List entry {n}</li>" for n in range(10)) + "</ul>"
+        "</div>"
+    )
+    table = (
+        "<table><thead><tr><th>Name</th><th>Value</th></tr></thead><tbody>"
+        + "".join(f"<tr><td>row {n}</td><td>{n}</td></tr>" for n in range(10))
+        + "</tbody></table>"
+    )
+
+    parts = ["<html><head><title>Benchmark</title></head><body>"]
+    size = 0
+    i = 0
+    while size < size_mb * 1024 * 1024:
+        chunk = block.format(i=i)
+        if i % 50 == 0:
+            chunk += table
+        parts.append(chunk)
+        size += len(chunk)
+        i += 1
+    parts.append("</body></html>")
+    return "".join(parts)
+
+def best_of(func: Callable[[], object], repeat: int) -> float:
+    """Run a function several times and return the fastest wall time in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def bench_extract_full(html: str, repeat: int) -> None:
+    """Compare separate per-type tree walks against the single-pass walk"""
+    parser = HTMLParser(html)
+    # Build the lazy tree before timing, so neither case pays for the parse
+    parser.soup
+
+    def separate():
+        return (parser.extract_tables(), parser.extract_links(), parser.extract_images())
+
+    def single_pass():
+        return parser._extract_elements()
+
+    separate_time = best_of(separate, repeat)
+    single_time = best_of(single_pass, repeat)
+
+    print("extract_full (tables + links + images):")
+    print(f"  separate walks: {separate_time * 1000:9.1f} ms")
+    print(f"  single pass:    {single_time * 1000:9.1f} ms")
+    print(f"  speedup:        {separate_time / single_time:9.2f}x")
+
+def bench_backends(html: str, repeat: int) -> None:
+    """Compare parse time and peak memory of every available parser backend"""
+    print("Parser backends (parse only):")
+    print(f"  {'backend':<14}{'time':>12}{'peak memory':>16}")
+
+    for backend in available_backends():
+        parse_time = best_of(lambda: build_soup(html, backend), repeat)
+
+        # Peak memory only covers allocations made through Python's
+        # allocator, which includes the tree BeautifulSoup builds
+        tracemalloc.start()
+        soup = build_soup(html, backend)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del soup
+
+        print(f"  {backend:<14}{parse_time * 1000:9.1f} ms{peak / 1024 / 1024:13.1f} MB")
+
+def bench_text(html: str, repeat: int) -> None:
+    """Compare a TEXT scrape with an eagerly built tree against the lazy tree"""
+
+    def eager():
+        parser = HTMLParser(html)
+        parser.soup
+        return parser.extract_text()
+
+    def lazy():
+        return HTMLParser(html).extract_text()
+
+    eager_time = best_of(eager, repeat)
+    lazy_time = best_of(lazy, repeat)
+
+    print("extract_text (no selector):")
+    print(f"  eager tree:     {eager_time * 1000:9.1f} ms")
+    print(f"  lazy tree:      {lazy_time * 1000:9.1f} ms")
+    print(f"  speedup:        {eager_time / lazy_time:9.2f}x")
+
+def bench_parse_only(html: str, repeat: int) -> None:
+    """Compare a links-only scrape on the full tree against a strained tree"""
+
+    def measure(parse_only):
+        def run():
+            return HTMLParser(html, parse_only=parse_only).extract_links()
+
+        run_time = best_of(run, repeat)
+        tracemalloc.start()
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return run_time, peak
+
+    full_time, full_peak = measure(None)
+    strained_time, strained_peak = measure(['a'])
+
+    print("extract_links (parse + extract):")
+    print(f"  full tree:      {full_time * 1000:9.1f} ms{full_peak / 1024 / 1024:9.1f} MB peak")
+    print(f"  strained tree:  {strained_time * 1000:9.1f} ms{strained_peak / 1024 / 1024:9.1f} MB peak")
+    print(f"  speedup:        {full_time / strained_time:9.2f}x")
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--size-mb", type=float, default=3.0, help="Size of the synthetic page")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement")
+    args = arg_parser.parse_args()
+
+    html = build_corpus(args.size_mb)
+    print(f"Corpus: {len(html) / 1024 / 1024:.1f} MB")
+
+    bench_backends(html, args.repeat)
+    bench_extract_full(html, args.repeat)
+    bench_text(html, args.repeat)
+    bench_parse_only(html, args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -1,102 +1,16 @@
 from flask import Flask, jsonify, render_template, request
-import trafilatura
-import requests
-from bs4 import BeautifulSoup
 import json
 from urllib.parse import urlparse
-import datetime
+
+from app.models.schema import ScrapeType
+from app.scraper.extraction_pool import ExtractionQueueFull
+from app.scraper.scraper import WebScraper
+from app.utils.rate_limiter import limiter
 
 # Create a simple Flask app
 app = Flask(__name__, template_folder='templates')
 
-# Request history for rate limiting
-request_history = {}
-RATE_LIMIT = 10  # Requests per minute
-
-def get_website_text_content(url):
-    """Extract text content from a website using trafilatura"""
-    try:
-        downloaded = trafilatura.fetch_url(url)
-        if not downloaded:
-            return "Failed to fetch content from the URL"
-        
-        text = trafilatura.extract(downloaded)
-        return text or "No content extracted"
-    except Exception as e:
-        return f"Error: {str(e)}"
-
-def extract_tables(html_content):
-    """Extract tables from HTML content"""
-    try:
-        soup = BeautifulSoup(html_content, 'html.parser')
-        tables = []
-        
-        for i, table in enumerate(soup.find_all('table')):
-            headers = []
-            rows_data = []
-            
-            # Extract headers
-            for th in table.find_all('th'):
-                headers.append(th.get_text(strip=True))
-            
-            # If no headers found, generate them
-            if not headers and table.find_all('tr'):
-                first_row = table.find('tr')
-                if first_row:
-                    headers = [f"Column {i+1}" for i in range(len(first_row.find_all(['td', 'th'])))]
-            
-            # Extract rows
-            for tr in table.find_all('tr'):
-                cells = [td.get_text(strip=True) for td in tr.find_all(['td', 'th'])]
-                if cells and len(cells) == len(headers):
-                    row_data = {headers[i]: cells[i] for i in range(len(headers))}
-                    rows_data.append(row_data)
-            
-            if headers and rows_data:
-                tables.append({
-                    "headers": headers,
-                    "data": rows_data
-                })
-        
-        return tables
-    except Exception as e:
-        return []
-
-def extract_links(html_content):
-    """Extract links from HTML content"""
-    try:
-        soup = BeautifulSoup(html_content, 'html.parser')
-        links = []
-        
-        for a_tag in soup.find_all('a', href=True):
-            links.append({
-                "url": a_tag['href'],
-                "text": a_tag.get_text(strip=True) or "",
-                "title": a_tag.get('title', ""),
-            })
-        
-        return links
-    except Exception as e:
-        return []
-
-def extract_images(html_content):
-    """Extract images from HTML content"""
-    try:
-        soup = BeautifulSoup(html_content, 'html.parser')
-        images = []
-        
-        for img_tag in soup.find_all('img', src=True):
-            images.append({
-                "src": img_tag['src'],
-                "alt": img_tag.get('alt', ""),
-                "title": img_tag.get('title', ""),
-                "width": img_tag.get('width', ""),
-                "height": img_tag.get('height', ""),
-            })
-        
-        return images
-    except Exception as e:
-        return []
+RATE_LIMIT = limiter.limit  # Requests per minute
 
 def validate_url(url):
     """Validate URL format"""
@@ -108,25 +22,8 @@ def validate_url(url):
 
 def rate_limiter(client_ip):
     """Apply rate limiting"""
-    now = datetime.datetime.now()
-    cutoff = now - datetime.timedelta(minutes=1)
-    
-    # Clean old requests
-    for ip, timestamps in list(request_history.items()):
-        request_history[ip] = [ts for ts in timestamps if ts > cutoff]
-        if not request_history[ip]:
-            del request_history[ip]
-    
-    # Check if rate limit exceeded
-    if client_ip not in request_history:
-        request_history[client_ip] = []
-    
-    if len(request_history[client_ip]) >= RATE_LIMIT:
-        return False
-    
-    # Add current request
-    request_history[client_ip].append(now)
-    return True
+    allowed, _, _ = limiter.hit(client_ip)
+    return allowed
 
 @app.route('/')
 def home():
@@ -163,32 +60,25 @@ def scrape_url():
                 "message": "Invalid URL provided"
             }), 400
         
+        if scrape_type not in [t.value for t in ScrapeType]:
+            return jsonify({
+                "success": False,
+                "message": f"Unsupported scrape type: {scrape_type}"
+            }), 400
+        
         # Get HTML content
         user_agent = data.get('config', {}).get('user_agent', 
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
         timeout = data.get('config', {}).get('timeout', 30)
         
-        response = requests.get(url, headers={"User-Agent": user_agent}, timeout=timeout)
-        html_content = response.text
-        
-        # Extract based on scrape type
-        result = {}
-        
-        if scrape_type == 'text':
-            result = get_website_text_content(url)
-        elif scrape_type == 'tables':
-            result = extract_tables(html_content)
-        elif scrape_type == 'links':
-            result = extract_links(html_content)
-        elif scrape_type == 'images':
-            result = extract_images(html_content)
-        elif scrape_type == 'full':
-            result = {
-                "text": get_website_text_content(url),
-                "tables": extract_tables(html_content),
-                "links": extract_links(html_content),
-                "images": extract_images(html_content),
-            }
+        # Fetch through the shared session pool, HTTP cache and host
+        # scheduler, and extract in the shared extraction pool
+        scraper = WebScraper(
+            config={"user_agent": user_agent, "timeout": timeout},
+            selector=selector,
+            scrape_type=ScrapeType(scrape_type)
+        )
+        result = scraper.scrape(url)
         
         # Create response with metadata
         return jsonify({
@@ -196,12 +86,18 @@ def scrape_url():
             "url": url,
             "data": {
                 "scrape_type": scrape_type,
-                "timestamp": datetime.datetime.now().isoformat(),
-                "data": result
+                "timestamp": result["timestamp"],
+                "data": result["data"]
             },
             "message": "Scraping completed successfully"
         })
         
+    except ExtractionQueueFull as e:
+        return jsonify({
+            "success": False,
+            "message": str(e)
+        }), 503, {"Retry-After": "1"}
+        
     except Exception as e:
         return jsonify({
             "success": False,
@@ -211,9 +107,7 @@ def scrape_url():
 @app.route('/api/config', methods=['GET'])
 def get_config():
     """Get the current scraper configuration options"""
-    remaining = RATE_LIMIT
-    if request.remote_addr in request_history:
-        remaining = max(0, RATE_LIMIT - len(request_history[request.remote_addr]))
+    remaining = limiter.remaining(request.remote_addr)
     
     config = {
         "available_scrape_types": ["text", "tables", "links", "images", "full"],
@@ -236,16 +130,7 @@ def get_config():
 @app.route('/api/rate-limit', methods=['GET'])
 def check_rate_limit():
     """Check current rate limit status"""
-    client_ip = request.remote_addr
-    remaining = RATE_LIMIT
-    
-    if client_ip in request_history:
-        # Clean old requests
-        now = datetime.datetime.now()
-        cutoff = now - datetime.timedelta(minutes=1)
-        request_history[client_ip] = [ts for ts in request_history[client_ip] if ts > cutoff]
-        
-        remaining = max(0, RATE_LIMIT - len(request_history[client_ip]))
+    remaining = limiter.remaining(request.remote_addr)
     
     return jsonify({"remaining_requests": remaining})
 
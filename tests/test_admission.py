@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from app.utils.admission import AdmissionController, Overloaded
+
+def test_requests_over_capacity_wait_then_run():
+    controller = AdmissionController(max_concurrency=1, max_queue=1, target_wait=1.0)
+
+    async def scenario():
+        started = await controller.acquire()
+        waiting = asyncio.ensure_future(controller.acquire())
+        await asyncio.sleep(0)
+        assert controller.stats()["queued"] == 1
+        controller.release(started)
+        controller.release(await waiting)
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["admitted"] == 2 and stats["active"] == 0 and stats["service_time"] is not None
+
+def test_full_queue_is_shed():
+    controller = AdmissionController(max_concurrency=1, max_queue=1, target_wait=1.0)
+
+    async def scenario():
+        started = await controller.acquire()
+        waiting = asyncio.ensure_future(controller.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as shed:
+            await controller.acquire()
+        controller.release(started)
+        controller.release(await waiting)
+        return shed.value
+
+    shed = asyncio.run(scenario())
+    assert "queue is full" in str(shed)
+    assert shed.retry_after_header == "1"
+    assert controller.stats()["rejected"] == 1
+
+def test_slow_service_sheds_before_queueing():
+    controller = AdmissionController(max_concurrency=1, max_queue=10, target_wait=1.0)
+    controller._service_time = 5.0
+
+    async def scenario():
+        started = await controller.acquire()
+        with pytest.raises(Overloaded) as shed:
+            await controller.acquire()
+        controller.release(started, record=False)
+        return shed.value
+
+    shed = asyncio.run(scenario())
+    assert shed.retry_after == 5.0
+    assert controller.stats()["service_time"] == 5.0
+
+def test_queued_request_times_out():
+    controller = AdmissionController(max_concurrency=1, max_queue=10, target_wait=0.05)
+
+    async def scenario():
+        started = await controller.acquire()
+        with pytest.raises(Overloaded):
+            await controller.acquire()
+        controller.release(started, record=False)
+
+    asyncio.run(scenario())
+    stats = controller.stats()
+    assert stats["timed_out"] == 1 and stats["queued"] == 0
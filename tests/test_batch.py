@@ -0,0 +1,51 @@
+import asyncio
+
+from app.core.config import settings
+from app.models.schema import ScraperRequest
+from app.scraper import batch as batch_module
+from app.scraper.batch import BatchScraper
+
+def _requests(count):
+    return [ScraperRequest(url=f"http://a.example/{i}") for i in range(count)]
+
+def test_per_host_cap_is_passed_to_the_scheduler(monkeypatch):
+    monkeypatch.setattr(settings, "BATCH_PER_HOST_CONCURRENCY", 3)
+    caps = []
+
+    async def ascrape(self, url):
+        caps.append(self.host_concurrency)
+        return {"url": url}
+
+    monkeypatch.setattr(batch_module.WebScraper, "ascrape", ascrape)
+    assert BatchScraper().per_host_concurrency == 3
+    assert BatchScraper(per_host_concurrency=10).per_host_concurrency == 3
+    results = asyncio.run(BatchScraper(per_host_concurrency=2).run(_requests(3)))
+    assert [item["index"] for item in results] == [0, 1, 2]
+    assert caps == [2, 2, 2]
+
+def test_no_per_host_cap_by_default(monkeypatch):
+    monkeypatch.setattr(settings, "BATCH_PER_HOST_CONCURRENCY", None)
+    assert BatchScraper().per_host_concurrency is None
+
+def test_stopping_early_waits_for_cancelled_scrapes(monkeypatch):
+    finished = []
+
+    async def ascrape(self, url):
+        try:
+            if not url.endswith("/0"):
+                await asyncio.sleep(10)
+            return {"url": url}
+        finally:
+            finished.append(url)
+
+    monkeypatch.setattr(batch_module.WebScraper, "ascrape", ascrape)
+
+    async def first_result():
+        results = BatchScraper().iter_results(_requests(5))
+        first = await results.__anext__()
+        await results.aclose()
+        return first, len(finished)
+
+    first, finished_on_close = asyncio.run(first_result())
+    assert first["index"] == 0
+    assert finished_on_close == 5
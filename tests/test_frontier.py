@@ -0,0 +1,78 @@
+import asyncio
+
+from app.jobs.runner import JobRunner
+from app.scraper.frontier import DiskFrontier
+
+def _drain(frontier):
+    popped = []
+    while len(frontier):
+        url, _ = frontier.pop()
+        frontier.complete(url)
+        popped.append(url)
+    return popped
+
+def test_urls_are_deduplicated_across_batches(tmp_path):
+    frontier = DiskFrontier(str(tmp_path / "frontier.sqlite"), batch_size=2)
+    assert frontier.extend(["http://a/1", "http://a/2", "http://a/3"], 0) == 3
+    # Some are written out by now and some still buffered
+    assert frontier.extend(["http://a/1", "http://a/3", "http://a/4"], 1) == 1
+    frontier.checkpoint()
+    assert not frontier.add("http://a/2", 1)
+    assert sorted(_drain(frontier)) == ["http://a/1", "http://a/2", "http://a/3", "http://a/4"]
+    assert not frontier.add("http://a/1", 2)
+    frontier.close()
+
+def test_pop_takes_turns_between_hosts(tmp_path):
+    frontier = DiskFrontier(str(tmp_path / "frontier.sqlite"))
+    frontier.extend(["http://a/1", "http://a/2", "http://a/3"], 0)
+    frontier.extend(["http://b/1", "http://b/2"], 0)
+    hosts = [url.split("/")[2] for url in _drain(frontier)]
+    assert hosts == ["a", "b", "a", "b", "a"]
+    frontier.close()
+
+def test_pop_prefers_shallow_urls_per_host(tmp_path):
+    frontier = DiskFrontier(str(tmp_path / "frontier.sqlite"))
+    frontier.add("http://a/deep", 2)
+    frontier.add("http://a/top", 0)
+    assert frontier.pop() == ("http://a/top", 0)
+    frontier.close()
+
+def test_resume_requeues_urls_in_flight(tmp_path):
+    path = str(tmp_path / "frontier.sqlite")
+    frontier = DiskFrontier(path)
+    frontier.extend(["http://a/1", "http://a/2", "http://a/3"], 0)
+    first, _ = frontier.pop()
+    frontier.complete(first)
+    leased, _ = frontier.pop()
+    frontier.checkpoint()
+    # Lost on close: neither checkpointed
+    frontier.complete(leased)
+    frontier.add("http://a/4", 1)
+    frontier.close()
+
+    resumed = DiskFrontier(path)
+    assert resumed.completed == 1
+    remaining = _drain(resumed)
+    assert leased in remaining and first not in remaining
+    assert len(remaining) == 2
+    resumed.close(delete=True)
+
+class _Store:
+    def __init__(self, keep_running):
+        self.keep_running = keep_running
+
+    def add_results(self, job_id, lease_token, results):
+        return self.keep_running
+
+class _Frontier:
+    checkpoints = 0
+
+    def checkpoint(self):
+        self.checkpoints += 1
+
+def test_frontier_is_checkpointed_only_while_the_job_runs():
+    for keep_running, checkpoints in [(True, 1), (False, 0)]:
+        frontier = _Frontier()
+        runner = JobRunner(_Store(keep_running), workers=0)
+        assert asyncio.run(runner._add_results("job", "token", [{}], frontier)) is keep_running
+        assert frontier.checkpoints == checkpoints
@@ -0,0 +1,106 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.scraper.host_scheduler import HostScheduler
+from app.scraper.retry import Deadline, DeadlineExceeded
+
+@pytest.fixture(autouse=True)
+def no_throttling(monkeypatch):
+    monkeypatch.setattr(settings, "HOST_RESPECT_CRAWL_DELAY", False)
+    monkeypatch.setattr(settings, "HOST_REQUESTS_PER_SECOND", 0)
+    monkeypatch.setattr(settings, "HOST_MAX_CONCURRENCY", 4)
+
+async def _peak_concurrency(scheduler, requests, **kwargs):
+    running = peak = 0
+
+    async def request():
+        nonlocal running, peak
+        async with scheduler.aslot("http://a.example/", **kwargs):
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    await asyncio.gather(*(request() for _ in range(requests)))
+    return peak
+
+def test_async_slots_respect_the_host_limit():
+    assert asyncio.run(_peak_concurrency(HostScheduler(), 10)) == 4
+
+def test_caller_can_lower_the_host_limit():
+    assert asyncio.run(_peak_concurrency(HostScheduler(), 10, max_concurrency=2)) == 2
+    assert asyncio.run(_peak_concurrency(HostScheduler(), 10, max_concurrency=100)) == 4
+
+def test_cancelled_waiter_gives_up_its_place():
+    scheduler = HostScheduler()
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def hold():
+            async with scheduler.aslot("http://a.example/", max_concurrency=1):
+                await release.wait()
+
+        holder = asyncio.ensure_future(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(hold())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        release.set()
+        await holder
+        async with scheduler.aslot("http://a.example/", max_concurrency=1):
+            pass
+        return scheduler._state("a.example").async_slots[asyncio.get_running_loop()].active
+
+    assert asyncio.run(scenario()) == 0
+
+def test_request_starts_are_spaced_by_the_host_rate(monkeypatch):
+    monkeypatch.setattr(settings, "HOST_REQUESTS_PER_SECOND", 10)
+    scheduler = HostScheduler()
+    state = scheduler._state("a.example")
+    delays = [scheduler._reserve(state, 0.0) for _ in range(3)]
+    assert delays[0] == 0
+    assert delays[1] == pytest.approx(0.1, abs=0.01)
+    assert delays[2] == pytest.approx(0.2, abs=0.01)
+    assert scheduler.stats()["hosts"]["a.example"]["delayed"] == 2
+
+def test_longer_crawl_delay_wins_and_is_capped(monkeypatch):
+    monkeypatch.setattr(settings, "HOST_REQUESTS_PER_SECOND", 10)
+    monkeypatch.setattr(settings, "HOST_MAX_CRAWL_DELAY", 5.0)
+    scheduler = HostScheduler()
+    state = scheduler._state("a.example")
+    scheduler._store_robots(state, scheduler._parse_robots(200, "User-agent: *\nCrawl-delay: 2"))
+    assert scheduler._crawl_delay(state, "bot") == 2.0
+    scheduler._store_robots(state, scheduler._parse_robots(200, "User-agent: *\nCrawl-delay: 60"))
+    assert scheduler._crawl_delay(state, "bot") == 5.0
+    scheduler._store_robots(state, scheduler._parse_robots(404, "Crawl-delay: 60"))
+    assert scheduler._crawl_delay(state, "bot") == 0.0
+
+def test_wait_past_the_deadline_reserves_nothing():
+    scheduler = HostScheduler()
+    state = scheduler._state("a.example")
+    state.next_start = time.monotonic() + 10
+    next_start = state.next_start
+    with pytest.raises(DeadlineExceeded):
+        scheduler._reserve(state, 0.0, Deadline(1.0))
+    assert state.next_start == next_start and state.requests == 0
+
+def test_least_recently_used_idle_hosts_are_forgotten():
+    scheduler = HostScheduler(max_hosts=2)
+    busy = scheduler._state("busy.example")
+    scheduler._hold(busy, 1)
+    scheduler._state("a.example")
+    scheduler._state("b.example")
+    assert set(scheduler._hosts) == {"busy.example", "b.example"}
+    scheduler._hold(busy, -1)
+    scheduler._state("b.example")
+    scheduler._state("c.example")
+    assert set(scheduler._hosts) == {"b.example", "c.example"}
+
+def test_hosts_are_keyed_by_host_and_port():
+    assert HostScheduler._host_key("http://A.example/x") == "a.example"
+    assert HostScheduler._host_key("http://a.example:8080/x") == "a.example:8080"
@@ -0,0 +1,103 @@
+import sqlite3
+
+import pytest
+
+from app.core.config import settings
+from app.scraper import scraper as scraper_module
+from app.scraper.http_cache import HTTPCache, cache_key, freshness_lifetime
+from app.scraper.scraper import WebScraper
+
+URL = "http://example.com/page"
+KEY = cache_key(URL)
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None, content=b""):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = content
+
+    def raise_for_status(self):
+        assert self.status_code < 400
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = HTTPCache(str(tmp_path / "cache.sqlite3"), 1024)
+    yield cache
+    cache.close()
+
+@pytest.fixture
+def scraper(monkeypatch, cache):
+    monkeypatch.setattr(scraper_module, "http_cache", cache)
+    monkeypatch.setattr(settings, "HOST_RESPECT_CRAWL_DELAY", False)
+    return WebScraper({"max_retries": 1})
+
+def test_freshness_lifetime():
+    assert freshness_lifetime({"Cache-Control": "max-age=60", "Age": "20"}) == 40
+    assert freshness_lifetime({"Cache-Control": "no-cache, max-age=60"}) == 0
+    assert freshness_lifetime({"Cache-Control": "no-store"}) is None
+    assert freshness_lifetime({"Expires": "Thu, 01 Jan 1970 00:00:00 GMT"}) == 0
+
+def test_fresh_and_stale_entries(cache):
+    cache.store(KEY, {}, {"Cache-Control": "max-age=60"}, b"fresh")
+    assert cache.lookup(KEY, {}).is_fresh
+
+    cache.store(KEY, {}, {"Cache-Control": "max-age=0", "ETag": '"v1"'}, b"stale")
+    stale = cache.lookup(KEY, {})
+    assert not stale.is_fresh
+    assert stale.validators() == {"If-None-Match": '"v1"'}
+
+    cache.store(cache_key("http://example.com/other"), {}, {"Cache-Control": "no-store"}, b"x")
+    cache.store(cache_key("http://example.com/plain"), {}, {}, b"x")
+    assert cache.stats()["entries"] == 1
+
+def test_revalidated_entry_is_fresh_again(cache):
+    cache.store(KEY, {}, {"Cache-Control": "max-age=0", "ETag": '"v1"'}, b"body")
+    cache.revalidated(KEY, {"Cache-Control": "max-age=60", "ETag": '"v2"'})
+    cached = cache.lookup(KEY, {})
+    assert cached.is_fresh and cached.body == b"body" and cached.etag == '"v2"'
+
+def test_vary_and_proxies_select_the_variant(cache):
+    headers = {"Cache-Control": "max-age=60", "Vary": "Accept-Language"}
+    cache.store(KEY, {"Accept-Language": "en"}, headers, b"english")
+    assert cache.lookup(KEY, {"accept-language": "en"}).body == b"english"
+    assert cache.lookup(KEY, {"Accept-Language": "fr"}) is None
+    assert cache.lookup(KEY, {}) is None
+
+    proxied = cache_key(URL, proxies={"https": "http://proxy:3128"})
+    assert proxied != KEY
+    assert cache.lookup(proxied, {"Accept-Language": "en"}) is None
+
+def test_eviction_counts_entries_from_other_processes(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    first, second = HTTPCache(path, 1024), HTTPCache(path, 1024)
+    headers = {"Cache-Control": "max-age=60"}
+    first.store(cache_key("http://a/"), {}, headers, b"a" * 600)
+    second.store(cache_key("http://b/"), {}, headers, b"b" * 600)
+    assert first.lookup(cache_key("http://a/"), {}) is None
+    assert first.stats()["bytes"] == 600
+    first.close()
+    second.close()
+
+def test_scraper_revalidates_stale_entry(scraper, cache, monkeypatch):
+    cache.store(KEY, scraper.headers, {"Cache-Control": "max-age=0", "ETag": '"v1"'}, b"<p>cached</p>")
+    sent = []
+    def get(url, **params):
+        sent.append(params["headers"])
+        return FakeResponse(304, {"Cache-Control": "max-age=60"})
+    monkeypatch.setattr(scraper_module.session_pool, "get", get)
+
+    assert scraper._make_request(URL)[0] == b"<p>cached</p>"
+    assert sent[0]["If-None-Match"] == '"v1"'
+    assert scraper._make_request(URL)[0] == b"<p>cached</p>"
+    assert len(sent) == 1
+
+def test_scraper_ignores_a_broken_cache(scraper, cache, monkeypatch):
+    def broken(*args):
+        raise sqlite3.OperationalError("database is locked")
+    monkeypatch.setattr(cache, "lookup", broken)
+    monkeypatch.setattr(cache, "store", broken)
+    monkeypatch.setattr(
+        scraper_module.session_pool, "get",
+        lambda url, **params: FakeResponse(200, {"Cache-Control": "max-age=60"}, b"<p>live</p>")
+    )
+    assert scraper._make_request(URL)[0] == b"<p>live</p>"
@@ -0,0 +1,92 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import router as router_module
+from app.core.config import settings
+from app.jobs.runner import JobRunner
+from app.jobs.store import JobStore
+from app.scraper.scraper import WebScraper
+from app.utils.rate_limiter import rate_limiter
+from asgi import app
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_POLL_INTERVAL", 0.05)
+    monkeypatch.setattr(settings, "FRONTIER_DIR", str(tmp_path / "frontiers"))
+    return JobStore(str(tmp_path / "jobs.sqlite"))
+
+@pytest.fixture
+def client(store, monkeypatch):
+    # No workers, so submitted jobs stay queued
+    monkeypatch.setattr(router_module, "job_store", store)
+    monkeypatch.setattr(router_module, "job_runner", JobRunner(store, workers=0))
+    app.dependency_overrides[rate_limiter] = lambda: None
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+def _wait_until_finished(store, job_id, timeout=5.0):
+    stop_at = time.monotonic() + timeout
+    while time.monotonic() < stop_at:
+        job = store.get(job_id)
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish")
+
+def test_runner_runs_queued_jobs(store, monkeypatch):
+    async def ascrape(self, url):
+        if "broken" in url:
+            raise ValueError("no such page")
+        return {"url": url, "data": "text"}
+
+    monkeypatch.setattr(WebScraper, "ascrape", ascrape)
+    runner = JobRunner(store, workers=1)
+    runner.start()
+    try:
+        good = store.create({"url": "http://example.com/", "scrape_type": "text"})
+        bad = store.create({"url": "http://example.com/broken", "scrape_type": "text"})
+        runner.notify()
+        good = _wait_until_finished(store, good["id"])
+        bad = _wait_until_finished(store, bad["id"])
+    finally:
+        runner.stop()
+
+    assert good["status"] == "succeeded" and good["pages_done"] == 1 and good["worker"] == runner.worker_id
+    results, cursor = store.results(good["id"])
+    assert results[0]["data"] == {"url": "http://example.com/", "data": "text"} and cursor is None
+    assert bad["status"] == "failed" and bad["error"] == "no such page"
+
+def test_submit_poll_and_cancel_a_job(client):
+    response = client.post("/api/jobs", json={"url": "http://example.com/"})
+    assert response.status_code == 202
+    job = response.json()["job"]
+    assert job["status"] == "queued" and job["max_pages"] == 1
+
+    assert client.get(f"/api/jobs/{job['id']}").json()["job"]["id"] == job["id"]
+    page = client.get(f"/api/jobs/{job['id']}/results").json()
+    assert page["results"] == [] and page["next_cursor"] is None
+
+    cancelled = client.delete(f"/api/jobs/{job['id']}").json()["job"]
+    assert cancelled["status"] == "cancelled"
+
+def test_unknown_job_is_404(client):
+    assert client.get("/api/jobs/missing").status_code == 404
+    assert client.delete("/api/jobs/missing").status_code == 404
+
+def test_invalid_job_is_rejected(client):
+    response = client.post("/api/jobs", json={"url": "http://example.com/", "selector": "a[["})
+    assert response.status_code == 400
+
+def test_results_are_paged_with_a_cursor(client, store):
+    job = store.create({"url": "http://example.com/", "config": {"follow_links": True}})
+    claimed = store.claim("worker", 30)
+    store.add_results(job["id"], claimed["lease_token"], [
+        {"url": f"http://example.com/{i}", "depth": 1, "success": True} for i in range(5)
+    ])
+    first = client.get(f"/api/jobs/{job['id']}/results", params={"limit": 3}).json()
+    assert [result["url"] for result in first["results"]] == [f"http://example.com/{i}" for i in range(3)]
+    second = client.get(f"/api/jobs/{job['id']}/results", params={"cursor": first["next_cursor"]}).json()
+    assert len(second["results"]) == 2 and second["next_cursor"] is None
+    assert second["job"]["status"] == "running" and second["job"]["pages_done"] == 5
@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+
+from app.utils import rate_limiter as rate_limiter_module
+from app.utils.rate_limiter import SlidingWindowRateLimiter, SQLiteRateLimitBackend
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(6000.0)
+    monkeypatch.setattr(rate_limiter_module.time, "time", clock)
+    return clock
+
+def _limiter(path, limit=3):
+    return SlidingWindowRateLimiter(SQLiteRateLimitBackend(str(path)), limit, window=60.0)
+
+def test_sqlite_backend_shares_counts_between_limiters(tmp_path, clock):
+    path = tmp_path / "limits.sqlite3"
+    first, second = _limiter(path), _limiter(path)
+    assert first.hit("client") == (True, 2, 0.0)
+    assert second.hit("client") == (True, 1, 0.0)
+    assert first.hit("client") == (True, 0, 0.0)
+    allowed, remaining, retry_after = second.hit("client")
+    assert not allowed and remaining == 0 and retry_after == 60.0
+    assert first.remaining("other") == 3
+
+def test_previous_window_is_weighted_by_overlap(tmp_path, clock):
+    limiter = _limiter(tmp_path / "limits.sqlite3")
+    for _ in range(3):
+        limiter.hit("client")
+    # Halfway through the next window, half of the previous requests still count
+    clock.now += 90
+    assert limiter.remaining("client") == 1
+    assert limiter.hit("client")[0]
+    assert not limiter.hit("client")[0]
+    clock.now += 60
+    assert limiter.remaining("client") == 2
+
+def test_concurrent_hits_never_exceed_the_limit(tmp_path, clock):
+    path = tmp_path / "limits.sqlite3"
+    limiters = [_limiter(path, limit=20) for _ in range(4)]
+    allowed = []
+
+    def hammer(limiter):
+        for _ in range(10):
+            allowed.append(limiter.hit("client")[0])
+
+    threads = [threading.Thread(target=hammer, args=(limiter,)) for limiter in limiters]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert allowed.count(True) == 20
+
+def test_purge_drops_idle_clients(tmp_path, clock):
+    backend = SQLiteRateLimitBackend(str(tmp_path / "limits.sqlite3"))
+    limiter = SlidingWindowRateLimiter(backend, 3, window=60.0)
+    limiter.hit("idle")
+    clock.now += 180
+    limiter.hit("active")
+    keys = [key for key, in backend._connection().execute("SELECT key FROM rate_limits")]
+    assert keys == ["active"]
@@ -0,0 +1,77 @@
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+redis = pytest.importorskip("redis")
+
+from app.core.config import settings
+from app.jobs.redis_store import RedisJobStore
+from app.jobs.store import lease_error
+
+# A lease that has already expired by the time the next claim runs
+EXPIRED = -1.0
+
+@pytest.fixture
+def store(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        redis.Redis, "from_url",
+        classmethod(lambda cls, url, **kw: fakeredis.FakeRedis(server=server, **kw))
+    )
+    monkeypatch.setattr(settings, "JOB_MAX_ATTEMPTS", 2)
+    return RedisJobStore("redis://test")
+
+def test_claim_leases_oldest_queued_job(store):
+    first = store.create({"url": "http://a/"})
+    store.create({"url": "http://b/"})
+    job = store.claim("w1", 30)
+    assert job["id"] == first["id"]
+    assert job["status"] == "running" and job["worker"] == "w1" and job["attempts"] == 1
+    assert store.stats() == {"queued": 1, "running": 1}
+
+def test_heartbeat_needs_the_current_lease(store):
+    store.create({"url": "http://a/"})
+    job = store.claim("w1", 30)
+    assert store.heartbeat(job["id"], job["lease_token"], 30)
+    assert not store.heartbeat(job["id"], "stale", 30)
+    store.cancel(job["id"])
+    assert not store.heartbeat(job["id"], job["lease_token"], 30)
+
+def test_expired_lease_is_taken_over(store):
+    created = store.create({"url": "http://a/"})
+    old = store.claim("w1", EXPIRED)
+    new = store.claim("w2", 30)
+    assert new["id"] == created["id"] and new["worker"] == "w2" and new["attempts"] == 2
+    assert not store.heartbeat(old["id"], old["lease_token"], 30)
+    assert not store.add_results(old["id"], old["lease_token"], [{"url": "http://a/", "success": True}])
+    assert not store.finish(old["id"], old["lease_token"], "completed")
+    assert store.results(created["id"]) == ([], None)
+
+def test_unexpired_lease_is_not_taken_over(store):
+    store.create({"url": "http://a/"})
+    assert store.claim("w1", 30) is not None
+    assert store.claim("w2", 30) is None
+
+def test_job_fails_after_max_attempts(store):
+    created = store.create({"url": "http://a/"})
+    store.claim("w1", EXPIRED)
+    store.claim("w2", EXPIRED)
+    assert store.claim("w3", 30) is None
+    job = store.get(created["id"])
+    assert job["status"] == "failed"
+    assert job["attempts"] == settings.JOB_MAX_ATTEMPTS
+    assert job["error"] == lease_error(settings.JOB_MAX_ATTEMPTS)
+    assert store.stats() == {"failed": 1}
+
+def test_results_are_deduplicated_per_url(store):
+    created = store.create({"url": "http://a/"})
+    job = store.claim("w1", 30)
+    assert store.add_results(job["id"], job["lease_token"], [{"url": "http://a/", "success": True}])
+    assert store.add_results(job["id"], job["lease_token"], [
+        {"url": "http://a/", "success": True},
+        {"url": "http://b/", "success": False},
+    ])
+    results, cursor = store.results(created["id"])
+    assert [result["url"] for result in results] == ["http://a/", "http://b/"] and cursor is None
+    job = store.get(created["id"])
+    assert job["pages_done"] == 2 and job["pages_failed"] == 1
@@ -0,0 +1,44 @@
+import asyncio
+import time
+
+from app.scraper.session_pool import SessionPool
+
+def test_session_in_use_is_not_closed_for_idleness():
+    pool = SessionPool()
+    with pool.session("http://a.example/") as session:
+        entry = pool._hosts["a.example"]
+        entry.last_used -= entry.options["max_idle"] + 1
+        pool._sweep_idle(time.monotonic())
+        with pool.session("http://a.example/other") as again:
+            assert again is session
+    assert "a.example" in pool._hosts
+
+    entry.last_used -= entry.options["max_idle"] + 1
+    with pool.session("http://a.example/") as fresh:
+        assert fresh is not session
+    pool.close()
+
+def test_counters_keep_most_recent_hosts():
+    pool = SessionPool(max_hosts=2)
+    for host in ["a", "b", "a", "c"]:
+        pool.record_request(host)
+    assert set(pool.stats()["hosts"]) == {"a", "c"}
+    assert pool.stats("a")["requests"] == 2
+
+def test_proxied_clients_are_pooled_per_proxy_mapping():
+    pool = SessionPool()
+    proxies = {"http": "http://proxy.example:3128"}
+
+    async def clients():
+        async with pool.async_client("http://a.example/", proxies) as first:
+            pass
+        async with pool.async_client("http://a.example/x", dict(proxies)) as second:
+            pass
+        async with pool.async_client("http://a.example/") as direct:
+            pass
+        await pool.aclose()
+        return first, second, direct
+
+    first, second, direct = asyncio.run(clients())
+    assert first is second
+    assert direct is not first
@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.scraper.single_flight import SingleFlight
+
+def test_concurrent_calls_share_one_run():
+    flight = SingleFlight()
+    runs = []
+    started = threading.Event()
+
+    def slow():
+        runs.append(1)
+        started.set()
+        time.sleep(0.1)
+        return {"value": len(runs)}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("key", slow)))
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=lambda: results.append(flight.do("key", slow))) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    for thread in [leader, *followers]:
+        thread.join()
+
+    assert len(runs) == 1
+    assert results == [{"value": 1}] * 4
+    assert flight.stats()["coalesced"] == 3 and flight.stats()["in_flight"] == 0
+
+def test_finished_calls_are_not_cached():
+    flight = SingleFlight()
+    assert flight.do("key", lambda: 1) == 1
+    assert flight.do("key", lambda: 2) == 2
+
+def test_async_callers_share_result_and_error():
+    flight = SingleFlight()
+    runs = []
+
+    async def fail():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def scenario():
+        return await asyncio.gather(*(flight.ado("key", fail) for _ in range(3)), return_exceptions=True)
+
+    errors = asyncio.run(scenario())
+    assert len(runs) == 1
+    assert all(isinstance(error, ValueError) for error in errors)
+
+def test_shared_call_survives_until_every_caller_cancels():
+    flight = SingleFlight()
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(0.05)
+            return "done"
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def scenario():
+        first = asyncio.ensure_future(flight.ado("key", slow))
+        second = asyncio.ensure_future(flight.ado("key", slow))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == "done"
+        assert not cancelled
+
+        third = asyncio.ensure_future(flight.ado("other", slow))
+        await asyncio.sleep(0)
+        third.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await third
+        await asyncio.sleep(0)
+        assert cancelled == [1]
+
+    asyncio.run(scenario())
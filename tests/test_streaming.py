@@ -0,0 +1,60 @@
+import subprocess
+import sys
+import textwrap
+
+from app.models.schema import ScrapeType
+from app.scraper.streaming import StreamingExtractor, iter_records
+
+# Peak RSS growth allowed while streaming a page, whatever its size
+MAX_GROWTH_MB = 16
+
+MEASURE_PEAK = textwrap.dedent("""
+    import resource, sys
+    from app.models.schema import ScrapeType
+    from app.scraper.streaming import StreamingExtractor
+
+    chunk = b"<div><a href='/page' title='t'>link text</a><img src='i.png'></div>\\n" * 1000
+    extractor = StreamingExtractor(ScrapeType.LINKS)
+    for _ in range(20):
+        extractor.feed(chunk)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    for _ in range(int(sys.argv[1])):
+        extractor.feed(chunk)
+    extractor.close()
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline)
+""")
+
+def _peak_growth_mb(chunks: int) -> float:
+    """Stream ``chunks`` chunks of about 70 KB in a fresh process and return its peak RSS growth"""
+    output = subprocess.run(
+        [sys.executable, "-c", MEASURE_PEAK, str(chunks)],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return int(output) / 1024
+
+def test_streaming_memory_is_bounded():
+    small = _peak_growth_mb(50)
+    large = _peak_growth_mb(600)
+    assert large < MAX_GROWTH_MB, f"streaming ~40 MB grew peak RSS by {large:.1f} MB"
+    assert large - small < MAX_GROWTH_MB / 2
+
+def test_records_match_across_chunk_boundaries():
+    html = (
+        b"<html><head><meta charset='utf-8'></head><body>"
+        b"<a href='/a' title='A'>First <b>link</b></a>"
+        b"<img src='/i.png' alt='pic' width='10'>"
+        b"<a href='/b'>Caf\xc3\xa9</a></body></html>"
+    )
+    chunks = [html[i:i + 7] for i in range(0, len(html), 7)]
+    links = list(iter_records(chunks, ScrapeType.LINKS))
+    assert links == [
+        {"url": "/a", "text": "Firstlink", "title": "A"},
+        {"url": "/b", "text": "Café", "title": ""},
+    ]
+    images = list(iter_records(chunks, ScrapeType.IMAGES))
+    assert images == [{"src": "/i.png", "alt": "pic", "title": "", "width": "10", "height": ""}]
+
+def test_feed_returns_records_before_close():
+    extractor = StreamingExtractor(ScrapeType.LINKS)
+    records = extractor.feed(b"<a href='/x'>x</a>" * 1000)
+    assert records and records[0]["url"] == "/x"
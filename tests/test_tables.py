@@ -0,0 +1,47 @@
+from bs4 import BeautifulSoup
+
+from app.scraper.html_parser import HTMLParser
+from app.scraper.tables import extract_table
+
+def _table(html):
+    return BeautifulSoup(html, "html.parser").table
+
+def test_colspan_and_rowspan_fill_every_slot():
+    headers, data = extract_table(_table(
+        "<table><tr><th>Name</th><th colspan='2'>Score</th></tr>"
+        "<tr><td rowspan='2'>Ann</td><td>1</td><td>2</td></tr>"
+        "<tr><td>3</td><td>4</td></tr></table>"
+    ))
+    assert headers == ["Name", "Score", "Score.1"]
+    assert data == [
+        {"Name": "Ann", "Score": 1, "Score.1": 2},
+        {"Name": "Ann", "Score": 3, "Score.1": 4},
+    ]
+
+def test_multi_row_headers_are_joined_per_column():
+    headers, data = extract_table(_table(
+        "<table><thead>"
+        "<tr><th rowspan='2'>City</th><th colspan='2'>Temperature</th></tr>"
+        "<tr><th>Min</th><th>Max</th></tr>"
+        "</thead><tbody><tr><td>Oslo</td><td>-3.5</td><td>4</td></tr></tbody></table>"
+    ))
+    assert headers == ["City", "Temperature Min", "Temperature Max"]
+    assert data == [{"City": "Oslo", "Temperature Min": -3.5, "Temperature Max": 4.0}]
+
+def test_table_without_header_gets_integer_columns():
+    headers, data = extract_table(_table(
+        "<table><tr><td>a</td><td>1,000</td></tr><tr><td>b</td></tr></table>"
+    ))
+    assert headers == [0, 1]
+    assert data == [{0: "a", 1: 1000}, {0: "b", 1: None}]
+
+def test_empty_tables_are_skipped():
+    parser = HTMLParser(
+        "<table></table>"
+        "<table><tr></tr></table>"
+        "<table><tr><th>A</th></tr><tr><td>x</td></tr></table>"
+    )
+    tables = parser.extract_tables()
+    assert [table["table_index"] for table in tables] == [2]
+    assert tables[0]["data"] == [{"A": "x"}]
+    assert parser.extract_full()["tables"] == tables
@@ -0,0 +1,45 @@
+import argparse
+import logging
+import signal
+import threading
+
+from app.core.config import configure_logging, settings
+from app.jobs.runner import JobRunner
+from app.jobs.store import job_store
+
+logger = logging.getLogger("worker")
+
+def main() -> None:
+    """Run background scrape jobs from the shared job queue until stopped"""
+    parser = argparse.ArgumentParser(description="Run background scrape jobs from the shared job queue")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.JOB_WORKERS or 4,
+        help="Maximum jobs run at once (default: JOB_WORKERS, or 4 if that is 0)"
+    )
+    parser.add_argument(
+        "--log-level",
+        default="INFO",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+        help="Lowest level of the lease, heartbeat and job messages to log (default: INFO)"
+    )
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    configure_logging(args.log_level, force=True)
+
+    runner = JobRunner(job_store, args.workers)
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+
+    logger.info(f"Worker {runner.worker_id} using the {settings.JOB_BACKEND} job backend")
+    runner.start()
+    stop.wait()
+    logger.info("Stopping; running jobs go back to the queue")
+    runner.stop()
+
+if __name__ == "__main__":
+    main()